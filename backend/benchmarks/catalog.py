@@ -0,0 +1,36 @@
+"""Synthetic catalogs loaded into moto-backed DynamoDB tables."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'dynamodb', 'dynamodb'))
+
+from seed import synthetic_products, write_products  # noqa: E402
+
+PRODUCTS_TABLE = 'products'
+STOCKS_TABLE = 'stocks'
+
+
+def create_tables(dynamodb):
+    tables = []
+    for name, key in ((PRODUCTS_TABLE, 'id'), (STOCKS_TABLE, 'product_id')):
+        tables.append(dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{'AttributeName': key, 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': key, 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        ))
+    return tables
+
+
+def load_catalog(dynamodb, size: int):
+    """Create the tables and fill them with size synthetic products; returns the product ids"""
+    products_table, stocks_table = create_tables(dynamodb)
+    products = list(synthetic_products(0, size))
+    write_products(products_table, stocks_table, products)
+    return [product['id'] for product in products]
+
+
+def csv_rows(count: int) -> bytes:
+    lines = ['Title,Description,Price,Count']
+    lines.extend(f'"Imported {i}","Synthetic import row {i}",{(i % 500) / 10 + 1:.2f},{i % 30}' for i in range(count))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
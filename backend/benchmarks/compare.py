@@ -0,0 +1,67 @@
+"""Compare two benchmark reports written by benchmarks.run and flag regressions.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Exits with status 1 when a p95 latency grew, or an AWS call count went up, by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb')
+GATED_METRIC = 'p95_ms'
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        report = json.load(source)
+    return {(result['handler'], result['size']): result for result in report['results'] if 'error' not in result}
+
+
+def change(before, after):
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    """Return (rows, regressions) for the scenarios present in both reports"""
+    rows, regressions = [], []
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        for metric in METRICS:
+            delta = change(old[metric], new[metric])
+            rows.append((*key, metric, old[metric], new[metric], delta))
+            if metric == GATED_METRIC and delta is not None and delta > threshold:
+                regressions.append(f"{key[0]} @ {key[1]}: {metric} {old[metric]} -> {new[metric]} ({delta:+.1f}%)")
+        old_calls, new_calls = old['aws_calls_per_invocation'], new['aws_calls_per_invocation']
+        for operation in sorted(old_calls.keys() | new_calls.keys()):
+            old_count, new_count = old_calls.get(operation, 0), new_calls.get(operation, 0)
+            delta = change(old_count, new_count)
+            rows.append((*key, operation, old_count, new_count, delta))
+            if new_count > old_count and (delta is None or delta > threshold):
+                regressions.append(f"{key[0]} @ {key[1]}: {operation} calls {old_count} -> {new_count}")
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed growth in percent')
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare(load(args.before), load(args.after), args.threshold)
+    for handler, size, metric, old, new, delta in rows:
+        shown = 'new' if delta is None else f'{delta:+.1f}%'
+        print(f"{handler:<24} {size:>8}  {metric:<28} {old:>10} -> {new:>10}  {shown}")
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Timing, memory and AWS-call accounting shared by the benchmark scenarios."""
+import contextlib
+import io
+import math
+import resource
+import sys
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+import boto3
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class AwsCallCounter:
+    """Count every AWS API call made by clients created from the default boto3 session.
+
+    Register it before the handlers build their clients: a client copies the session's
+    event handlers when it is created.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.enabled = False
+
+    def install(self) -> 'AwsCallCounter':
+        boto3.setup_default_session()
+        boto3.DEFAULT_SESSION.events.register('before-call', self._on_call)
+        return self
+
+    def _on_call(self, model, **kwargs):
+        if self.enabled:
+            self.calls[f"{model.service_model.service_name}.{model.name}"] += 1
+
+
+def measure(invoke: Callable[[int], Any], iterations: int, calls: AwsCallCounter,
+            before_each: Callable[[int], Any] = None) -> Dict[str, Any]:
+    """Run invoke(i) iterations times and summarize latency, throughput, memory and AWS calls"""
+    latencies = []
+    calls.calls.clear()
+    started = time.perf_counter()
+    for i in range(iterations):
+        if before_each:
+            before_each(i)
+        # handlers print their payloads; keep that out of the numbers and the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            calls.enabled = True
+            begin = time.perf_counter()
+            invoke(i)
+            latencies.append((time.perf_counter() - begin) * 1000)
+            calls.enabled = False
+    total = time.perf_counter() - started
+    busy = sum(latencies) / 1000
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'throughput_per_sec': round(iterations / busy, 2) if busy else None,
+        'wall_seconds': round(total, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'aws_calls_per_invocation': {
+            operation: round(count / iterations, 2) for operation, count in sorted(calls.calls.items())
+        },
+    }
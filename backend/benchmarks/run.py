@@ -0,0 +1,88 @@
+"""End-to-end handler benchmarks against moto-backed DynamoDB, S3, SQS and SNS.
+
+Every (handler, catalog size) pair runs in a fresh process, so cold-start work, caches and
+peak RSS do not leak between scenarios.
+
+    cd backend
+    python -m benchmarks.run --sizes 1000,10000 --iterations 20 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from benchmarks.scenarios import SCENARIOS
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_SIZES = '1000,10000,100000'
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_one(handler, size, iterations, warm):
+    command = [sys.executable, '-m', 'benchmarks.scenarios', handler, '--size', str(size), '--iterations', str(iterations)]
+    if warm:
+        command.append('--warm')
+    completed = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'handler': handler, 'size': size, 'warm_cache': warm, 'error': completed.stderr.strip().splitlines()[-1:]}
+    # the scenario prints its result as the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated catalog sizes')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--handlers', default=','.join(SCENARIOS), help='comma separated scenario names')
+    parser.add_argument('--warm', action='store_true', help='keep the in-process caches between iterations')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    handlers = [name for name in args.handlers.split(',') if name]
+    unknown = set(handlers) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown handlers: {', '.join(sorted(unknown))}")
+
+    results = []
+    for size in (int(value) for value in args.sizes.split(',') if value):
+        for handler in handlers:
+            result = run_one(handler, size, args.iterations, args.warm)
+            results.append(result)
+            if 'error' in result:
+                print(f"{handler:<24} {size:>8}  failed: {result['error']}", file=sys.stderr)
+            else:
+                print(f"{handler:<24} {size:>8}  p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                      f"p99 {result['p99_ms']:>9.2f} ms  {result['throughput_per_sec'] or 0:>8.1f}/s  "
+                      f"rss {result['peak_rss_mb']:>6.1f} MB  calls {result['aws_calls_per_invocation']}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'iterations': args.iterations,
+            'warm_cache': args.warm,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""One benchmark scenario per handler, run in its own process by benchmarks.run.
+
+Each service ships flat modules with the same names (clients, ...), so a process only ever
+imports the functions of one service.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+QUEUE_NAME = 'catalogItemsQueue'
+IMPORT_BUCKET = 'bucket-for-files-import'
+
+os.environ.update({
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'PRODUCTS_TABLE_NAME': 'products',
+    'STOCKS_TABLE_NAME': 'stocks',
+    'BUCKET_NAME': IMPORT_BUCKET,
+    # moto ignores Segment/TotalSegments, parallel segments would each scan the whole table
+    'SCAN_SEGMENTS': '1',
+})
+
+import boto3  # noqa: E402
+from moto import mock_dynamodb, mock_s3, mock_sns, mock_sqs  # noqa: E402
+
+from benchmarks.catalog import csv_rows, load_catalog  # noqa: E402
+from benchmarks.harness import AwsCallCounter, measure  # noqa: E402
+
+
+def use_service(name):
+    sys.path.insert(0, os.path.join(BACKEND_DIR, name, 'src', 'functions'))
+
+
+def api_event(path_parameters=None, query_parameters=None, body=None, method='GET'):
+    return {
+        'httpMethod': method,
+        'headers': {'Accept': '*/*'},
+        'pathParameters': path_parameters,
+        'queryStringParameters': query_parameters,
+        'body': body,
+    }
+
+
+def bench_get_products_list(size, iterations, calls, warm):
+    use_service('product_service')
+    import cache
+    import get_products_list
+    load_catalog(boto3.resource('dynamodb'), size)
+    return measure(
+        lambda i: get_products_list.handler(api_event(), None),
+        iterations, calls, before_each=None if warm else lambda i: cache.clear_caches()
+    )
+
+
+def bench_get_products_list_page(size, iterations, calls, warm):
+    use_service('product_service')
+    import cache
+    import get_products_list
+    load_catalog(boto3.resource('dynamodb'), size)
+    return measure(
+        lambda i: get_products_list.handler(api_event(query_parameters={'limit': '20'}), None),
+        iterations, calls, before_each=None if warm else lambda i: cache.clear_caches()
+    )
+
+
+def bench_get_product_by_id(size, iterations, calls, warm):
+    use_service('product_service')
+    import cache
+    import get_product_by_id
+    ids = load_catalog(boto3.resource('dynamodb'), size)
+    picks = [random.Random(i).choice(ids) for i in range(iterations)]
+    return measure(
+        lambda i: get_product_by_id.handler(api_event(path_parameters={'productId': picks[i]}), None),
+        iterations, calls, before_each=None if warm else lambda i: cache.clear_caches()
+    )
+
+
+def bench_create_product(size, iterations, calls, warm):
+    use_service('product_service')
+    import create_product
+    load_catalog(boto3.resource('dynamodb'), size)
+    body = json.dumps({'title': 'Bench product', 'description': 'Created by the benchmark', 'price': 12.5, 'count': 3})
+    return measure(lambda i: create_product.handler(api_event(body=body, method='POST'), None), iterations, calls)
+
+
+def bench_catalog_batch_process(size, iterations, calls, warm, messages=10, rows_per_message=10):
+    os.environ['SNS_TOPIC_ARN'] = boto3.client('sns').create_topic(Name='createProductTopic')['TopicArn']
+    use_service('product_service')
+    import catalog_batch_process
+    load_catalog(boto3.resource('dynamodb'), size)
+
+    def event(i):
+        return {'Records': [
+            {
+                'messageId': f'bench-{i}-{m}',
+                'body': json.dumps({'version': 2, 'rows': [
+                    {'Title': f'Batch {i}-{m}-{r}', 'Description': 'Queued', 'Price': '3.5', 'Count': '2'}
+                    for r in range(rows_per_message)
+                ]}),
+            }
+            for m in range(messages)
+        ]}
+
+    return measure(lambda i: catalog_batch_process.handler(event(i), None), iterations, calls)
+
+
+def bench_import_file_parser(size, iterations, calls, warm):
+    s3 = boto3.client('s3')
+    s3.create_bucket(Bucket=IMPORT_BUCKET)
+    os.environ['SQS_QUEUE_URL'] = boto3.client('sqs').create_queue(QueueName=QUEUE_NAME)['QueueUrl']
+    use_service('import_service')
+    import import_file_parser
+    content = csv_rows(size)
+    key = 'uploaded/bench.csv'
+    event = {'Records': [{'s3': {'bucket': {'name': IMPORT_BUCKET}, 'object': {'key': key}}}]}
+    return measure(
+        lambda i: import_file_parser.handler(event, None), iterations, calls,
+        # the handler moves the file to parsed/, so upload it again before every run
+        before_each=lambda i: s3.put_object(Bucket=IMPORT_BUCKET, Key=key, Body=content)
+    )
+
+
+SCENARIOS = {
+    'get_products_list': bench_get_products_list,
+    'get_products_list_page': bench_get_products_list_page,
+    'get_product_by_id': bench_get_product_by_id,
+    'create_product': bench_create_product,
+    'catalog_batch_process': bench_catalog_batch_process,
+    'import_file_parser': bench_import_file_parser,
+}
+
+
+def run_scenario(name, size, iterations, warm=False):
+    with mock_dynamodb(), mock_s3(), mock_sqs(), mock_sns():
+        # the mocks reset boto3's default session, so the counter has to be installed inside them
+        calls = AwsCallCounter().install()
+        result = SCENARIOS[name](size, iterations, calls, warm)
+    return {'handler': name, 'size': size, 'warm_cache': warm, **result}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run one benchmark scenario and print its result as JSON')
+    parser.add_argument('scenario', choices=sorted(SCENARIOS))
+    parser.add_argument('--size', type=int, required=True)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warm', action='store_true', help='keep the in-process caches between iterations')
+    args = parser.parse_args()
+    print(json.dumps(run_scenario(args.scenario, args.size, args.iterations, args.warm)))
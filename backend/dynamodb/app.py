@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+import aws_cdk as cdk
+from dynamodb.dynamobd_stack import DynamodbStack
+
+app = cdk.App()
+DynamodbStack(app, "DynamodbStack")
+app.synth()
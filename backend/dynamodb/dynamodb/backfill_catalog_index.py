@@ -0,0 +1,104 @@
+"""Set the catalog index keys on product items for filtered and sorted GET /products.
+
+The ByPrice and ByTitle indexes only contain products carrying catalog_shard and title_lower,
+which the write paths set since the indexes exist. This scans the products table in parallel
+segments and sets both on the products that lack them. With --overwrite every product is
+rewritten, which is how --shards is changed: run it with the new number, then deploy the
+product service with the same CATALOG_INDEX_SHARDS.
+
+    python backfill_catalog_index.py --segments 8 --rate 500
+    python backfill_catalog_index.py --endpoint-url http://localhost:5000 --dry-run
+
+Products without these keys are missing from filtered results until this has run.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from botocore.exceptions import ClientError
+
+from seed import CATALOG_INDEX_SHARDS, RateLimiter, catalog_shard, connect
+
+
+def backfill_segment(options: Dict[str, Any], segment: int, limiter: RateLimiter, lock: threading.Lock) -> Dict[str, int]:
+    # boto3 resources are not thread safe, every segment gets its own
+    products_table = connect(options).Table(options["products_table"])
+
+    condition = "attribute_exists(id)"
+    if not options["overwrite"]:
+        condition += " AND attribute_not_exists(#catalog_shard)"
+
+    stats = {"scanned": 0, "updated": 0, "skipped": 0}
+    scan_kwargs = {
+        "Segment": segment,
+        "TotalSegments": options["segments"],
+        "ProjectionExpression": "id, title, #catalog_shard",
+        "ExpressionAttributeNames": {"#catalog_shard": "catalog_shard"},
+    }
+    while True:
+        response = products_table.scan(**scan_kwargs)
+        for product in response.get("Items", []):
+            stats["scanned"] += 1
+            if options["dry_run"]:
+                continue
+            shard = catalog_shard(product["id"], options["shards"])
+            if "catalog_shard" in product and (product["catalog_shard"] == shard or not options["overwrite"]):
+                stats["skipped"] += 1
+                continue
+            with lock:
+                limiter.wait()
+            try:
+                products_table.update_item(
+                    Key={"id": product["id"]},
+                    UpdateExpression="SET #catalog_shard = :shard, #title_lower = :title_lower",
+                    ConditionExpression=condition,
+                    ExpressionAttributeNames={"#catalog_shard": "catalog_shard", "#title_lower": "title_lower"},
+                    ExpressionAttributeValues={":shard": shard, ":title_lower": product.get("title", "").lower()},
+                )
+                stats["updated"] += 1
+            except ClientError as error:
+                if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                # deleted meanwhile, or a write path set the keys first
+                stats["skipped"] += 1
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return stats
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+
+def backfill(options: Dict[str, Any]) -> Dict[str, Any]:
+    limiter = RateLimiter(options["rate"])
+    lock = threading.Lock()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=options["segments"]) as executor:
+        results = list(executor.map(
+            lambda segment: backfill_segment(options, segment, limiter, lock), range(options["segments"])
+        ))
+    totals = {name: sum(result[name] for result in results) for name in ("scanned", "updated", "skipped")}
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    totals["dry_run"] = options["dry_run"]
+    return totals
+
+
+def parse_args(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=os.cpu_count() or 1, help="parallel scan segments")
+    parser.add_argument("--rate", type=float, default=0, help="max updates per second, 0 = unlimited")
+    parser.add_argument("--shards", type=int, default=CATALOG_INDEX_SHARDS, help="shards of the catalog indexes")
+    parser.add_argument("--region", default="us-east-2")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local or moto server URL")
+    parser.add_argument("--products-table", default="products")
+    parser.add_argument("--overwrite", action="store_true", help="also rewrite products that already carry the keys")
+    parser.add_argument("--dry-run", action="store_true", help="only count the products")
+    options = vars(parser.parse_args(argv))
+    options["segments"] = max(1, options["segments"])
+    return options
+
+
+if __name__ == "__main__":
+    print(json.dumps(backfill(parse_args()), indent=2))
@@ -0,0 +1,97 @@
+"""Copy stock counts onto product items for the product service's denormalized read model.
+
+Products written before the read model existed have no count attribute. This scans the
+stocks table in parallel segments and sets each product's count from its stock row; only
+products without a count are touched unless --overwrite is given, so counts the write paths
+already keep in sync are never replaced with an older value. Stock rows without a product
+are skipped rather than creating half a product.
+
+    python backfill_stock_counts.py --segments 8 --rate 500
+    python backfill_stock_counts.py --endpoint-url http://localhost:5000 --dry-run
+
+Run it before switching READ_MODEL to "denormalized"; switching back needs no migration.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from botocore.exceptions import ClientError
+
+from seed import RateLimiter, connect
+
+
+def backfill_segment(options: Dict[str, Any], segment: int, limiter: RateLimiter, lock: threading.Lock) -> Dict[str, int]:
+    # boto3 resources are not thread safe, every segment gets its own
+    resource = connect(options)
+    stocks_table = resource.Table(options["stocks_table"])
+    products_table = resource.Table(options["products_table"])
+
+    condition = "attribute_exists(id)"
+    if not options["overwrite"]:
+        condition += " AND attribute_not_exists(#count)"
+
+    stats = {"scanned": 0, "updated": 0, "skipped": 0}
+    scan_kwargs = {"Segment": segment, "TotalSegments": options["segments"]}
+    while True:
+        response = stocks_table.scan(**scan_kwargs)
+        for stock in response.get("Items", []):
+            stats["scanned"] += 1
+            if options["dry_run"]:
+                continue
+            with lock:
+                limiter.wait()
+            try:
+                products_table.update_item(
+                    Key={"id": stock["product_id"]},
+                    UpdateExpression="SET #count = :count",
+                    ConditionExpression=condition,
+                    ExpressionAttributeNames={"#count": "count"},
+                    ExpressionAttributeValues={":count": stock.get("count", 0)},
+                )
+                stats["updated"] += 1
+            except ClientError as error:
+                if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                # no such product, or it already carries a count
+                stats["skipped"] += 1
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return stats
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+
+def backfill(options: Dict[str, Any]) -> Dict[str, Any]:
+    limiter = RateLimiter(options["rate"])
+    lock = threading.Lock()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=options["segments"]) as executor:
+        results = list(executor.map(
+            lambda segment: backfill_segment(options, segment, limiter, lock), range(options["segments"])
+        ))
+    totals = {name: sum(result[name] for result in results) for name in ("scanned", "updated", "skipped")}
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    totals["dry_run"] = options["dry_run"]
+    return totals
+
+
+def parse_args(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=os.cpu_count() or 1, help="parallel scan segments")
+    parser.add_argument("--rate", type=float, default=0, help="max updates per second, 0 = unlimited")
+    parser.add_argument("--region", default="us-east-2")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local or moto server URL")
+    parser.add_argument("--products-table", default="products")
+    parser.add_argument("--stocks-table", default="stocks")
+    parser.add_argument("--overwrite", action="store_true", help="also replace counts products already carry")
+    parser.add_argument("--dry-run", action="store_true", help="only count the stock rows")
+    options = vars(parser.parse_args(argv))
+    options["segments"] = max(1, options["segments"])
+    return options
+
+
+if __name__ == "__main__":
+    print(json.dumps(backfill(parse_args()), indent=2))
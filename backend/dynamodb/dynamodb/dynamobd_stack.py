@@ -0,0 +1,68 @@
+from aws_cdk import (
+    Stack,
+    RemovalPolicy,
+    CfnOutput,
+    aws_dynamodb as dynamodb,
+)
+from constructs import Construct
+
+# must match CATALOG_INDEX_SHARDS of the product service and --index-shards of seed.py
+CATALOG_INDEX_SHARDS = 4
+
+
+class DynamodbStack(Stack):
+    """The product service tables.
+
+    Tables that already exist can be adopted with `cdk import` instead of being recreated.
+    The products table carries two indexes for filtered, searched and sorted GET /products:
+    ByPrice and ByTitle, both partitioned by catalog_shard so writes spread over
+    CATALOG_INDEX_SHARDS partitions. Both tables stream new images to the catalog snapshot builder.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        products_table = dynamodb.Table(
+            self, "ProductsTable",
+            table_name="products",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            stream=dynamodb.StreamViewType.NEW_IMAGE,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+
+        # both indexes project everything a list response needs, so no query goes back to the table
+        products_table.add_global_secondary_index(
+            index_name="ByPrice",
+            partition_key=dynamodb.Attribute(name="catalog_shard", type=dynamodb.AttributeType.NUMBER),
+            sort_key=dynamodb.Attribute(name="price", type=dynamodb.AttributeType.NUMBER),
+            projection_type=dynamodb.ProjectionType.ALL,
+        )
+        products_table.add_global_secondary_index(
+            index_name="ByTitle",
+            partition_key=dynamodb.Attribute(name="catalog_shard", type=dynamodb.AttributeType.NUMBER),
+            sort_key=dynamodb.Attribute(name="title_lower", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.ALL,
+        )
+
+        stocks_table = dynamodb.Table(
+            self, "StocksTable",
+            table_name="stocks",
+            partition_key=dynamodb.Attribute(name="product_id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            stream=dynamodb.StreamViewType.NEW_IMAGE,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+
+        # the catalog version counter behind the GET /products ETag
+        dynamodb.Table(
+            self, "CatalogMetaTable",
+            table_name="catalog_meta",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+
+        # pass these to the product service as -c productsStreamArn=... -c stocksStreamArn=...
+        CfnOutput(self, "ProductsStreamArn", value=products_table.table_stream_arn)
+        CfnOutput(self, "StocksStreamArn", value=stocks_table.table_stream_arn)
@@ -1,6 +1,7 @@
 import boto3
 import uuid
 from decimal import Decimal
+from seed import write_products
 
 # Initialize DynamoDB resource
 dynamodb = boto3.resource('dynamodb', region_name='us-east-2')
@@ -15,24 +16,13 @@ products = [
 ]
 
 def populate_tables():
-    for product in products:
-        product_id = str(uuid.uuid4())
+    to_write = [{**product, "id": str(uuid.uuid4())} for product in products]
 
-        # Insert into products table
-        products_table.put_item(Item={
-            "id": product_id,
-            "title": product["title"],
-            "description": product["description"],
-            "price": product["price"]
-        })
+    # Insert into products and stocks tables through batch writers
+    write_products(products_table, stocks_table, to_write)
 
-        # Insert into stocks table
-        stocks_table.put_item(Item={
-            "product_id": product_id,
-            "count": product["count"]
-        })
-
-        print(f"Added: {product['title']} (ID: {product_id}) with stock: {product['count']}")
+    for product in to_write:
+        print(f"Added: {product['title']} (ID: {product['id']}) with stock: {product['count']}")
 
 if __name__ == "__main__":
     populate_tables()
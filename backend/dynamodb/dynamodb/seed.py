@@ -0,0 +1,247 @@
+"""Bulk-seed the products and stocks tables for load tests.
+
+Products come from a JSON or CSV file (product_service/products.json, import_service/products.csv)
+or are generated synthetically, and are written through batch_writer from a pool of processes.
+
+    python seed.py --source ../../import_service/products.csv
+    python seed.py --synthetic 1000000 --processes 8 --rate 20000 \\
+        --endpoint-url http://localhost:5000 --create-tables
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+import uuid
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List
+
+import boto3
+
+# one product is two writes: the product row and its stock row
+WRITES_PER_PRODUCT = 2
+PROGRESS_EVERY = 100
+# shards of the products ByPrice and ByTitle indexes, CATALOG_INDEX_SHARDS of the product service
+CATALOG_INDEX_SHARDS = 4
+CATALOG_INDEXES = (("ByPrice", "price", "N"), ("ByTitle", "title_lower", "S"))
+
+
+def catalog_shard(product_id: str, shards: int = CATALOG_INDEX_SHARDS) -> int:
+    """Same as the product service's catalog_items.catalog_shard"""
+    return zlib.crc32(product_id.encode("utf-8")) % shards
+
+
+def normalize(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Accept both the CSV column names (Title, Price, ...) and the table attribute names"""
+    fields = {key.lower(): value for key, value in product.items()}
+    return {
+        "id": fields.get("id") or str(uuid.uuid4()),
+        "title": fields["title"],
+        "description": fields.get("description", ""),
+        "price": Decimal(str(fields["price"])),
+        "count": int(fields.get("count", 0)),
+    }
+
+
+def load_products(path: str) -> List[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as source:
+        if path.endswith(".csv"):
+            return [normalize(row) for row in csv.DictReader(source)]
+        content = source.read().strip()
+        return [normalize(product) for product in json.loads(content)] if content else []
+
+
+def synthetic_products(start: int, stop: int) -> Iterator[Dict[str, Any]]:
+    """Deterministic synthetic products, so every worker can generate its own slice"""
+    for i in range(start, stop):
+        yield {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"synthetic-product/{i}")),
+            "title": f"Synthetic Product {i}",
+            "description": f"Generated product number {i} for load testing",
+            "price": Decimal(f"{(i % 9900) / 100 + 1:.2f}"),
+            "count": i % 100,
+        }
+
+
+class RateLimiter:
+    """Spread calls evenly so that no more than rate calls happen per second (0 disables it)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_at = time.monotonic()
+
+    def wait(self, calls: int = 1) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval * calls
+
+
+def write_products(products_table, stocks_table, products: Iterable[Dict[str, Any]],
+                   limiter: RateLimiter = None, on_progress=None, index_shards: int = CATALOG_INDEX_SHARDS) -> int:
+    """Write products and their stock rows through batch_writer, returning how many were written"""
+    limiter = limiter or RateLimiter(0)
+    written = 0
+    with products_table.batch_writer() as products_writer, stocks_table.batch_writer() as stocks_writer:
+        for product in products:
+            limiter.wait(WRITES_PER_PRODUCT)
+            products_writer.put_item(Item={
+                "id": product["id"],
+                "title": product["title"],
+                "description": product["description"],
+                "price": product["price"],
+                # denormalized copy of the stock count, see the product service's catalog_items
+                "count": product["count"],
+                # keys of the catalog indexes
+                "catalog_shard": catalog_shard(product["id"], index_shards),
+                "title_lower": product["title"].lower(),
+            })
+            stocks_writer.put_item(Item={"product_id": product["id"], "count": product["count"]})
+            written += 1
+            if on_progress and written % PROGRESS_EVERY == 0:
+                on_progress(PROGRESS_EVERY)
+    if on_progress and written % PROGRESS_EVERY:
+        on_progress(written % PROGRESS_EVERY)
+    return written
+
+
+def create_tables(resource, products_table_name: str, stocks_table_name: str, meta_table_name: str = None) -> None:
+    existing = set(resource.meta.client.list_tables()["TableNames"])
+    tables = [(products_table_name, "id"), (stocks_table_name, "product_id")]
+    if meta_table_name:
+        tables.append((meta_table_name, "id"))
+    for name, key in tables:
+        if name in existing:
+            continue
+        table_kwargs = {}
+        if name == products_table_name:
+            table_kwargs["GlobalSecondaryIndexes"] = [
+                {
+                    "IndexName": index_name,
+                    "KeySchema": [
+                        {"AttributeName": "catalog_shard", "KeyType": "HASH"},
+                        {"AttributeName": sort_key, "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+                for index_name, sort_key, _ in CATALOG_INDEXES
+            ]
+            attributes = [("id", "S"), ("catalog_shard", "N")] + [(sort_key, kind) for _, sort_key, kind in CATALOG_INDEXES]
+        else:
+            attributes = [(key, "S")]
+        resource.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": attribute, "AttributeType": kind} for attribute, kind in attributes],
+            BillingMode="PAY_PER_REQUEST",
+            **table_kwargs,
+        ).wait_until_exists()
+
+
+def bump_catalog_version(resource, meta_table_name: str) -> None:
+    """Tell GET /products the catalog changed, as the product service's write paths do"""
+    resource.Table(meta_table_name).update_item(
+        Key={"id": "catalog"},
+        UpdateExpression="ADD #version :one",
+        ExpressionAttributeNames={"#version": "version"},
+        ExpressionAttributeValues={":one": 1},
+    )
+
+
+def connect(options: Dict[str, Any]):
+    # each process needs its own session, boto3 sessions are not shared across processes
+    session = boto3.session.Session()
+    return session.resource("dynamodb", region_name=options["region"], endpoint_url=options["endpoint_url"])
+
+
+_counter = None
+
+
+def _init_worker(counter) -> None:
+    global _counter
+    _counter = counter
+
+
+def _worker(task) -> int:
+    options, shard, counter = task["options"], task["shard"], _counter
+    resource = connect(options)
+    products = shard if isinstance(shard, list) else synthetic_products(*shard)
+
+    def on_progress(count):
+        with counter.get_lock():
+            counter.value += count
+
+    return write_products(
+        resource.Table(options["products_table"]),
+        resource.Table(options["stocks_table"]),
+        products,
+        RateLimiter(options["rate"] / options["processes"]),
+        on_progress,
+        options["index_shards"],
+    )
+
+
+def seed(options: Dict[str, Any]) -> Dict[str, Any]:
+    if options["source"]:
+        products = load_products(options["source"])
+        total = len(products)
+        shards = [products[i::options["processes"]] for i in range(options["processes"])]
+    else:
+        total = options["synthetic"]
+        step = max(1, -(-total // options["processes"]))
+        shards = [(start, min(start + step, total)) for start in range(0, total, step)]
+
+    if options["create_tables"]:
+        create_tables(connect(options), options["products_table"], options["stocks_table"], options["meta_table"])
+
+    counter = multiprocessing.Value("q", 0)
+    started = time.monotonic()
+    with multiprocessing.Pool(options["processes"], initializer=_init_worker, initargs=(counter,)) as pool:
+        result = pool.map_async(_worker, [{"options": options, "shard": shard} for shard in shards])
+        while not result.ready():
+            result.wait(options["report_every"])
+            elapsed = time.monotonic() - started
+            done = counter.value
+            print(f"{done}/{total} products, {done * WRITES_PER_PRODUCT / elapsed:.0f} writes/s", flush=True)
+        written = sum(result.get())
+
+    if options["meta_table"] and written:
+        bump_catalog_version(connect(options), options["meta_table"])
+
+    elapsed = time.monotonic() - started
+    return {
+        "products": written,
+        "writes": written * WRITES_PER_PRODUCT,
+        "seconds": round(elapsed, 2),
+        "products_per_sec": round(written / elapsed, 1) if elapsed else None,
+        "writes_per_sec": round(written * WRITES_PER_PRODUCT / elapsed, 1) if elapsed else None,
+    }
+
+
+def parse_args(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--source", help="JSON or CSV file with products")
+    source.add_argument("--synthetic", type=int, help="number of synthetic products to generate")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rate", type=float, default=0, help="max writes per second across all processes, 0 = unlimited")
+    parser.add_argument("--region", default="us-east-2")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local or moto server URL")
+    parser.add_argument("--products-table", default="products")
+    parser.add_argument("--stocks-table", default="stocks")
+    parser.add_argument("--meta-table", help="catalog_meta table whose version is bumped after seeding")
+    parser.add_argument("--create-tables", action="store_true", help="create missing tables first")
+    parser.add_argument("--index-shards", type=int, default=CATALOG_INDEX_SHARDS,
+                        help="shards of the catalog indexes, as CATALOG_INDEX_SHARDS of the product service")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between progress lines")
+    options = vars(parser.parse_args(argv))
+    options["processes"] = max(1, options["processes"])
+    return options
+
+
+if __name__ == "__main__":
+    print(json.dumps(seed(parse_args()), indent=2))
@@ -0,0 +1,52 @@
+# tests/test_seed.py
+from decimal import Decimal
+
+import boto3
+import pytest
+from boto3.dynamodb.conditions import Key
+from moto import mock_dynamodb
+
+from seed import PROGRESS_EVERY, catalog_shard, create_tables, normalize, synthetic_products, write_products
+
+
+@pytest.fixture
+def resource(monkeypatch):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SECURITY_TOKEN', 'AWS_SESSION_TOKEN'):
+        monkeypatch.setenv(name, 'testing')
+    with mock_dynamodb():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        create_tables(resource, 'products', 'stocks', 'catalog_meta')
+        yield resource
+
+
+def test_write_products_writes_index_keys_and_stock_counts(resource):
+    products = list(synthetic_products(0, 150))
+    progress = []
+
+    written = write_products(resource.Table('products'), resource.Table('stocks'), products,
+                             on_progress=progress.append)
+
+    assert written == 150
+    assert progress == [PROGRESS_EVERY, 150 - PROGRESS_EVERY]
+    product = products[7]
+    item = resource.Table('products').get_item(Key={'id': product['id']})['Item']
+    assert item['count'] == product['count'] == 7
+    assert item['catalog_shard'] == catalog_shard(product['id'])
+    assert item['title_lower'] == 'synthetic product 7'
+    assert resource.Table('stocks').get_item(Key={'product_id': product['id']})['Item']['count'] == 7
+
+
+def test_seeded_products_are_found_through_the_catalog_indexes(resource):
+    products = [normalize({'Title': 'Desk Lamp', 'Description': 'Bright', 'Price': '12.50', 'Count': '3'})]
+    write_products(resource.Table('products'), resource.Table('stocks'), products, index_shards=4)
+
+    shard = catalog_shard(products[0]['id'])
+    by_title = resource.Table('products').query(
+        IndexName='ByTitle', KeyConditionExpression=Key('catalog_shard').eq(shard) & Key('title_lower').begins_with('desk')
+    )['Items']
+    by_price = resource.Table('products').query(
+        IndexName='ByPrice', KeyConditionExpression=Key('catalog_shard').eq(shard) & Key('price').lte(Decimal('20'))
+    )['Items']
+
+    assert [item['id'] for item in by_title] == [item['id'] for item in by_price] == [products[0]['id']]
+    assert by_title[0]['price'] == Decimal('12.50')
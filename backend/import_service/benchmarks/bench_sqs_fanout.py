@@ -0,0 +1,85 @@
+"""Rows/sec of the CSV -> SQS fan-out under moto: one send_message per row vs SqsBatchSender.
+
+moto has no network, so --latency-ms adds a simulated round trip to every SQS call. moto's
+own per-message bookkeeping is slow and grows with queue depth, which caps both modes; keep
+--rows modest and read request counts alongside rows/sec.
+
+    PYTHONPATH=. python benchmarks/bench_sqs_fanout.py --rows 1000 --latency-ms 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import boto3
+from moto import mock_sqs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'functions'))
+
+from sqs_batcher import SqsBatchSender  # noqa: E402
+
+
+def make_rows(count):
+    return [
+        {'Title': f'Product {i}', 'Description': f'Synthetic product {i}', 'Price': '10.50', 'Count': str(i % 50)}
+        for i in range(count)
+    ]
+
+
+class CallCounter:
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+
+def send_one_by_one(sqs, queue_url, rows):
+    for row in rows:
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(row))
+
+
+def send_batched(sqs, queue_url, rows, workers):
+    with SqsBatchSender(sqs, queue_url, max_workers=workers) as sender:
+        for row in rows:
+            sender.send(json.dumps(row))
+
+
+def run(rows_count, latency_ms, workers):
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    rows = make_rows(rows_count)
+    results = {}
+    with mock_sqs():
+        sqs = boto3.client('sqs', region_name='us-east-1')
+        counter = CallCounter(latency_ms)
+        sqs.meta.events.register('before-call.sqs.*', counter)
+        for name, send in (
+            ('send_message', lambda url: send_one_by_one(sqs, url, rows)),
+            ('send_message_batch', lambda url: send_batched(sqs, url, rows, workers)),
+        ):
+            queue_url = sqs.create_queue(QueueName=f'bench-{name.replace("_", "-")}')['QueueUrl']
+            counter.calls = 0
+            started = time.perf_counter()
+            send(queue_url)
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                'seconds': round(elapsed, 3),
+                'rows_per_sec': round(rows_count / elapsed, 1),
+                'sqs_requests': counter.calls,
+            }
+    results['speedup'] = round(results['send_message_batch']['rows_per_sec'] / results['send_message']['rows_per_sec'], 1)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.latency_ms, args.workers), indent=2))
@@ -11,6 +11,12 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# structured logger settings shared by every function; DEBUG lines carry payloads
+LOGGING_ENVIRONMENT = {
+    "LOG_LEVEL": "INFO",
+    "LOG_SAMPLE_RATE": "1.0",
+}
+
 
 class ImportServiceStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
@@ -37,7 +43,8 @@ class ImportServiceStack(Stack):
             handler='import_products_file.handler',
             code=lambda_.Code.from_asset('src/functions'),
             environment={
-                "BUCKET_NAME": "bucket-for-files-import",        
+                "BUCKET_NAME": "bucket-for-files-import",
+                **LOGGING_ENVIRONMENT,
             }
         )
 
@@ -52,7 +59,9 @@ class ImportServiceStack(Stack):
                 "BUCKET_NAME": "bucket-for-files-import",
                 "PRODUCTS_TABLE_NAME": "products",
                 "STOCKS_TABLE_NAME": "stocks",
-                "SQS_QUEUE_URL": "https://sqs.us-east-2.amazonaws.com/904233116615/catalogItemsQueue"
+                "SQS_QUEUE_URL": "https://sqs.us-east-2.amazonaws.com/904233116615/catalogItemsQueue",
+                "PACK_MAX_ROWS": "100",
+                **LOGGING_ENVIRONMENT,
             }
         )
 
@@ -0,0 +1,42 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+from metrics import instrument_client
+
+# One pooled, keep-alive connection set per service for the lifetime of the container.
+# Adaptive retries back off client-side when SQS or S3 start throttling.
+CLIENT_CONFIG = Config(
+    max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '32')),
+    tcp_keepalive=True,
+    connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '2')),
+    read_timeout=float(os.environ.get('AWS_READ_TIMEOUT_SECONDS', '10')),
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': int(os.environ.get('AWS_MAX_ATTEMPTS', '5')),
+    },
+)
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """Client for service_name, built once per container on first use"""
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(service_name, config=CLIENT_CONFIG)
+                instrument_client(client)
+                _clients[service_name] = client
+    return client
+
+
+def reset_clients() -> None:
+    """Drop cached clients, mainly for tests"""
+    with _lock:
+        _clients.clear()
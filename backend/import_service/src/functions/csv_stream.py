@@ -0,0 +1,33 @@
+import codecs
+import csv
+from typing import Dict, Iterator
+
+# Bytes pulled from the S3 StreamingBody per read; memory use stays around this size
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_lines(body, encoding: str = 'utf-8', chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield decoded lines (with their line endings) from a binary stream such as an S3 StreamingBody.
+
+    Bytes are decoded incrementally, so multi-byte characters split across chunks are handled
+    and only one chunk plus a partial line is held in memory at any time.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    while True:
+        chunk = body.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        # the last piece has no line ending yet, keep it until the next chunk arrives
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(body, encoding: str = 'utf-8', chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, str]]:
+    """Parse CSV rows straight from a binary stream without reading the whole object"""
+    return csv.DictReader(iter_lines(body, encoding, chunk_size))
@@ -1,23 +1,30 @@
 from decimal import Decimal
 import json
 import os
-import boto3
-import csv
-import io
 from typing import Any
 import uuid
+from clients import get_client
+from csv_stream import iter_csv_rows
+from logger import get_logger
+from metrics import instrumented, metrics
+from row_packing import RowPacker
+from sqs_batcher import SqsBatchSender
 
-s3_client = boto3.client('s3')
 BUCKET_NAME = os.environ['BUCKET_NAME']
 
-dynamodb = boto3.client('dynamodb')
-products_table = os.environ['PRODUCTS_TABLE_NAME']
-stocks_table = os.environ['STOCKS_TABLE_NAME']
-queue_url = os.environ['SQS_QUEUE_URL']
+logger = get_logger('import_file_parser')
 
-def handler(event, context: Any):
-    s3_client = boto3.client('s3')
-    sqs_client = boto3.client('sqs')
+def source_file(bucket, key, s3_object):
+    """The identity of the file the rows come from; its ETag tells apart a file uploaded
+    again under the same key with other content"""
+    etag = str(s3_object.get('ETag') or '').strip('"')
+    return f"s3://{bucket}/{key}#{etag}" if etag else f"s3://{bucket}/{key}"
+
+@instrumented('import_file_parser')
+def handler(event, context: Any, s3_client_mock = None, sqs_client_mock = None):
+    s3_client = s3_client_mock if s3_client_mock else get_client('s3')
+    sqs_client = sqs_client_mock if sqs_client_mock else get_client('sqs')
+    queue_url = os.environ['SQS_QUEUE_URL']
     
     try:
         # Get bucket and key from the S3 event
@@ -25,41 +32,40 @@ def handler(event, context: Any):
             bucket = record['s3']['bucket']['name']
             key = record['s3']['object']['key']
 
-            print(f"Processing file: {key} from bucket: {bucket}")
+            logger.info('Processing file', key=key, bucket=bucket)
 
             # Get the object from S3
             try:
                 response = s3_client.get_object(Bucket=bucket, Key=key)
-                # Create a stream from the S3 object body
-                file_content = response['Body'].read().decode('utf-8')
-                csv_stream = io.StringIO(file_content)
 
-                # Parse CSV
-                csv_reader = csv.DictReader(csv_stream)
+                # Parse CSV incrementally straight from the S3 stream
+                csv_reader = iter_csv_rows(response['Body'])
                                 
-                # Process each row
-                for row in csv_reader:
-                    # Send each row to SQS
-                    sqs_client.send_message(
-                        QueueUrl=queue_url,
-                        MessageBody=json.dumps(row)
-                    )
+                # Pack many rows per message and send the messages to SQS in batches
+                # of 10 from a pool of concurrent senders; rows are parsed and sent as they
+                # stream in, so both are timed as one stage
+                with metrics.span('parse_and_send'):
+                    with SqsBatchSender(sqs_client, queue_url) as sender:
+                        with RowPacker(sender.send, source_file=source_file(bucket, key, response)) as packer:
+                            for row in csv_reader:
+                                packer.add(row)
 
                 # After successful processing, copy to parsed folder and delete from uploaded
                 try:
-                    # Copy to parsed folder
-                    new_key = key.replace('uploaded/', 'parsed/')
-                    s3_client.copy_object(
-                        Bucket=bucket,
-                        CopySource={'Bucket': bucket, 'Key': key},
-                        Key=new_key
-                    )
+                    with metrics.span('move'):
+                        # Copy to parsed folder
+                        new_key = key.replace('uploaded/', 'parsed/')
+                        s3_client.copy_object(
+                            Bucket=bucket,
+                            CopySource={'Bucket': bucket, 'Key': key},
+                            Key=new_key
+                        )
 
-                    # Delete from uploaded folder
-                    s3_client.delete_object(
-                        Bucket=bucket,
-                        Key=key
-                    )
+                        # Delete from uploaded folder
+                        s3_client.delete_object(
+                            Bucket=bucket,
+                            Key=key
+                        )
 
                     #print(f"File processed and moved to: {new_key}") - no logs about parsing to CloudWatch as per task-6
 
@@ -68,7 +74,7 @@ def handler(event, context: Any):
                     raise move_error
 
             except Exception as e:
-                print(f"Error processing file {key}: {str(e)}")
+                logger.error('Failed to process file', key=key, error=repr(e))
                 raise e
 
         return {
@@ -83,7 +89,7 @@ def handler(event, context: Any):
         }
 
     except Exception as error:
-        print(f"Error: {str(error)}")
+        logger.error('Failed to import files', error=repr(error))
         return {
             "statusCode": 500,
             "headers": {
@@ -1,20 +1,25 @@
 import json
 from typing import Any, Dict
-import boto3
 import os
+from clients import get_client
+from logger import get_logger
+from metrics import instrumented, metrics
 
-# Initialize S3 client
-s3_client = boto3.client('s3')
+# Initialize S3 client once per container
+s3_client = get_client('s3')
 BUCKET_NAME = os.environ['BUCKET_NAME']
 UPLOAD_FOLDER = 'uploaded'
 
+logger = get_logger('import_products_file')
+
+@instrumented('import_products_file')
 def handler(event, context: Any):
     """
     Lambda function generates a signed URL for uploading CSV files to S3
     Parameters: 'name'  in query string
     Returns: a signed URL as a string
     """
-    print(f"Incoming request: {json.dumps(event)}")
+    logger.debug('Incoming request', event=lambda: event)
 
     try:
         # Get filename from query parameters
@@ -48,15 +53,16 @@ def handler(event, context: Any):
 
         # Generate pre-signed URL
         try:
-            presigned_url = s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': BUCKET_NAME,
-                    'Key': f"{UPLOAD_FOLDER}/{file_name}",
-                    'ContentType': 'text/csv'
-                },
-                ExpiresIn=3600  # URL expires in 1 hour
-            )
+            with metrics.span('presign'):
+                presigned_url = s3_client.generate_presigned_url(
+                    'put_object',
+                    Params={
+                        'Bucket': BUCKET_NAME,
+                        'Key': f"{UPLOAD_FOLDER}/{file_name}",
+                        'ContentType': 'text/csv'
+                    },
+                    ExpiresIn=3600  # URL expires in 1 hour
+                )
 
             return {
                 "statusCode": 200,
@@ -68,7 +74,7 @@ def handler(event, context: Any):
             }
 
         except Exception as e:
-            print(f"Error generating pre-signed URL: {str(e)}")
+            logger.error('Failed to generate pre-signed URL', error=repr(e))
             return {
                 "statusCode": 500,
                 "headers": {
@@ -81,7 +87,7 @@ def handler(event, context: Any):
             }
 
     except Exception as error:
-        print(f"Error: {str(error)}")
+        logger.error('Failed to handle import request', error=repr(error))
         return {
             "statusCode": 500,
             "headers": {
@@ -0,0 +1,120 @@
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# share of DEBUG and INFO lines that are written; warnings and errors are never sampled
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '1.0'))
+# longest serialized value written for a single field
+LOG_MAX_FIELD_CHARS = int(os.environ.get('LOG_MAX_FIELD_CHARS', '1024'))
+# lists and dicts are cut to this many entries before they are serialized at all
+LOG_MAX_ITEMS = int(os.environ.get('LOG_MAX_ITEMS', '10'))
+
+
+def _shorten(value: Any, max_items: int) -> Any:
+    """Cut long lists and dicts down before serializing, so a huge payload is never dumped in full"""
+    if isinstance(value, (list, tuple, set)) and len(value) > max_items:
+        return {'items': list(value)[:max_items], 'total': len(value), 'truncated': True}
+    if isinstance(value, dict) and len(value) > max_items:
+        head = dict(list(value.items())[:max_items])
+        return {'items': head, 'total': len(value), 'truncated': True}
+    return value
+
+
+def truncate(value: Any, max_chars: int = LOG_MAX_FIELD_CHARS, max_items: int = LOG_MAX_ITEMS) -> Any:
+    """Return value as it should appear in a log line: small values as they are, large ones cut"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        text = value
+    else:
+        value = _shorten(value, max_items)
+        text = json.dumps(value, default=str)
+        if len(text) <= max_chars:
+            return json.loads(text)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...(truncated {len(text) - max_chars} chars)"
+
+
+class StructuredLogger:
+    """Write one JSON object per log line to stdout, where Lambda ships it to CloudWatch.
+
+    Fields may be given as zero-argument callables; they are only called, and anything is
+    only serialized, when the line is actually written:
+
+        logger.debug('Fetched products', count=len(products), products=lambda: products)
+    """
+
+    def __init__(self, name: str, level: str = LOG_LEVEL, sample_rate: float = LOG_SAMPLE_RATE,
+                 max_field_chars: int = LOG_MAX_FIELD_CHARS, max_items: int = LOG_MAX_ITEMS):
+        self.name = name
+        self.level = LEVELS.get(level.upper(), INFO)
+        self.sample_rate = sample_rate
+        self.max_field_chars = max_field_chars
+        self.max_items = max_items
+        self.context = {}
+
+    def bind(self, **context: Any) -> 'StructuredLogger':
+        """Add fields, such as the request id, to every line written by this logger"""
+        self.context.update(context)
+        return self
+
+    def clear_context(self) -> None:
+        self.context = {}
+
+    def is_enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def debug(self, message: str, sample_rate: float = None, **fields: Any) -> None:
+        self.log(DEBUG, message, sample_rate, fields)
+
+    def info(self, message: str, sample_rate: float = None, **fields: Any) -> None:
+        self.log(INFO, message, sample_rate, fields)
+
+    def warning(self, message: str, **fields: Any) -> None:
+        self.log(WARNING, message, 1.0, fields)
+
+    def error(self, message: str, **fields: Any) -> None:
+        self.log(ERROR, message, 1.0, fields)
+
+    def log(self, level: int, message: str, sample_rate: float = None, fields: Dict[str, Any] = None) -> bool:
+        """Write the line if the level is enabled and it is sampled in; returns whether it was written"""
+        if not self.is_enabled_for(level):
+            return False
+        rate = self.sample_rate if sample_rate is None else sample_rate
+        if level < WARNING and rate < 1.0 and random.random() >= rate:
+            return False
+        record = {
+            'timestamp': round(time.time(), 3),
+            'level': LEVEL_NAMES.get(level, str(level)),
+            'logger': self.name,
+            'message': message,
+        }
+        if rate < 1.0:
+            record['sampleRate'] = rate
+        for key, value in {**self.context, **(fields or {})}.items():
+            record[key] = truncate(self._resolve(value), self.max_field_chars, self.max_items)
+        # looked up on every write so redirected stdout (tests, benchmarks) is honoured
+        sys.stdout.write(json.dumps(record, default=str) + '\n')
+        return True
+
+    @staticmethod
+    def _resolve(value: Any) -> Any:
+        if callable(value):
+            try:
+                return value()
+            except Exception as error:
+                return f"<failed to format: {error!r}>"
+        return value
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
@@ -0,0 +1,83 @@
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+# Packed messages carry many CSV rows; catalog_batch_process still accepts plain one-row messages
+PACKED_MESSAGE_VERSION = 2
+PACK_MAX_ROWS = int(os.environ.get('PACK_MAX_ROWS', '100'))
+# stay well under the 256 KiB SQS message limit so several packed messages fit in one batch
+PACK_MAX_BYTES = int(os.environ.get('PACK_MAX_BYTES', str(64 * 1024)))
+
+_SUFFIX = ']}'
+
+
+def _source(source_file: Optional[str], first_row: int) -> Optional[Dict[str, Any]]:
+    # the file and the number of the message's first data row (from 1), from which
+    # catalog_batch_process derives product ids that stay the same when a file is parsed again
+    return {'file': source_file, 'firstRow': first_row} if source_file else None
+
+
+def _prefix(source: Optional[Dict[str, Any]]) -> str:
+    if source is None:
+        return '{"version":%d,"rows":[' % PACKED_MESSAGE_VERSION
+    return '{"version":%d,"source":%s,"rows":[' % (PACKED_MESSAGE_VERSION, json.dumps(source, separators=(',', ':')))
+
+
+def pack_rows(rows: List[Dict[str, Any]], source_file: Optional[str] = None, first_row: int = 1) -> str:
+    """Build one packed message body from rows"""
+    message = {'version': PACKED_MESSAGE_VERSION}
+    source = _source(source_file, first_row)
+    if source:
+        message['source'] = source
+    message['rows'] = rows
+    return json.dumps(message, separators=(',', ':'))
+
+
+class RowPacker:
+    """Collect rows into packed message bodies of up to max_rows rows and max_bytes bytes.
+
+    Rows are encoded once as they arrive, so the size of the pending message is known
+    without re-serializing it. Every finished body is handed to send.
+    """
+
+    def __init__(self, send: Callable[[str], None], max_rows: int = PACK_MAX_ROWS,
+                 max_bytes: int = PACK_MAX_BYTES, source_file: Optional[str] = None):
+        self.send = send
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.source_file = source_file
+        self.messages = 0
+        self.rows = 0
+        self._encoded = []
+        self._prefix = _prefix(_source(source_file, 1))
+        self._size = len(self._prefix.encode('utf-8')) + len(_SUFFIX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def add(self, row: Dict[str, Any]) -> None:
+        encoded = json.dumps(row, separators=(',', ':'))
+        # one extra byte for the separating comma
+        size = len(encoded.encode('utf-8')) + 1
+        if self._encoded and (len(self._encoded) >= self.max_rows or self._size + size > self.max_bytes):
+            self.flush()
+        if not self._encoded:
+            # the next message starts with this row
+            self._prefix = _prefix(_source(self.source_file, self.rows + 1))
+            self._size = len(self._prefix.encode('utf-8')) + len(_SUFFIX)
+        self._encoded.append(encoded)
+        self._size += size
+        self.rows += 1
+
+    def flush(self) -> None:
+        if not self._encoded:
+            return
+        body = self._prefix + ','.join(self._encoded) + _SUFFIX
+        self._encoded = []
+        self.messages += 1
+        self.send(body)
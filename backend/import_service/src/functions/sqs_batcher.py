@@ -0,0 +1,114 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# SendMessageBatch limits: 10 entries and 256 KiB of payload per call
+SQS_BATCH_MAX_ENTRIES = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+SQS_SENDER_WORKERS = int(os.environ.get('SQS_SENDER_WORKERS', '8'))
+SQS_SEND_MAX_RETRIES = int(os.environ.get('SQS_SEND_MAX_RETRIES', '5'))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+
+
+class SqsSendError(Exception):
+    """Raised when messages could not be delivered to the queue"""
+
+
+class SqsBatchSender:
+    """Group message bodies into SendMessageBatch calls and send them from a bounded pool of workers.
+
+    At most twice as many batches as there are workers are in flight at once, so a producer
+    streaming rows in keeps constant memory. Only the entries reported in Failed are retried.
+    """
+
+    def __init__(self, sqs_client, queue_url: str, max_workers: int = SQS_SENDER_WORKERS,
+                 max_retries: int = SQS_SEND_MAX_RETRIES):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.max_retries = max_retries
+        self.sent = 0
+        self.batches = 0
+        self._entries = []
+        self._batch_bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_workers * 2)
+        self._errors = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        return False
+
+    def send(self, body: str) -> None:
+        size = len(body.encode('utf-8'))
+        if size > SQS_BATCH_MAX_BYTES:
+            raise SqsSendError(f"Message of {size} bytes exceeds the SQS limit of {SQS_BATCH_MAX_BYTES} bytes")
+        if len(self._entries) == SQS_BATCH_MAX_ENTRIES or self._batch_bytes + size > SQS_BATCH_MAX_BYTES:
+            self.flush()
+        self._entries.append({'Id': str(len(self._entries)), 'MessageBody': body})
+        self._batch_bytes += size
+
+    def flush(self) -> None:
+        """Hand the current batch to a sender, blocking while too many batches are in flight"""
+        if not self._entries:
+            return
+        self._raise_if_failed()
+        entries = self._entries
+        self._entries = []
+        self._batch_bytes = 0
+        self._slots.acquire()
+        future = self._executor.submit(self._send_batch, entries)
+        future.add_done_callback(self._on_done)
+
+    def close(self) -> None:
+        """Send what is left and wait for every batch to be delivered"""
+        try:
+            self.flush()
+        finally:
+            # waits for the workers, including their done callbacks
+            self._executor.shutdown(wait=True)
+        self._raise_if_failed()
+
+    def _on_done(self, future) -> None:
+        self._slots.release()
+        if future.cancelled():
+            # cancelled by __exit__ after an error, which is already on its way up
+            return
+        error = future.exception()
+        with self._lock:
+            if error is not None:
+                self._errors.append(error)
+            else:
+                self.sent += future.result()
+                self.batches += 1
+
+    def _raise_if_failed(self) -> None:
+        if self._errors:
+            raise self._errors[0]
+
+    def _send_batch(self, entries: List[Dict[str, str]]) -> int:
+        pending = entries
+        for attempt in range(self.max_retries + 1):
+            response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=pending)
+            failed = response.get('Failed') or []
+            if not failed:
+                return len(entries)
+            sender_faults = [failure for failure in failed if failure.get('SenderFault')]
+            if sender_faults:
+                # the request itself is wrong, sending it again will not help
+                raise SqsSendError(f"SQS rejected {len(sender_faults)} messages: {sender_faults[0].get('Message')}")
+            failed_ids = {failure['Id'] for failure in failed}
+            pending = [entry for entry in pending if entry['Id'] in failed_ids]
+            if attempt < self.max_retries:
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))))
+        raise SqsSendError(f"{len(pending)} messages still failing after {self.max_retries} retries")
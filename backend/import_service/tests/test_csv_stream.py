@@ -0,0 +1,71 @@
+# tests/test_csv_stream.py
+import io
+import os
+import subprocess
+import sys
+import textwrap
+
+from src.functions.csv_stream import iter_csv_rows, iter_lines
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'src', 'functions')
+# size of the synthetic upload used by the memory budget test
+LARGE_FILE_MB = int(os.environ.get('CSV_STREAM_TEST_MB', '300'))
+MEMORY_BUDGET_KB = 16 * 1024
+
+
+def test_multibyte_characters_split_across_chunks():
+    data = 'Title,Description,Price,Count\nCrème brûlée,Süß ✓,5,1\n'.encode('utf-8')
+
+    rows = list(iter_csv_rows(io.BytesIO(data), chunk_size=3))
+
+    assert rows == [{'Title': 'Crème brûlée', 'Description': 'Süß ✓', 'Price': '5', 'Count': '1'}]
+
+
+def test_quoted_newlines_and_missing_trailing_newline():
+    data = b'Title,Description,Price,Count\r\n"Donut","line one\nline two",7.05,15\r\nCake,Plain,1,2'
+
+    rows = list(iter_csv_rows(io.BytesIO(data), chunk_size=8))
+
+    assert [row['Description'] for row in rows] == ['line one\nline two', 'Plain']
+    assert rows[1]['Count'] == '2'
+
+
+def test_iter_lines_keeps_line_endings():
+    assert list(iter_lines(io.BytesIO(b'a\nb\n\nc'), chunk_size=2)) == ['a\n', 'b\n', '\n', 'c']
+
+
+def test_large_file_parses_within_fixed_memory_budget():
+    """Stream a multi-hundred-MB CSV and check peak RSS grows by less than a fixed budget"""
+    script = textwrap.dedent(f"""
+        import resource, sys
+        sys.path.insert(0, {os.path.abspath(FUNCTIONS_DIR)!r})
+        from csv_stream import iter_csv_rows
+
+        class SyntheticBody:
+            row = b'"Product title",' + b'description ' * 12 + b',10.50,5\\n'
+
+            def __init__(self, size):
+                self.remaining = size
+                self.header_sent = False
+
+            def read(self, amount):
+                if not self.header_sent:
+                    self.header_sent = True
+                    return b'Title,Description,Price,Count\\n'
+                if self.remaining <= 0:
+                    return b''
+                rows = max(1, min(amount, self.remaining) // len(self.row))
+                self.remaining -= rows * len(self.row)
+                return self.row * rows
+
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        count = sum(1 for _ in iter_csv_rows(SyntheticBody({LARGE_FILE_MB} * 1024 * 1024)))
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(count, after - before)
+    """)
+
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    rows, rss_growth_kb = map(int, result.stdout.split())
+
+    assert rows > 1_000_000
+    assert rss_growth_kb < MEMORY_BUDGET_KB
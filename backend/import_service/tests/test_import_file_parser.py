@@ -1,43 +1,41 @@
 # tests/test_import_file_parser.py
+import io
 import os
 import unittest
 from unittest.mock import patch, MagicMock
 import json
+from botocore.response import StreamingBody
 
-os.environ.clear()
-os.environ.update({
+TEST_ENV = {
     'BUCKET_NAME': 'test-bucket',
     'PRODUCTS_TABLE_NAME': 'test-products-table',
-    'STOCKS_TABLE_NAME': 'test-stocks-table'
-})
+    'STOCKS_TABLE_NAME': 'test-stocks-table',
+    'SQS_QUEUE_URL': 'https://sqs.us-east-1.amazonaws.com/123456789012/test-queue'
+}
 
-from backend.product_service.tests.test_catalog_batch_process import mock_aws_clients
-from src.functions.import_file_parser import handler
+with patch.dict(os.environ, TEST_ENV):
+    from src.functions.import_file_parser import handler
 
 class TestImportFileParser(unittest.TestCase):
     def setUp(self):
+        self.env = patch.dict(os.environ, TEST_ENV)
+        self.env.start()
         print("\nVerifying environment variables:")
         print(f"BUCKET_NAME: {os.environ.get('BUCKET_NAME')}")
-        print(f"PRODUCTS_TABLE_NAME: {os.environ.get('PRODUCTS_TABLE_NAME')}")
-        print(f"STOCKS_TABLE_NAME: {os.environ.get('STOCKS_TABLE_NAME')}")
+        print(f"SQS_QUEUE_URL: {os.environ.get('SQS_QUEUE_URL')}")
 
-    @patch('src.functions.import_file_parser.s3_client')
-    @patch('src.functions.import_file_parser.dynamodb')
-    def test_successful_file_processing(self, mock_dynamodb, mock_s3):
+    def test_successful_file_processing(self):
+        mock_s3 = MagicMock()
+        mock_sqs = MagicMock()
+        mock_sqs.send_message_batch.return_value = {'Successful': [{'Id': '0'}], 'Failed': []}
         try:
             # Mock CSV content with proper headers and data
             csv_content = 'Title,Description,Price,Count\nTest Product,Test Description,10.00,5'
             
             # Mock S3 response
-            mock_body = MagicMock()
-            mock_body.read.return_value = csv_content.encode('utf-8')
+            raw_content = csv_content.encode('utf-8')
             mock_s3.get_object.return_value = {
-                'Body': mock_body
-            }
-
-            # Mock DynamoDB transact_write_items
-            mock_dynamodb.transact_write_items.return_value = {
-                'ResponseMetadata': {'HTTPStatusCode': 200}
+                'Body': StreamingBody(io.BytesIO(raw_content), len(raw_content))
             }
 
             # Mock S3 operations
@@ -64,7 +62,7 @@ class TestImportFileParser(unittest.TestCase):
             print("\nTest Configuration:")
             print(f"Event: {json.dumps(event)}")
             
-            response = handler(event, None)
+            response = handler(event, None, s3_client_mock=mock_s3, sqs_client_mock=mock_sqs)
             
             print(f"Response: {json.dumps(response)}")
             if response['statusCode'] == 500:
@@ -79,16 +77,19 @@ class TestImportFileParser(unittest.TestCase):
             )
             
             # Verify SQS send_message was called
-            mock_aws_clients['sqs'].send_message.assert_called_once()
-            call_args = mock_aws_clients['sqs'].send_message.call_args[1]
-            message_body = json.loads(call_args['MessageBody'])
+            mock_sqs.send_message_batch.assert_called_once()
+            call_args = mock_sqs.send_message_batch.call_args[1]
+            assert call_args['QueueUrl'] == TEST_ENV['SQS_QUEUE_URL']
+            assert len(call_args['Entries']) == 1
+            message_body = json.loads(call_args['Entries'][0]['MessageBody'])
+            assert message_body['version'] == 2
             
-            assert message_body == {
+            assert message_body['rows'] == [{
                 'Title': 'Test Product',
                 'Description': 'Test Description',
-                'Price': '100',
+                'Price': '10.00',
                 'Count': '5'
-            }
+            }]
             
             # Verify file movement
             mock_s3.copy_object.assert_called_once()
@@ -96,7 +97,7 @@ class TestImportFileParser(unittest.TestCase):
 
             print("\nMock Calls:")
             print(f"get_object calls: {mock_s3.get_object.mock_calls}")
-            print(f"DynamoDB transact_write_items calls: {mock_dynamodb.transact_write_items.mock_calls}")
+            print(f"SQS send_message_batch calls: {mock_sqs.send_message_batch.mock_calls}")
             print(f"copy_object calls: {mock_s3.copy_object.mock_calls}")
             print(f"delete_object calls: {mock_s3.delete_object.mock_calls}")
 
@@ -105,7 +106,7 @@ class TestImportFileParser(unittest.TestCase):
             raise
 
     def tearDown(self):
-        os.environ.clear()
+        self.env.stop()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+# tests/test_row_packing.py
+import json
+
+from src.functions.row_packing import PACKED_MESSAGE_VERSION, RowPacker, pack_rows
+
+
+def make_row(i, description='Test Description'):
+    return {'Title': f'Product {i}', 'Description': description, 'Price': '10.00', 'Count': '5'}
+
+
+def test_rows_are_packed_up_to_max_rows():
+    bodies = []
+    with RowPacker(bodies.append, max_rows=10) as packer:
+        for i in range(25):
+            packer.add(make_row(i))
+
+    messages = [json.loads(body) for body in bodies]
+    assert [len(message['rows']) for message in messages] == [10, 10, 5]
+    assert all(message['version'] == PACKED_MESSAGE_VERSION for message in messages)
+    assert [row['Title'] for message in messages for row in message['rows']] == [f'Product {i}' for i in range(25)]
+    assert packer.rows == 25 and packer.messages == 3
+
+
+def test_packed_messages_stay_under_max_bytes():
+    bodies = []
+    with RowPacker(bodies.append, max_rows=1000, max_bytes=2048) as packer:
+        for i in range(50):
+            packer.add(make_row(i, description='ü' * 100))
+
+    assert len(bodies) > 1
+    assert all(len(body.encode('utf-8')) <= 2048 for body in bodies)
+    assert sum(len(json.loads(body)['rows']) for body in bodies) == 50
+
+
+def test_incremental_body_matches_pack_rows():
+    bodies = []
+    rows = [make_row(i) for i in range(3)]
+    with RowPacker(bodies.append) as packer:
+        for row in rows:
+            packer.add(row)
+
+    assert bodies == [pack_rows(rows)]
+
+
+def test_messages_name_their_file_and_first_row():
+    bodies = []
+    rows = [make_row(i) for i in range(5)]
+    with RowPacker(bodies.append, max_rows=2, source_file='s3://bucket/uploaded/products.csv#abc') as packer:
+        for row in rows:
+            packer.add(row)
+
+    messages = [json.loads(body) for body in bodies]
+    assert [message['source']['firstRow'] for message in messages] == [1, 3, 5]
+    assert all(message['source']['file'] == 's3://bucket/uploaded/products.csv#abc' for message in messages)
+    assert bodies[1] == pack_rows(rows[2:4], 's3://bucket/uploaded/products.csv#abc', first_row=3)
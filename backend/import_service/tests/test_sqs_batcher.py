@@ -0,0 +1,114 @@
+# tests/test_sqs_batcher.py
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.functions.sqs_batcher import SQS_BATCH_MAX_BYTES, SqsBatchSender, SqsSendError
+
+QUEUE_URL = 'https://sqs.us-east-1.amazonaws.com/123456789012/test-queue'
+
+
+def ok_response(QueueUrl, Entries):
+    return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('src.functions.sqs_batcher.time.sleep') as sleep:
+        yield sleep
+
+
+def sent_bodies(sqs):
+    return [entry['MessageBody'] for call in sqs.send_message_batch.call_args_list for entry in call.kwargs['Entries']]
+
+
+def test_rows_are_grouped_in_batches_of_ten():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = ok_response
+
+    with SqsBatchSender(sqs, QUEUE_URL, max_workers=4) as sender:
+        for i in range(25):
+            sender.send(json.dumps({'Title': f'Product {i}'}))
+
+    batch_sizes = sorted(len(call.kwargs['Entries']) for call in sqs.send_message_batch.call_args_list)
+    assert batch_sizes == [5, 10, 10]
+    assert sender.sent == 25
+    assert sorted(sent_bodies(sqs)) == sorted(json.dumps({'Title': f'Product {i}'}) for i in range(25))
+
+
+def test_batches_stay_under_payload_limit():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = ok_response
+    body = 'x' * (100 * 1024)
+
+    with SqsBatchSender(sqs, QUEUE_URL) as sender:
+        for _ in range(5):
+            sender.send(body)
+
+    for call in sqs.send_message_batch.call_args_list:
+        assert sum(len(entry['MessageBody']) for entry in call.kwargs['Entries']) <= SQS_BATCH_MAX_BYTES
+    assert sender.sent == 5
+
+
+def test_only_failed_entries_are_retried(no_sleep):
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = [
+        {'Successful': [{'Id': '0'}, {'Id': '2'}], 'Failed': [{'Id': '1', 'SenderFault': False, 'Code': 'InternalError'}]},
+        {'Successful': [{'Id': '1'}], 'Failed': []},
+    ]
+
+    with SqsBatchSender(sqs, QUEUE_URL, max_workers=1) as sender:
+        for body in ('a', 'b', 'c'):
+            sender.send(body)
+
+    retry = sqs.send_message_batch.call_args_list[1].kwargs['Entries']
+    assert retry == [{'Id': '1', 'MessageBody': 'b'}]
+    assert sender.sent == 3
+    no_sleep.assert_called_once()
+
+
+def test_persistent_failures_raise():
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {'Failed': [{'Id': '0', 'SenderFault': False}]}
+
+    with pytest.raises(SqsSendError):
+        with SqsBatchSender(sqs, QUEUE_URL, max_retries=2) as sender:
+            sender.send('a')
+
+    assert sqs.send_message_batch.call_count == 3
+
+
+def test_sender_faults_are_not_retried():
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {'Failed': [{'Id': '0', 'SenderFault': True, 'Message': 'bad'}]}
+
+    with pytest.raises(SqsSendError):
+        with SqsBatchSender(sqs, QUEUE_URL) as sender:
+            sender.send('a')
+
+    assert sqs.send_message_batch.call_count == 1
+
+
+def test_error_cancels_pending_batches_quietly(caplog):
+    import threading
+    release = threading.Event()
+
+    def slow_response(QueueUrl, Entries):
+        release.wait(5)
+        return ok_response(QueueUrl, Entries)
+
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = slow_response
+
+    with pytest.raises(RuntimeError, match='parser failed'):
+        with SqsBatchSender(sqs, QUEUE_URL, max_workers=1) as sender:
+            for i in range(11):
+                sender.send(str(i))
+            # the first batch is in flight, the second waits and is cancelled
+            sender.flush()
+            threading.Timer(0.1, release.set).start()
+            raise RuntimeError('parser failed')
+
+    assert sqs.send_message_batch.call_count == 1
+    assert not [record for record in caplog.records if record.name == 'concurrent.futures']
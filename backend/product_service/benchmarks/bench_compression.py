@@ -0,0 +1,82 @@
+"""Bytes saved and CPU spent compressing a GET /products body, per catalog size and encoding.
+
+The body is serialized the way get_products_list does it; each encoding is timed with
+compression.compress (best of --repeats) plus the base64 step API Gateway needs. 'cached'
+is what an unchanged catalog costs afterwards, served from the per-ETag compressed cache.
+br is only measured when the brotli package is installed.
+
+    python benchmarks/bench_compression.py --sizes 100,1000,10000,100000
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'functions'))
+
+import compression  # noqa: E402
+from serialization import dumps  # noqa: E402
+
+
+def make_body(size):
+    return dumps([
+        {'id': f'{i:08d}-5f1c-4a6b-9c1e-{i:012d}', 'title': f'Product {i}',
+         'description': f'Description of product {i}', 'price': (i % 9900) / 100 + 1, 'count': i % 100}
+        for i in range(size)
+    ]).encode('utf-8')
+
+
+def best_of(run, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def measure(data, encoding, repeats):
+    compress_seconds, encoded = best_of(lambda: compression.compress(data, encoding), repeats)
+    base64_seconds, _ = best_of(lambda: base64.b64encode(encoded), repeats)
+    return {
+        'bytes': len(encoded),
+        'base64Bytes': -(-len(encoded) // 3) * 4,
+        'ratio': round(len(data) / len(encoded), 1),
+        'saved': round(1 - len(encoded) / len(data), 3),
+        'compressMs': round(compress_seconds * 1000, 2),
+        'base64Ms': round(base64_seconds * 1000, 2),
+        'msPerMB': round((compress_seconds + base64_seconds) * 1000 / (len(data) / 1e6), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000,100000')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for size in [int(size) for size in args.sizes.split(',')]:
+        data = make_body(size)
+        row = {'identityBytes': len(data)}
+        for encoding in compression.SUPPORTED_ENCODINGS:
+            row[encoding] = measure(data, encoding, args.repeats)
+        response = {'statusCode': 200, 'headers': {'ETag': f'"v{size}"'}, 'body': data.decode('utf-8')}
+        compression.compress_response(dict(response, headers=dict(response['headers'])), 'gzip', min_bytes=0)
+        cached_seconds, _ = best_of(
+            lambda: compression.compress_response(dict(response, headers=dict(response['headers'])), 'gzip', min_bytes=0),
+            args.repeats
+        )
+        row['cachedMs'] = round(cached_seconds * 1000, 2)
+        results[size] = row
+    print(json.dumps({
+        'gzipLevel': compression.COMPRESSION_GZIP_LEVEL,
+        'brotliQuality': compression.COMPRESSION_BROTLI_QUALITY if compression.brotli else None,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Cost of the metrics instrumentation per AWS call and per invocation.
+
+AWS calls go to a botocore Stubber, so only the client-side work is measured: the same
+GetItem is timed on a plain client and on an instrumented one. The per-invocation cost is
+building and writing the EMF line for a typical get_products_list invocation.
+
+    python benchmarks/bench_metrics_overhead.py --calls 20000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'functions'))
+
+import boto3  # noqa: E402
+from botocore.stub import Stubber  # noqa: E402
+
+from metrics import InvocationMetrics, instrument_client, metrics  # noqa: E402
+
+RESPONSE = {
+    'Item': {'id': {'S': '1'}, 'title': {'S': 'Product'}, 'price': {'N': '10.5'}},
+    'ConsumedCapacity': {'TableName': 'products', 'CapacityUnits': 0.5},
+}
+
+
+def time_calls(client, calls):
+    stubber = Stubber(client)
+    for _ in range(calls):
+        stubber.add_response('get_item', RESPONSE)
+    with stubber:
+        started = time.perf_counter()
+        for _ in range(calls):
+            client.get_item(TableName='products', Key={'id': {'S': '1'}})
+        return time.perf_counter() - started
+
+
+def make_client():
+    return boto3.client('dynamodb', region_name='us-east-1', aws_access_key_id='testing',
+                        aws_secret_access_key='testing')
+
+
+def time_flush(invocations):
+    collected = InvocationMetrics()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(invocations):
+            collected.record_call('dynamodb.Scan', 12.0, capacity=1)
+            for _ in range(10):
+                collected.record_call('dynamodb.BatchGetItem', 4.0, capacity=50)
+            for stage in ('parse', 'scan', 'join', 'serialize', 'handler'):
+                with collected.span(stage):
+                    pass
+            collected.flush('get_products_list')
+    return time.perf_counter() - started
+
+
+def run(calls, invocations):
+    plain, instrumented = make_client(), make_client()
+    instrument_client(instrumented)
+    # warm up both clients (endpoint resolution, model loading)
+    time_calls(plain, 100)
+    time_calls(instrumented, 100)
+
+    plain_seconds = time_calls(plain, calls)
+    instrumented_seconds = time_calls(instrumented, calls)
+    metrics.reset()
+    flush_seconds = time_flush(invocations)
+
+    plain_us = plain_seconds / calls * 1e6
+    instrumented_us = instrumented_seconds / calls * 1e6
+    return {
+        'calls': calls,
+        'plainMicrosecondsPerCall': round(plain_us, 2),
+        'instrumentedMicrosecondsPerCall': round(instrumented_us, 2),
+        'overheadMicrosecondsPerCall': round(instrumented_us - plain_us, 2),
+        'overheadPercentOfClientTime': round((instrumented_us - plain_us) / plain_us * 100, 1),
+        'emfMicrosecondsPerInvocation': round(flush_seconds / invocations * 1e6, 2),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--invocations', type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls, args.invocations), indent=2))
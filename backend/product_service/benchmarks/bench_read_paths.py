@@ -0,0 +1,76 @@
+"""CPU time per item of the 'resource' and 'client' read paths (READ_PATH).
+
+Scan responses come from a botocore Stubber, so no network or moto time is included: what is
+left is the work done on each item after the response is parsed. The resource path runs the
+Table's TypeDeserializer into Decimal and then convert_attributes; the client path converts
+the wire format straight into the output types with product_from_wire.
+
+    python benchmarks/bench_read_paths.py --items 1000 --pages 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'functions'))
+
+import boto3  # noqa: E402
+from botocore.stub import Stubber  # noqa: E402
+
+from converters import ClientTable, product_from_wire  # noqa: E402
+from serialization import convert_attributes  # noqa: E402
+
+CREDENTIALS = {'region_name': 'us-east-1', 'aws_access_key_id': 'testing', 'aws_secret_access_key': 'testing'}
+
+
+def wire_page(items):
+    return {'Items': [
+        {
+            'id': {'S': f'product-{i}'},
+            'title': {'S': f'Product {i}'},
+            'description': {'S': f'Description of product {i}'},
+            'price': {'N': f'{(i % 9900) / 100 + 1:.2f}'},
+        }
+        for i in range(items)
+    ], 'Count': items, 'ScannedCount': items}
+
+
+def cpu_per_item(scan, client, items, pages):
+    stubber = Stubber(client)
+    for _ in range(pages + 1):
+        # a fresh copy each time: the resource deserializes the response in place
+        stubber.add_response('scan', wire_page(items))
+    with stubber:
+        scan()  # warm up model loading and handler registration
+        started = time.process_time()
+        for _ in range(pages):
+            scan()
+        return (time.process_time() - started) / (items * pages)
+
+
+def run(items, pages):
+    resource = boto3.resource('dynamodb', **CREDENTIALS)
+    table = resource.Table('products')
+    resource_seconds = cpu_per_item(
+        lambda: convert_attributes(table.scan()['Items']), resource.meta.client, items, pages
+    )
+
+    client = boto3.client('dynamodb', **CREDENTIALS)
+    client_table = ClientTable(client, 'products', product_from_wire)
+    client_seconds = cpu_per_item(lambda: client_table.scan()['Items'], client, items, pages)
+
+    return {
+        'items': items * pages,
+        'resourceMicrosecondsPerItem': round(resource_seconds * 1e6, 2),
+        'clientMicrosecondsPerItem': round(client_seconds * 1e6, 2),
+        'speedup': round(resource_seconds / client_seconds, 2),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=1000, help='items per scan page')
+    parser.add_argument('--pages', type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.pages), indent=2))
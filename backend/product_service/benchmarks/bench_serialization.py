@@ -0,0 +1,109 @@
+"""Serializing a get_products_list response of 100k products: DecimalEncoder vs serialization.py.
+
+Products are built the way the DynamoDB resource returns them, with Decimal numbers.
+'decimal_encoder' is the previous path: a float()/int() conversion dict per product and
+json.dumps with a JSONEncoder subclass. 'serialization_json' and 'serialization_orjson' convert
+the numbers once with convert_attributes (which warm invocations skip, as the cache holds
+converted items, measured as the *_warm paths) and encode with the stdlib C
+encoder or orjson.
+
+    python benchmarks/bench_serialization.py --products 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'functions'))
+
+import serialization  # noqa: E402
+from get_products_list import to_output_product, to_stocks_dict  # noqa: E402
+
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+def make_catalog(size):
+    products = [
+        {'id': f'product-{i}', 'title': f'Product {i}', 'description': f'Description of product {i}',
+         'price': Decimal(f'{(i % 9900) / 100 + 1:.2f}')}
+        for i in range(size)
+    ]
+    stocks = [{'product_id': f'product-{i}', 'count': Decimal(i % 100)} for i in range(size)]
+    return products, stocks
+
+
+def decimal_encoder(products, stock_items):
+    stocks = {stock['product_id']: stock['count'] for stock in stock_items}
+    output = [{
+        'id': p['id'],
+        'title': p['title'],
+        'description': p['description'],
+        'price': float(p['price']),
+        'count': int(stocks.get(p['id'], 0)),
+    } for p in products]
+    return json.dumps(output, cls=DecimalEncoder)
+
+
+def serialization_path(dumps, convert=True):
+    def run(products, stocks):
+        if convert:
+            serialization.convert_attributes(products)
+            stocks = to_stocks_dict(stocks)
+        return dumps([to_output_product(p, stocks) for p in products])
+    return run
+
+
+def stdlib_dumps():
+    encoder = json.JSONEncoder(separators=(',', ':'), default=serialization._default)
+    return encoder.encode
+
+
+def best_of(run, size, repeats, warm=False):
+    timings = []
+    for _ in range(repeats):
+        products, stocks = make_catalog(size)
+        if warm:
+            # a warm container serves products the cache already holds converted
+            serialization.convert_attributes(products)
+            stocks = to_stocks_dict(stocks)
+        gc.collect()
+        started = time.perf_counter()
+        body = run(products, stocks)
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = {
+        'decimal_encoder': (decimal_encoder, False),
+        'serialization_json': (serialization_path(stdlib_dumps()), False),
+        'serialization_json_warm': (serialization_path(stdlib_dumps(), convert=False), True),
+    }
+    if serialization.orjson is not None:
+        paths['serialization_orjson'] = (serialization_path(serialization.dumps), False)
+        paths['serialization_orjson_warm'] = (serialization_path(serialization.dumps, convert=False), True)
+
+    results = {}
+    baseline = None
+    for name, (run, warm) in paths.items():
+        seconds, size = best_of(run, args.products, args.repeats, warm)
+        baseline = baseline or seconds
+        results[name] = {'ms': round(seconds * 1000, 1), 'bodyBytes': size, 'speedup': round(baseline / seconds, 2)}
+    print(json.dumps({'products': args.products, 'backend': serialization.JSON_BACKEND, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Products/sec of catalog_batch_process in 'transactional' vs 'batch' write mode under moto.
+
+The write capacity column assumes items under 1 KB: transactional writes cost 2 WCU per item,
+standard BatchWriteItem writes 1 WCU.
+
+    python benchmarks/bench_write_modes.py --products 2000 --rows-per-message 100
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('PRODUCTS_TABLE_NAME', 'products')
+os.environ.setdefault('STOCKS_TABLE_NAME', 'stocks')
+os.environ.setdefault('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:123456789012:bench')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'functions'))
+
+import boto3  # noqa: E402
+from moto import mock_dynamodb  # noqa: E402
+
+import catalog_batch_process  # noqa: E402
+
+
+class NullSns:
+    def publish(self, **kwargs):
+        return {}
+
+
+def create_tables(dynamodb):
+    for name, key in (('products', 'id'), ('stocks', 'product_id')):
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{'AttributeName': key, 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': key, 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+
+def make_event(products, rows_per_message):
+    rows = [
+        {'Title': f'Product {i}', 'Description': f'Synthetic product {i}', 'Price': '10.5', 'Count': str(i % 40)}
+        for i in range(products)
+    ]
+    return {'Records': [
+        {'messageId': f'message-{start}', 'body': json.dumps({'version': 2, 'rows': rows[start:start + rows_per_message]})}
+        for start in range(0, products, rows_per_message)
+    ]}
+
+
+def run(products, rows_per_message):
+    event = make_event(products, rows_per_message)
+    results = {}
+    for mode, wcu_per_item in ((catalog_batch_process.WRITE_MODE_TRANSACTIONAL, 2),
+                               (catalog_batch_process.WRITE_MODE_BATCH, 1)):
+        with mock_dynamodb():
+            dynamodb = boto3.client('dynamodb', region_name='us-east-1')
+            create_tables(dynamodb)
+            catalog_batch_process.CATALOG_WRITE_MODE = mode
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = catalog_batch_process.handler(event, None, NullSns(), dynamodb)
+            elapsed = time.perf_counter() - started
+            results[mode] = {
+                'seconds': round(elapsed, 3),
+                'products_per_sec': round(products / elapsed, 1),
+                'failed_messages': len(response['batchItemFailures']),
+                'write_capacity_units': products * 2 * wcu_per_item,
+            }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--rows-per-message', type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run(args.products, args.rows_per_message), indent=2))
@@ -9,21 +9,49 @@ from aws_cdk import (
     aws_apigateway as apigateway,
     aws_dynamodb as dynamodb,
     aws_iam as iam,
+    aws_s3 as s3,
     CfnOutput
 )
 from constructs import Construct
 import os
 
+# structured logger settings shared by every function; DEBUG lines carry payloads
+LOGGING_ENVIRONMENT = {
+    "LOG_LEVEL": "INFO",
+    "LOG_SAMPLE_RATE": "1.0",
+}
+
 class ProductServiceStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
-        products_table = dynamodb.Table.from_table_name(
-            self, "ProductsTable", "products"
+        # the tables are managed outside this stack; pass their stream ARNs as context
+        # (-c productsStreamArn=... -c stocksStreamArn=..., NEW_IMAGE or NEW_AND_OLD_IMAGES)
+        # to keep the catalog snapshot up to date
+        products_stream_arn = self.node.try_get_context("productsStreamArn")
+        stocks_stream_arn = self.node.try_get_context("stocksStreamArn")
+
+        # the ByPrice and ByTitle indexes (dynamodb/dynamobd_stack.py) serve filtered and sorted
+        # GET /products; naming them here extends the read grants to the index ARNs
+        products_table = dynamodb.Table.from_table_attributes(
+            self, "ProductsTable", table_name="products", table_stream_arn=products_stream_arn,
+            global_indexes=["ByPrice", "ByTitle"]
+        )
+
+        stocks_table = dynamodb.Table.from_table_attributes(
+            self, "StocksTable", table_name="stocks", table_stream_arn=stocks_stream_arn
+        )
+
+        # holds the catalog version counter behind the GET /products ETag (partition key "id")
+        catalog_meta_table = dynamodb.Table.from_table_name(
+            self, "CatalogMetaTable", "catalog_meta"
         )
 
-        stocks_table = dynamodb.Table.from_table_name(
-            self, "StocksTable", "stocks"
+        # pre-joined GET /products body, rebuilt from the table streams
+        catalog_snapshot_bucket = s3.Bucket(
+            self, "CatalogSnapshotBucket",
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
         )
 
         # create Lambda functions
@@ -37,12 +65,66 @@ class ProductServiceStack(Stack):
                 "PRODUCTS_TABLE_ARN": products_table.table_arn,
                 "STOCKS_TABLE_NAME": stocks_table.table_name,
                 "STOCKS_TABLE_ARN": stocks_table.table_arn,
+                "SCAN_SEGMENTS": "4",
+                "PRODUCT_CACHE_TTL_SECONDS": "60",
+                "STOCK_CACHE_TTL_SECONDS": "5",
+                # convert scanned items straight from wire format instead of through Decimal
+                "READ_PATH": "client",
+                # "denormalized" reads stock counts off the product items, once
+                # dynamodb/backfill_stock_counts.py has filled them in; "joined" switches back
+                "READ_MODEL": "joined",
+                "CATALOG_SNAPSHOT_BUCKET": catalog_snapshot_bucket.bucket_name,
+                "CATALOG_SNAPSHOT_TTL_SECONDS": "5",
+                "CATALOG_META_TABLE_NAME": catalog_meta_table.table_name,
+                # gzip (or br, when bundled) bodies of at least this many bytes
+                "COMPRESSION_MIN_BYTES": "1024",
+                # shards of the catalog indexes, the same on every writer and reader
+                "CATALOG_INDEX_SHARDS": "4",
+                **LOGGING_ENVIRONMENT,
             }
         )
 
         # grant Lambda read access to the products table
         products_table.grant_read_data(get_products_list)
         stocks_table.grant_read_data(get_products_list)
+        catalog_snapshot_bucket.grant_read(get_products_list)
+        catalog_meta_table.grant_read_data(get_products_list)
+
+        catalog_snapshot_builder = _lambda.Function(
+            self, 'CatalogSnapshotBuilderFunction',
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler='catalog_snapshot_builder.handler',
+            code=_lambda.Code.from_asset('src/functions'),
+            timeout=Duration.seconds(60),
+            memory_size=512,
+            # the snapshot is read, patched and written back; one writer at a time
+            reserved_concurrent_executions=1,
+            environment={
+                "PRODUCTS_TABLE_NAME": products_table.table_name,
+                "STOCKS_TABLE_NAME": stocks_table.table_name,
+                "CATALOG_SNAPSHOT_BUCKET": catalog_snapshot_bucket.bucket_name,
+                # stored gzip, so GET /products can hand the bytes to gzip clients as they are
+                "CATALOG_SNAPSHOT_GZIP": "true",
+                # bumped for every streamed change too, in case a writer's own bump was lost
+                "CATALOG_META_TABLE_NAME": catalog_meta_table.table_name,
+                **LOGGING_ENVIRONMENT,
+            }
+        )
+
+        products_table.grant_read_data(catalog_snapshot_builder)
+        stocks_table.grant_read_data(catalog_snapshot_builder)
+        catalog_snapshot_bucket.grant_read_write(catalog_snapshot_builder)
+        catalog_meta_table.grant_write_data(catalog_snapshot_builder)
+
+        if products_stream_arn and stocks_stream_arn:
+            for table in (products_table, stocks_table):
+                catalog_snapshot_builder.add_event_source(lambda_events.DynamoEventSource(
+                    table,
+                    starting_position=_lambda.StartingPosition.LATEST,
+                    batch_size=500,
+                    max_batching_window=Duration.seconds(5),
+                    retry_attempts=5,
+                ))
 
         get_product_by_id = _lambda.Function(
             self, 'GetProductByIdFunction',
@@ -54,6 +136,12 @@ class ProductServiceStack(Stack):
                 "PRODUCTS_TABLE_ARN": products_table.table_arn,
                 "STOCKS_TABLE_NAME": stocks_table.table_name,
                 "STOCKS_TABLE_ARN": stocks_table.table_arn,
+                "PRODUCT_CACHE_TTL_SECONDS": "60",
+                "STOCK_CACHE_TTL_SECONDS": "5",
+                # one item per call, the Decimal round trip is negligible here
+                "READ_PATH": "resource",
+                "READ_MODEL": "joined",
+                **LOGGING_ENVIRONMENT,
             }
         )
 
@@ -64,24 +152,81 @@ class ProductServiceStack(Stack):
         api = apigateway.RestApi(
             self, 'ProductsApi',
             rest_api_name='Products Service',
+            # GET /products compresses its own body and returns it base64 encoded; API Gateway only
+            # decodes that to bytes for binary media types. Its own compression stays off
+            # (no min_compression_size), the function caches compressed bodies per ETag instead.
+            # */* makes every request body binary as well, so the POST integrations and the CORS
+            # preflight convert it back to text (post_integration, and the OPTIONS methods below)
+            binary_media_types=['*/*'],
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=apigateway.Cors.ALL_ORIGINS,
-                allow_methods=apigateway.Cors.ALL_METHODS
+                allow_methods=apigateway.Cors.ALL_METHODS,
+                # POST /products/batch takes an Idempotency-Key
+                allow_headers=apigateway.Cors.DEFAULT_HEADERS + ['Idempotency-Key']
             )
         )
 
+        # request bodies are binary under */*; hand them to the functions as text
+        def post_integration(handler):
+            return apigateway.LambdaIntegration(
+                handler, content_handling=apigateway.ContentHandling.CONVERT_TO_TEXT
+            )
+
         # create products resource and methods
         products = api.root.add_resource('products')
         products.add_method(
             'GET',
-            apigateway.LambdaIntegration(get_products_list)
+            apigateway.LambdaIntegration(get_products_list),
+            request_parameters={
+                'method.request.querystring.limit': False,
+                'method.request.querystring.cursor': False,
+                'method.request.querystring.minPrice': False,
+                'method.request.querystring.maxPrice': False,
+                'method.request.querystring.inStock': False,
+                'method.request.querystring.q': False,
+                'method.request.querystring.sort': False,
+                'method.request.querystring.order': False,
+                # comma-separated product ids, answered as a batch lookup
+                'method.request.querystring.ids': False
+            }
         )
 
         # add product/{productId} resource and GET method
         product_by_id = products.add_resource('{productId}')
         product_by_id.add_method(
             'GET',
-            apigateway.LambdaIntegration(get_product_by_id)
+            apigateway.LambdaIntegration(get_product_by_id),
+            request_parameters={
+                'method.request.querystring.consistent': False
+            }
+        )
+
+        # batch lookup for carts and checkout, one call instead of one per product
+        get_products_by_ids = _lambda.Function(
+            self, 'GetProductsByIdsFunction',
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler='get_products_by_ids.handler',
+            code=_lambda.Code.from_asset('src/functions'),
+            environment={
+                "PRODUCTS_TABLE_NAME": products_table.table_name,
+                "STOCKS_TABLE_NAME": stocks_table.table_name,
+                "PRODUCT_CACHE_TTL_SECONDS": "60",
+                "STOCK_CACHE_TTL_SECONDS": "5",
+                "READ_PATH": "client",
+                "READ_MODEL": "joined",
+                "BATCH_LOOKUP_MAX_IDS": "300",
+                "COMPRESSION_MIN_BYTES": "1024",
+                **LOGGING_ENVIRONMENT,
+            }
+        )
+
+        products_table.grant_read_data(get_products_by_ids)
+        stocks_table.grant_read_data(get_products_by_ids)
+
+        # a static path segment takes precedence over {productId}
+        products.add_resource('batch-get').add_method(
+            'POST',
+            post_integration(get_products_by_ids)
         )
 
         # create Lambda function for creating products
@@ -93,19 +238,63 @@ class ProductServiceStack(Stack):
             environment={
                 "PRODUCTS_TABLE_NAME": products_table.table_name,
                 "STOCKS_TABLE_NAME": stocks_table.table_name,
+                "CATALOG_META_TABLE_NAME": catalog_meta_table.table_name,
+                "CATALOG_INDEX_SHARDS": "4",
+                **LOGGING_ENVIRONMENT,
             }
         )
 
         # grant Lambda write access to the Products and Stocks tables
-        products_table.grant_write_data(create_product)
+        # read as well: a replayed Idempotency-Key reads the stored product back
+        products_table.grant_read_write_data(create_product)
         stocks_table.grant_write_data(create_product)
+        catalog_meta_table.grant_write_data(create_product)
 
         # add POST method to API Gateway
         products.add_method(
             'POST',
-            apigateway.LambdaIntegration(create_product)
+            post_integration(create_product)
         )
 
+        # bulk create for admin tooling
+        create_products_batch = _lambda.Function(
+            self, 'CreateProductsBatchFunction',
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler='create_products_batch.handler',
+            code=_lambda.Code.from_asset('src/functions'),
+            timeout=Duration.seconds(30),
+            environment={
+                "PRODUCTS_TABLE_NAME": products_table.table_name,
+                "STOCKS_TABLE_NAME": stocks_table.table_name,
+                "CATALOG_META_TABLE_NAME": catalog_meta_table.table_name,
+                "CATALOG_INDEX_SHARDS": "4",
+                "BATCH_CREATE_MAX_ITEMS": "500",
+                **LOGGING_ENVIRONMENT,
+            }
+        )
+
+        # read as well: the products of a replayed batch are read back and compared
+        products_table.grant_read_write_data(create_products_batch)
+        stocks_table.grant_write_data(create_products_batch)
+        catalog_meta_table.grant_write_data(create_products_batch)
+
+        products.add_resource('batch').add_method(
+            'POST',
+            post_integration(create_products_batch),
+            request_parameters={
+                'method.request.header.Idempotency-Key': False
+            }
+        )
+
+        # the preflight's mock integration only applies its {"statusCode": 200} request template
+        # to a text body; under */* the OPTIONS body would pass through as binary and fail.
+        # CorsOptions has no setting for it, so it is set on every generated OPTIONS method
+        for method in api.methods:
+            if method.http_method == 'OPTIONS':
+                method.node.default_child.add_property_override(
+                    'Integration.ContentHandling', 'CONVERT_TO_TEXT'
+                )
+
         # output the API URL
         CfnOutput(
             self, 'ApiUrl',
@@ -117,7 +306,8 @@ class ProductServiceStack(Stack):
         catalog_items_queue = sqs.Queue(
             self, "CatalogItemsQueue",
             queue_name="catalogItemsQueue",
-            visibility_timeout=Duration.seconds(30)
+            # at least six times the consumer timeout, so batching windows and retries fit
+            visibility_timeout=Duration.seconds(180)
         )
 
         # creating SNS topic
@@ -148,10 +338,16 @@ class ProductServiceStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_9,
             handler="catalog_batch_process.handler",
             code=_lambda.Code.from_asset("src/functions"),  
+            timeout=Duration.seconds(30),
             environment={
                 "PRODUCTS_TABLE_NAME": products_table.table_name,
                 "STOCKS_TABLE_NAME": stocks_table.table_name,
                 "SNS_TOPIC_ARN": create_product_topic.topic_arn,             
+                # switch to "batch" for non-transactional bulk loads
+                "CATALOG_WRITE_MODE": "transactional",
+                "CATALOG_META_TABLE_NAME": catalog_meta_table.table_name,
+                "CATALOG_INDEX_SHARDS": "4",
+                **LOGGING_ENVIRONMENT,
             }
         )
 
@@ -169,14 +365,19 @@ class ProductServiceStack(Stack):
 
         # granting permissions
         products_table.grant_write_data(catalog_batch_process)
-        stocks_table.grant_write_data(catalog_batch_process)
+        # read as well: batch write mode reconciles missing stock rows with BatchGetItem
+        stocks_table.grant_read_write_data(catalog_batch_process)
+        catalog_meta_table.grant_write_data(catalog_batch_process)
         create_product_topic.grant_publish(catalog_batch_process)
 
         # adding SQS trigger to Lambda
         catalog_batch_process.add_event_source(
             lambda_events.SqsEventSource(
                 catalog_items_queue,
-                batch_size=5
+                batch_size=25,
+                max_batching_window=Duration.seconds(5),
+                # only messages listed in batchItemFailures are retried
+                report_batch_item_failures=True
             )
         )
 
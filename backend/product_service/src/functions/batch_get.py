@@ -0,0 +1,66 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_WORKERS = int(os.environ.get('BATCH_GET_WORKERS', '8'))
+BATCH_GET_MAX_RETRIES = int(os.environ.get('BATCH_GET_MAX_RETRIES', '8'))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 1.0
+
+
+class BatchGetError(Exception):
+    """Raised when keys are still unprocessed after all retries"""
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def batch_get_request(dynamodb, request_items: Dict[str, Dict[str, Any]],
+                      max_retries: int = BATCH_GET_MAX_RETRIES) -> Dict[str, List[Dict[str, Any]]]:
+    """Run one BatchGetItem request, retrying UnprocessedKeys with backoff, and return items per table"""
+    results = {table_name: [] for table_name in request_items}
+    attempt = 0
+    while request_items:
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        for table_name, items in response.get('Responses', {}).items():
+            results.setdefault(table_name, []).extend(items)
+        request_items = response.get('UnprocessedKeys')
+        if not request_items:
+            break
+        if attempt >= max_retries:
+            unprocessed = sum(len(request['Keys']) for request in request_items.values())
+            raise BatchGetError(f"{unprocessed} keys still unprocessed after {max_retries} retries")
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+    return results
+
+
+def batch_get_items(dynamodb, table_name: str, keys: List[Dict[str, Any]],
+                    max_workers: int = BATCH_GET_WORKERS, **table_options) -> List[Dict[str, Any]]:
+    """Fetch keys from one table with concurrent BatchGetItem calls of up to 100 keys each"""
+    key_chunks = chunks(keys, BATCH_GET_MAX_KEYS)
+    if not key_chunks:
+        return []
+
+    def _fetch(key_chunk):
+        request = {table_name: {'Keys': key_chunk, **table_options}}
+        return batch_get_request(dynamodb, request)[table_name]
+
+    if len(key_chunks) == 1:
+        return _fetch(key_chunks[0])
+
+    items = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(key_chunks))) as pool:
+        for chunk_items in pool.map(_fetch, key_chunks):
+            items.extend(chunk_items)
+    return items
@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Set, Tuple
+
+from batch_get import batch_get_items, chunks
+from logger import get_logger
+
+# BatchWriteItem accepts at most 25 put/delete requests per call
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_WRITE_WORKERS = int(os.environ.get('BATCH_WRITE_WORKERS', '4'))
+BATCH_WRITE_MAX_RETRIES = int(os.environ.get('BATCH_WRITE_MAX_RETRIES', '8'))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+
+# (table name, item in DynamoDB wire format)
+TableItem = Tuple[str, Dict[str, Any]]
+
+logger = get_logger('batch_write')
+
+
+def _item_key(table_name: str, item: Dict[str, Any]) -> str:
+    return table_name + json.dumps(item, sort_keys=True)
+
+
+def write_chunk(dynamodb, table_items: List[TableItem], max_retries: int = BATCH_WRITE_MAX_RETRIES) -> List[TableItem]:
+    """Write up to 25 items with BatchWriteItem, retrying UnprocessedItems, and return the items never written"""
+    request_items = {}
+    for table_name, item in table_items:
+        request_items.setdefault(table_name, []).append({'PutRequest': {'Item': item}})
+
+    for attempt in range(max_retries + 1):
+        response = dynamodb.batch_write_item(RequestItems=request_items)
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            return []
+        if attempt < max_retries:
+            time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))))
+    return [
+        (table_name, request['PutRequest']['Item'])
+        for table_name, requests in request_items.items()
+        for request in requests
+    ]
+
+
+def batch_write(dynamodb, groups: List[Tuple[Hashable, List[TableItem]]],
+                max_workers: int = BATCH_WRITE_WORKERS) -> Set[Hashable]:
+    """Write the items of every group with parallel BatchWriteItem calls and return the groups that failed.
+
+    Unlike a transaction nothing is atomic: a failed group may be partly written.
+    """
+    owners = {}
+    table_items = []
+    for key, items in groups:
+        for table_name, item in items:
+            owners[_item_key(table_name, item)] = key
+            table_items.append((table_name, item))
+
+    def _write(chunk):
+        try:
+            return write_chunk(dynamodb, chunk)
+        except Exception as error:
+            logger.error('Batch write failed', items=len(chunk), error=repr(error))
+            return chunk
+
+    failed = set()
+    item_chunks = chunks(table_items, BATCH_WRITE_MAX_ITEMS)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(item_chunks)))) as pool:
+        for unprocessed in pool.map(_write, item_chunks):
+            failed.update(owners[_item_key(table_name, item)] for table_name, item in unprocessed)
+    return failed
+
+
+def find_products_without_stock(dynamodb, stocks_table_name: str, product_ids: List[str]) -> List[str]:
+    """Reconciliation: return the product ids that have no row in the stocks table"""
+    keys = [{'product_id': {'S': product_id}} for product_id in dict.fromkeys(product_ids)]
+    stocks = batch_get_items(dynamodb, stocks_table_name, keys, ProjectionExpression='product_id')
+    found = {stock['product_id']['S'] for stock in stocks}
+    return [product_id for product_id in dict.fromkeys(product_ids) if product_id not in found]
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '1024'))
+# product rows rarely change, stock counts change with every order
+PRODUCT_CACHE_TTL_SECONDS = float(os.environ.get('PRODUCT_CACHE_TTL_SECONDS', '60'))
+STOCK_CACHE_TTL_SECONDS = float(os.environ.get('STOCK_CACHE_TTL_SECONDS', '5'))
+
+MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache with a time-to-live per entry, safe to share between threads"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or MISSING when absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """Return (found values by key, keys that were missing)"""
+        found, missing = {}, []
+        for key in keys:
+            value = self.get(key)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        return found, missing
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float = None) -> None:
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_many(self, values: Dict[Hashable, Any]) -> None:
+        for key, value in values.items():
+            self.set(key, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# module level, so entries survive across invocations of a warm container
+products_cache = TTLCache(CACHE_MAX_ENTRIES, PRODUCT_CACHE_TTL_SECONDS)
+stocks_cache = TTLCache(CACHE_MAX_ENTRIES, STOCK_CACHE_TTL_SECONDS)
+# compressed response bodies by (ETag, encoding), so an unchanged catalog is compressed once
+compressed_cache = TTLCache(int(os.environ.get('COMPRESSED_CACHE_MAX_ENTRIES', '8')), 300)
+
+
+def is_cache_bypassed(event: Dict[str, Any]) -> bool:
+    """Requests sent with Cache-Control: no-cache (or no-store) read through to DynamoDB"""
+    headers = event.get('headers') or {}
+    cache_control = next((value for name, value in headers.items() if name.lower() == 'cache-control'), '')
+    return any(directive in (cache_control or '').lower() for directive in ('no-cache', 'no-store'))
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {'products': products_cache.stats(), 'stocks': stocks_cache.stats()}
+
+
+def clear_caches() -> None:
+    global _generation
+    products_cache.clear()
+    stocks_cache.clear()
+    compressed_cache.clear()
+    _generation = None
+
+
+_generation = None
+_generation_lock = threading.Lock()
+
+
+def sync_generation(generation: Hashable) -> bool:
+    """Clear the caches when the data has moved on to a new generation, e.g. the catalog version.
+
+    Returns whether they were cleared. Cached rows are then never served under a newer ETag.
+    """
+    global _generation
+    with _generation_lock:
+        if generation == _generation:
+            return False
+        changed = _generation is not None
+        _generation = generation
+    if changed:
+        products_cache.clear()
+        stocks_cache.clear()
+    return changed
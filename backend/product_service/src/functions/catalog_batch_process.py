@@ -1,85 +1,167 @@
 # src/functions/catalog_batch_process.py
 import json
 import os
-import uuid
-import boto3
+import time
+from batch_write import batch_write, find_products_without_stock
+from catalog_items import REQUIRED_PRODUCT_FIELDS, put_product_requests, validate_product
+from catalog_version import CatalogVersionError, bump_catalog_version, catalog_meta_table_name
+from clients import get_client
+from idempotency import idempotent_id
+from logger import get_logger
+from metrics import instrumented, metrics
+from transactions import write_transactions
 from typing import Dict, Any
     
 products_table = os.environ['PRODUCTS_TABLE_NAME']
 stocks_table = os.environ['STOCKS_TABLE_NAME']
 
-def to_dynamo_request(parsed, requests):
-    product_id = str(uuid.uuid4())
-    title = parsed['Title']
-    description = parsed['Description']
-    price = parsed['Price']
-    count = parsed['Count']
-    new_product = {
-        'id': {
-            'S': product_id,
-        },
-        'title': {
-            'S': title,
-        },
-        'description': {
-            'S': description,
-        },
-        'price': {
-            'N': price
-        },
-    }
-    requests.append({
-        'Put': {
-            'TableName': products_table,
-            'Item': new_product
-        }
-    })
-    new_stock = {
-        'product_id': {
-            'S': product_id,
-        },
-        'count': {
-            'N': count,
-        },
+logger = get_logger('catalog_batch_process')
+
+# 'transactional' writes each product and its stock atomically with TransactWriteItems;
+# 'batch' uses BatchWriteItem, half the write capacity per item, for bulk imports
+WRITE_MODE_TRANSACTIONAL = 'transactional'
+WRITE_MODE_BATCH = 'batch'
+CATALOG_WRITE_MODE = os.environ.get('CATALOG_WRITE_MODE', WRITE_MODE_TRANSACTIONAL)
+
+# import_file_parser packs many CSV rows into one message; older messages carry a single row
+PACKED_MESSAGE_VERSION = 2
+
+def unpack_message(body):
+    """Return the CSV rows carried by an SQS message body, in either message format, and the
+    file position of the first row when the message names one"""
+    message = json.loads(body)
+    if isinstance(message, dict) and 'version' in message:
+        if message['version'] != PACKED_MESSAGE_VERSION:
+            raise ValueError(f"Unsupported message version: {message['version']}")
+        return message['rows'], message.get('source')
+    return [message], None
+
+def row_product_id(message_id, source, index):
+    """The same id on every attempt at a row, so a redelivered message creates no duplicates.
+
+    A row from a known file keeps its id even when the file is parsed again into new
+    messages; other rows are identified by their message, which SQS redelivers unchanged.
+    """
+    if source:
+        return idempotent_id('file', source['file'], source['firstRow'] + index)
+    return idempotent_id('message', message_id, index)
+
+def to_dynamo_request(parsed, requests, product_id):
+    error = validate_product({field: parsed.get(field.capitalize()) for field in REQUIRED_PRODUCT_FIELDS})
+    if error:
+        # fails the message, as a row the products could not be read from does
+        raise ValueError(error)
+    requests.extend(put_product_requests(
+        products_table, stocks_table, product_id,
+        parsed['Title'], parsed['Description'], parsed['Price'], parsed['Count']
+    ))
+
+def write_in_batches(dynamodb, messages):
+    """Bulk-load mode: non-transactional BatchWriteItem plus a stock reconciliation pass"""
+    groups = [
+        (message_id, [(request['Put']['TableName'], request['Put']['Item']) for request in requests])
+        for message_id, requests in messages
+    ]
+    failed = batch_write(dynamodb, groups)
+
+    # without a transaction a product can land without its stock row; find and rewrite those
+    stock_items = {
+        item['product_id']['S']: (message_id, item)
+        for message_id, items in groups if message_id not in failed
+        for table_name, item in items if table_name == stocks_table
     }
-    requests.append({
-        'Put': {
-            'TableName': stocks_table,
-            'Item': new_stock
-        }
-    })
-    
-def write_to_dynamo(requests, dynamodb):
-    dynamodb.transact_write_items(
-        TransactItems=requests
-    )
+    try:
+        missing = find_products_without_stock(dynamodb, stocks_table, list(stock_items))
+    except Exception as e:
+        # without the check the stock rows are unknown; redeliver just these messages,
+        # whose writes are idempotent
+        logger.error('Stock reconciliation failed', error=repr(e))
+        return failed | {message_id for message_id, _ in stock_items.values()}
+    if missing:
+        logger.warning('Reconciling products without stock', count=len(missing))
+        failed |= batch_write(dynamodb, [
+            (stock_items[product_id][0], [(stocks_table, stock_items[product_id][1])]) for product_id in missing
+        ])
+    return failed
 
+@instrumented('catalog_batch_process')
 def handler(event, context: Any, sns_client_mock = None, dynamodb_mock = None):
-    sns_client = sns_client_mock if sns_client_mock else boto3.client('sns')
-    dynamodb = dynamodb_mock if dynamodb_mock else boto3.client('dynamodb')
+    sns_client = sns_client_mock if sns_client_mock else get_client('sns')
+    dynamodb = dynamodb_mock if dynamodb_mock else get_client('dynamodb')
     sns_topic_arn = os.environ['SNS_TOPIC_ARN']
     
-    try:
-        requests = []
+    # only the messages listed here are redelivered by SQS (ReportBatchItemFailures)
+    failed_message_ids = []
+    messages = []
+    products_count = {}
+    with metrics.span('parse'):
         for record in event['Records']:
-            message_body = json.loads(record['body'])
-            to_dynamo_request(message_body, requests)
+            message_id = record['messageId']
+            try:
+                requests = []
+                rows, source = unpack_message(record['body'])
+                for index, row in enumerate(rows):
+                    to_dynamo_request(row, requests, row_product_id(message_id, source, index))
+            except Exception as e:
+                logger.error('Failed to parse message', messageId=message_id, error=repr(e))
+                failed_message_ids.append(message_id)
+                continue
+            messages.append((message_id, requests))
+            products_count[message_id] = len(rows)
 
-        # create products
-        write_to_dynamo(requests, dynamodb)
-        
-        # Send notification to SNS
-        sns_client.publish(
-            TopicArn=sns_topic_arn,
-            Subject='Products Created Successfully',
-            Message=f'Successfully processed and created {len(event["Records"])} products'
+    # create products, packing several messages into each transaction or batch write
+    write_failures = set()
+    # messages whose products a redelivered attempt finds written already
+    replayed = set()
+    if messages:
+        started = time.perf_counter()
+        with metrics.span('write'):
+            if CATALOG_WRITE_MODE == WRITE_MODE_BATCH:
+                write_failures = write_in_batches(dynamodb, messages)
+            else:
+                write_failures = write_transactions(dynamodb, messages, existing=replayed)
+            if len(write_failures) < len(messages):
+                # one bump per batch invalidates the ETag of GET /products; without it the
+                # messages are redelivered, and their idempotent writes bump on the next attempt
+                try:
+                    bump_catalog_version(dynamodb, catalog_meta_table_name())
+                except CatalogVersionError:
+                    write_failures = {message_id for message_id, _ in messages}
+        elapsed = time.perf_counter() - started
+        written = sum(products_count.values())
+        logger.info(
+            'Catalog batch written',
+            writeMode=CATALOG_WRITE_MODE,
+            products=written,
+            seconds=round(elapsed, 4),
+            productsPerSecond=round(written / elapsed, 1) if elapsed else None
         )
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps('Products created successfully')
-        }
-    
-    except Exception as e:
-        print(f"Error processing messages: {str(e)}")
-        raise e
+    failed_message_ids.extend(message_id for message_id, _ in messages if message_id in write_failures)
+    created = sum(
+        count for message_id, count in products_count.items()
+        if message_id not in write_failures and message_id not in replayed
+    )
+    if replayed:
+        logger.info('Messages written before', messageIds=sorted(replayed))
+
+    if created:
+        # Send notification to SNS; the products are already written, so a failure here
+        # must not make SQS redeliver them
+        try:
+            with metrics.span('notify'):
+                sns_client.publish(
+                    TopicArn=sns_topic_arn,
+                    Subject='Products Created Successfully',
+                    Message=f'Successfully processed and created {created} products'
+                )
+        except Exception as e:
+            logger.error('Failed to publish notification', error=repr(e))
+
+    if failed_message_ids:
+        logger.warning('Failed to process messages', messageIds=failed_message_ids)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Products created successfully' if not failed_message_ids else 'Products partially created'),
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]
+    }
@@ -0,0 +1,114 @@
+import math
+import os
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+
+# 'joined' reads products and stocks and joins them by id; 'denormalized' reads the stock count
+# every write path also stores on the product item, so one request serves a lookup
+READ_MODEL_JOINED = 'joined'
+READ_MODEL_DENORMALIZED = 'denormalized'
+
+# The ByPrice and ByTitle indexes are partitioned by catalog_shard, so that every product is
+# reachable by a query while writes still spread over several index partitions. Readers query
+# every shard and merge; changing the number of shards means rewriting catalog_shard on all items
+CATALOG_INDEX_SHARDS = int(os.environ.get('CATALOG_INDEX_SHARDS', '4'))
+INDEX_BY_PRICE = 'ByPrice'
+INDEX_BY_TITLE = 'ByTitle'
+
+# fields every product of POST /products and POST /products/batch must have
+REQUIRED_PRODUCT_FIELDS = ('title', 'description', 'price', 'count')
+
+WireItem = Dict[str, Dict[str, Any]]
+Number = Union[int, float, str]
+
+
+def validate_product(body: Any) -> Optional[str]:
+    """Why a product from a request body cannot be written, or None when it can"""
+    if not isinstance(body, dict):
+        return 'Product must be an object'
+    missing_fields = [field for field in REQUIRED_PRODUCT_FIELDS if field not in body]
+    if missing_fields:
+        return f"Missing required fields: {', '.join(missing_fields)}"
+    # anything else would only fail once it reaches the transaction
+    if not _is_non_negative_number(body['price']):
+        return 'price must be a non-negative number'
+    # a stock count is a whole number; readers parse it as an int
+    if not _is_non_negative_number(body['count']) or not _is_whole_number(body['count']):
+        return 'count must be a non-negative integer'
+    return None
+
+
+def _is_non_negative_number(value: Any) -> bool:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return False
+    try:
+        number = float(value)
+    except ValueError:
+        return False
+    return math.isfinite(number) and number >= 0
+
+
+def _is_whole_number(value: Number) -> bool:
+    # Decimal, so '3.0' and 3.0 pass while '1.5', and digits past a float's precision, do not
+    return Decimal(str(value)) == Decimal(str(value)).to_integral_value()
+
+
+def catalog_shard(product_id: str, shards: int = CATALOG_INDEX_SHARDS) -> int:
+    # crc32 rather than hash(), which changes between processes
+    return zlib.crc32(product_id.encode('utf-8')) % shards
+
+
+def product_item(product_id: str, title: str, description: str, price: Number, count: Number) -> WireItem:
+    """A products table item in wire format, with its stock count and the keys of the catalog indexes"""
+    return {
+        'id': {'S': product_id},
+        'title': {'S': title},
+        'description': {'S': description},
+        'price': {'N': str(price)},
+        'count': {'N': str(count)},
+        'catalog_shard': {'N': str(catalog_shard(product_id))},
+        # title search is a case-insensitive prefix match
+        'title_lower': {'S': title.lower()},
+    }
+
+
+def is_same_product(item: WireItem, product: Dict[str, Any]) -> bool:
+    """Whether a stored products table item holds the fields of a product from a request body"""
+    def _number(value):
+        return Decimal(str(value))
+
+    return (
+        item['title']['S'] == product['title']
+        and item.get('description', {}).get('S', '') == product['description']
+        and _number(item['price']['N']) == _number(product['price'])
+        and _number(item.get('count', {}).get('N', 0)) == _number(product['count'])
+    )
+
+
+def stock_item(product_id: str, count: Number) -> WireItem:
+    return {
+        'product_id': {'S': product_id},
+        'count': {'N': str(count)},
+    }
+
+
+def put_product_requests(products_table_name: str, stocks_table_name: str, product_id: str, title: str,
+                         description: str, price: Number, count: Number) -> List[Dict[str, Any]]:
+    """The product and its stock row as TransactWriteItems puts, so both counts change together.
+
+    Both only create: with the deterministic ids of retried writes an item that exists was
+    written by an earlier attempt, and must not be overwritten, e.g. its stock count reset.
+    """
+    return [
+        {'Put': {
+            'TableName': products_table_name,
+            'Item': product_item(product_id, title, description, price, count),
+            'ConditionExpression': 'attribute_not_exists(id)',
+        }},
+        {'Put': {
+            'TableName': stocks_table_name,
+            'Item': stock_item(product_id, count),
+            'ConditionExpression': 'attribute_not_exists(product_id)',
+        }},
+    ]
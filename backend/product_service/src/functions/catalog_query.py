@@ -0,0 +1,289 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from catalog_items import CATALOG_INDEX_SHARDS, INDEX_BY_PRICE, INDEX_BY_TITLE
+from converters import ClientTable, product_from_wire
+from dynamo_scan import SCAN_SEGMENTS, scan_all
+from logger import get_logger
+from metrics import metrics
+
+SORT_PRICE = 'price'
+SORT_TITLE = 'title'
+MAX_SEARCH_CHARS = 100
+
+FILTER_PARAMETERS = ('minPrice', 'maxPrice', 'inStock', 'q', 'sort', 'order')
+
+# index each sort order is served from, and the attribute it is sorted by
+SORT_INDEXES = {SORT_PRICE: (INDEX_BY_PRICE, 'price'), SORT_TITLE: (INDEX_BY_TITLE, 'title_lower')}
+
+# cursor position of a shard whose matches have all been returned
+SHARD_DONE = 'done'
+
+logger = get_logger('catalog_query')
+
+
+class InvalidCatalogQuery(ValueError):
+    """Raised when filter, search or sort query parameters cannot be used"""
+
+
+class CatalogQuery(NamedTuple):
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: bool = False
+    search: Optional[str] = None
+    sort: Optional[str] = None
+    descending: bool = False
+
+
+class QueryPlan(NamedTuple):
+    # None for the unindexed fallback, a filtered scan
+    index: Optional[str]
+    sort_attribute: Optional[str]
+    key_condition: Optional[str]
+    filter_expression: Optional[str]
+    names: Dict[str, str]
+    values: Dict[str, Dict[str, str]]
+
+
+def _price(query_parameters: Dict[str, str], name: str) -> Optional[float]:
+    value = query_parameters.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        raise InvalidCatalogQuery(f'{name} must be a number')
+    if price < 0:
+        raise InvalidCatalogQuery(f'{name} must not be negative')
+    return price
+
+
+def parse_catalog_query(query_parameters: Optional[Dict[str, str]]) -> Optional[CatalogQuery]:
+    """Read the filter, search and sort query parameters; None when the request uses none of them"""
+    query_parameters = query_parameters or {}
+    if all(query_parameters.get(name) in (None, '') for name in FILTER_PARAMETERS):
+        return None
+
+    min_price, max_price = _price(query_parameters, 'minPrice'), _price(query_parameters, 'maxPrice')
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise InvalidCatalogQuery('minPrice must not be greater than maxPrice')
+
+    in_stock = str(query_parameters.get('inStock') or 'false').lower()
+    if in_stock not in ('true', '1', 'false', '0'):
+        raise InvalidCatalogQuery('inStock must be true or false')
+
+    search = (query_parameters.get('q') or '').strip().lower() or None
+    if search and len(search) > MAX_SEARCH_CHARS:
+        raise InvalidCatalogQuery(f'q must be at most {MAX_SEARCH_CHARS} characters')
+
+    sort = query_parameters.get('sort') or None
+    if sort is not None and sort not in SORT_INDEXES:
+        raise InvalidCatalogQuery(f"sort must be one of: {', '.join(SORT_INDEXES)}")
+    order = (query_parameters.get('order') or 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise InvalidCatalogQuery('order must be asc or desc')
+
+    return CatalogQuery(min_price, max_price, in_stock in ('true', '1'), search, sort, order == 'desc')
+
+
+def _price_condition(query: CatalogQuery, values: Dict[str, Dict[str, str]]) -> Optional[str]:
+    if query.min_price is not None:
+        values[':minPrice'] = {'N': repr(query.min_price)}
+    if query.max_price is not None:
+        values[':maxPrice'] = {'N': repr(query.max_price)}
+    if query.min_price is not None and query.max_price is not None:
+        return '#price BETWEEN :minPrice AND :maxPrice'
+    if query.min_price is not None:
+        return '#price >= :minPrice'
+    if query.max_price is not None:
+        return '#price <= :maxPrice'
+    return None
+
+
+def plan_query(query: CatalogQuery) -> QueryPlan:
+    """Pick the index that narrows the read the most and can also return the requested order.
+
+    A title prefix uses ByTitle and a price range ByPrice; other conditions become a filter on
+    that query. When the requested sort is on the other index (q with sort=price, a price range
+    with sort=title) or only inStock is given, no index helps and the table is scanned.
+    """
+    names = {'#price': 'price', '#title_lower': 'title_lower', '#count': 'count'}
+    values = {}
+    price_condition = _price_condition(query, values)
+    search_condition = None
+    if query.search:
+        values[':search'] = {'S': query.search}
+        search_condition = 'begins_with(#title_lower, :search)'
+
+    if query.search:
+        index, key_condition, filters = INDEX_BY_TITLE, search_condition, [price_condition]
+        indexed = query.sort in (None, SORT_TITLE)
+    elif price_condition:
+        index, key_condition, filters = INDEX_BY_PRICE, price_condition, []
+        indexed = query.sort in (None, SORT_PRICE)
+    elif query.sort:
+        index, key_condition, filters = SORT_INDEXES[query.sort][0], None, []
+        indexed = True
+    else:
+        index, key_condition, filters, indexed = None, None, [], False
+
+    if query.in_stock:
+        values[':zero'] = {'N': '0'}
+        filters.append('#count > :zero')
+    if not indexed:
+        index, key_condition = None, None
+        filters = [search_condition, price_condition] + filters
+
+    filters = [condition for condition in filters if condition]
+    sort_attribute = next(attribute for name, attribute in SORT_INDEXES.values() if name == index) if index else None
+    used = ' '.join(filter(None, [key_condition] + filters))
+    return QueryPlan(
+        index, sort_attribute, key_condition, ' AND '.join(filters) or None,
+        {name: attribute for name, attribute in names.items() if name in used},
+        {name: value for name, value in values.items() if name in used},
+    )
+
+
+def _query_shard(client, table_name: str, plan: QueryPlan, shard: int, descending: bool,
+                 start_key: Optional[Dict[str, Any]], limit: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Matches of one index shard in index order, up to limit of them; returns (items, exhausted)"""
+    key_condition = '#catalog_shard = :shard'
+    if plan.key_condition:
+        key_condition += f' AND {plan.key_condition}'
+    query_kwargs = {
+        'TableName': table_name,
+        'IndexName': plan.index,
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeNames': {**plan.names, '#catalog_shard': 'catalog_shard'},
+        'ExpressionAttributeValues': {**plan.values, ':shard': {'N': str(shard)}},
+        'ScanIndexForward': not descending,
+    }
+    if plan.filter_expression:
+        query_kwargs['FilterExpression'] = plan.filter_expression
+    items = []
+    while True:
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+        if limit:
+            # Limit counts the items evaluated before the filter, so the page never overshoots
+            query_kwargs['Limit'] = limit - len(items)
+        response = client.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return items, True
+        if limit and len(items) >= limit:
+            return items, False
+
+
+def _sort_value(item: Dict[str, Dict[str, str]], attribute: str) -> Any:
+    value = item[attribute]
+    return float(value['N']) if 'N' in value else value['S']
+
+
+def query_index(client, table_name: str, query: CatalogQuery, plan: QueryPlan, limit: Optional[int] = None,
+                cursor: Optional[Dict[str, Any]] = None,
+                shards: int = CATALOG_INDEX_SHARDS) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Query every shard of the index at once and merge their results in order.
+
+    With a limit each shard returns at most limit matches, the first limit of the merged
+    results are kept, and the cursor remembers per shard the last match that was returned.
+    """
+    positions = dict(cursor or {})
+    active = [shard for shard in range(shards) if positions.get(str(shard)) != SHARD_DONE]
+    if not active:
+        return [], None
+    with ThreadPoolExecutor(max_workers=len(active)) as pool:
+        futures = {
+            shard: pool.submit(_query_shard, client, table_name, plan, shard, query.descending,
+                               positions.get(str(shard)), limit)
+            for shard in active
+        }
+        results = {shard: future.result() for shard, future in futures.items()}
+
+    streams = [
+        [(_sort_value(item, plan.sort_attribute), shard, item) for item in items]
+        for shard, (items, _) in results.items()
+    ]
+    merged = heapq.merge(*streams, key=lambda entry: entry[0], reverse=query.descending)
+    taken = [entry for _, entry in zip(range(limit), merged)] if limit else list(merged)
+    products = [product_from_wire(item) for _, _, item in taken]
+    if not limit:
+        return products, None
+
+    last_taken = {}
+    for _, shard, item in taken:
+        last_taken[shard] = item
+    for shard, (items, exhausted) in results.items():
+        item = last_taken.get(shard)
+        if exhausted and (not items or item is items[-1]):
+            positions[str(shard)] = SHARD_DONE
+        elif item is not None:
+            positions[str(shard)] = {
+                name: item[name] for name in ('id', 'catalog_shard', plan.sort_attribute)
+            }
+    if all(positions.get(str(shard)) == SHARD_DONE for shard in range(shards)):
+        return products, None
+    return products, positions
+
+
+def scan_filtered(client, table_name: str, query: CatalogQuery, plan: QueryPlan, limit: Optional[int] = None,
+                  cursor: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Unindexed fallback: scan the table with the conditions as a FilterExpression"""
+    metrics.increment('UnindexedQuery')
+    logger.warning('No index serves this catalog query, scanning the table', query=query._asdict())
+    table = ClientTable(client, table_name, product_from_wire)
+    scan_kwargs = {}
+    if plan.filter_expression:
+        scan_kwargs['FilterExpression'] = plan.filter_expression
+    if plan.names:
+        scan_kwargs['ExpressionAttributeNames'] = plan.names
+    if plan.values:
+        scan_kwargs['ExpressionAttributeValues'] = plan.values
+    cursor = cursor or {}
+
+    if query.sort is None and limit:
+        # pages follow the scan itself
+        products = []
+        start_key = cursor.get('scan')
+        while True:
+            if start_key:
+                scan_kwargs['ExclusiveStartKey'] = start_key
+            response = table.scan(Limit=limit - len(products), **scan_kwargs)
+            products.extend(response['Items'])
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key or len(products) >= limit:
+                return products, {'scan': start_key} if start_key else None
+
+    products = scan_all(table, SCAN_SEGMENTS, **scan_kwargs)
+    if query.sort:
+        key = (lambda p: p['price']) if query.sort == SORT_PRICE else (lambda p: p['title'].lower())
+        products.sort(key=lambda p: (key(p), p['id']), reverse=query.descending)
+        logger.debug('Sorted scanned products in memory', sort=query.sort, count=len(products))
+    if not limit:
+        return products, None
+    # a sorted scan is read whole on every page anyway, so pages are offsets into it
+    offset = int(cursor.get('offset', 0))
+    next_offset = offset + limit
+    return products[offset:next_offset], {'offset': str(next_offset)} if next_offset < len(products) else None
+
+
+def query_catalog(client, table_name: str, query: CatalogQuery, limit: Optional[int] = None,
+                  cursor: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Products matching query in its order, and the cursor of the next page when limit is given"""
+    plan = plan_query(query)
+    if cursor is not None:
+        # index cursors hold a position per shard, scan cursors a scan key or an offset
+        fields = {str(shard) for shard in range(CATALOG_INDEX_SHARDS)} if plan.index else {'scan', 'offset'}
+        if not isinstance(cursor, dict) or not set(cursor) <= fields:
+            raise InvalidCatalogQuery('Invalid cursor')
+    try:
+        if plan.index is None:
+            return scan_filtered(client, table_name, query, plan, limit, cursor)
+        return query_index(client, table_name, query, plan, limit, cursor)
+    except (KeyError, TypeError, ValueError) as error:
+        if cursor:
+            # a cursor of another query, or of the unfiltered list
+            raise InvalidCatalogQuery('Invalid cursor') from error
+        raise
@@ -0,0 +1,35 @@
+import os
+from typing import Any, Dict
+
+from catalog_version import bump_catalog_version, catalog_meta_table_name
+from clients import get_client
+from logger import get_logger
+from metrics import instrumented, metrics
+from snapshot import rebuild_snapshot
+
+logger = get_logger('catalog_snapshot_builder')
+
+
+@instrumented('catalog_snapshot_builder')
+def handler(event: Dict[str, Any], context: Any, dynamodb = None, s3_client = None) -> Dict[str, Any]:
+    """Keep the GET /products snapshot in S3 up to date.
+
+    Invoked by the DynamoDB Streams of the products and stocks tables, it applies the changed
+    rows to the current snapshot; invoked without Records (e.g. by hand) it rebuilds it fully.
+    """
+    dynamodb = dynamodb if dynamodb else get_client('dynamodb')
+    s3_client = s3_client if s3_client else get_client('s3')
+    records = event.get('Records') or []
+
+    with metrics.span('rebuild'):
+        result = rebuild_snapshot(
+            dynamodb, s3_client, os.environ['PRODUCTS_TABLE_NAME'], os.environ['STOCKS_TABLE_NAME'], records,
+            bucket=os.environ['CATALOG_SNAPSHOT_BUCKET']
+        )
+    if records:
+        # the writers bump the version themselves; bumping for the streamed changes as well
+        # covers a writer that crashed between its write and its bump. A failed bump fails
+        # the batch, so the stream delivers it again
+        bump_catalog_version(dynamodb, catalog_meta_table_name())
+    logger.info('Catalog snapshot written', records=len(records), **result)
+    return result
@@ -0,0 +1,70 @@
+import os
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from batch_get import backoff_delay
+from logger import get_logger
+
+# A single counter item, incremented after every write to the products or stocks tables, so
+# GET /products can tell whether anything changed with one GetItem instead of a scan
+CATALOG_VERSION_KEY = {'id': {'S': 'catalog'}}
+CATALOG_VERSION_MAX_RETRIES = int(os.environ.get('CATALOG_VERSION_MAX_RETRIES', '3'))
+
+logger = get_logger('catalog_version')
+
+
+class CatalogVersionError(Exception):
+    """Raised when the catalog version could not be bumped after all retries"""
+
+
+def catalog_meta_table_name() -> Optional[str]:
+    """The counter table, or None when the catalog is not versioned in this deployment"""
+    return os.environ.get('CATALOG_META_TABLE_NAME') or None
+
+
+def read_catalog_version(client, table_name: str) -> Optional[int]:
+    """The current catalog version, or None when no write has created the counter yet"""
+    response = client.get_item(
+        TableName=table_name,
+        Key=CATALOG_VERSION_KEY,
+        ProjectionExpression='#version',
+        ExpressionAttributeNames={'#version': 'version'},
+    )
+    version = response.get('Item', {}).get('version')
+    return int(version['N']) if version else None
+
+
+def bump_catalog_version(client, table_name: Optional[str],
+                         max_retries: int = CATALOG_VERSION_MAX_RETRIES) -> Optional[int]:
+    """Increment the catalog version after a write and return the new one.
+
+    Called once the products and stocks are written rather than inside their transaction:
+    a single item in every transaction would make concurrent writers cancel each other.
+    Without the bump, clients revalidating with the old version get 304 and keep stale data,
+    so a bump that still fails after max_retries raises CatalogVersionError: the caller fails
+    its request or message, and the retry repeats the idempotent write and the bump.
+    The catalog snapshot builder bumps again from the table streams, which also covers
+    a writer that crashed between its write and its bump.
+    """
+    if not table_name:
+        return None
+    attempt = 0
+    while True:
+        try:
+            response = client.update_item(
+                TableName=table_name,
+                Key=CATALOG_VERSION_KEY,
+                UpdateExpression='ADD #version :one',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={':one': {'N': '1'}},
+                ReturnValues='UPDATED_NEW',
+            )
+            return int(response['Attributes']['version']['N'])
+        except ClientError as error:
+            if attempt >= max_retries:
+                logger.error('Failed to bump the catalog version', attempts=attempt + 1, error=repr(error))
+                raise CatalogVersionError(f'catalog version not bumped after {max_retries} retries') from error
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
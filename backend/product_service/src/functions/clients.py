@@ -0,0 +1,57 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+from metrics import instrument_client
+
+# Shared by every client in the container: pooled keep-alive connections sized for the
+# scan/batch-get thread pools, short timeouts and client-side adaptive retry rate limiting
+CLIENT_CONFIG = Config(
+    max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50')),
+    tcp_keepalive=True,
+    connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '2')),
+    read_timeout=float(os.environ.get('AWS_READ_TIMEOUT_SECONDS', '5')),
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': int(os.environ.get('AWS_MAX_ATTEMPTS', '5')),
+    },
+)
+
+_clients = {}
+_resources = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """Low-level client for service_name, created on first use and reused by warm invocations"""
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(service_name, config=CLIENT_CONFIG)
+                instrument_client(client)
+                _clients[service_name] = client
+    return client
+
+
+def get_resource(service_name: str):
+    """Service resource for service_name, created on first use and reused by warm invocations"""
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = boto3.resource(service_name, config=CLIENT_CONFIG)
+                instrument_client(resource.meta.client)
+                _resources[service_name] = resource
+    return resource
+
+
+def reset_clients() -> None:
+    """Forget cached clients so the next call builds fresh ones"""
+    with _lock:
+        _clients.clear()
+        _resources.clear()
@@ -0,0 +1,105 @@
+import base64
+import gzip
+import os
+from typing import Any, Dict, List, Mapping, Optional
+
+from cache import MISSING, compressed_cache
+
+# brotli is optional: bundle it with the functions (e.g. as a layer) to offer br, without it
+# only gzip is negotiated
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the deployment package
+    brotli = None
+
+ENCODING_GZIP = 'gzip'
+ENCODING_BROTLI = 'br'
+
+# bodies smaller than this go out as they are; compressing them saves less than the headers cost
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# preferred first when the client accepts both with the same weight
+SUPPORTED_ENCODINGS = [ENCODING_BROTLI, ENCODING_GZIP] if brotli is not None else [ENCODING_GZIP]
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Content codings of an Accept-Encoding header with their q weights"""
+    weights = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(accept_encoding: Optional[str], supported: List[str] = None) -> Optional[str]:
+    """The supported encoding the client weighs highest, or None to send the body as it is"""
+    weights = parse_accept_encoding(accept_encoding)
+    best, best_weight = None, 0.0
+    for coding in supported or SUPPORTED_ENCODINGS:
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_BROTLI:
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+def _weak(etag: str) -> str:
+    # the compressed bytes differ from the identity ones, so the tag no longer promises byte equality
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+
+def compress_response(response: Dict[str, Any], accept_encoding: Optional[str],
+                      min_bytes: int = None, precompressed: Mapping[str, bytes] = None) -> Dict[str, Any]:
+    """Encode a 200 response body for the client, as base64 for API Gateway, when it is worth it.
+
+    precompressed maps encodings to bodies that are already encoded, such as a gzip snapshot.
+    Returns the response, changed in place.
+    """
+    headers = response.setdefault('headers', {})
+    headers['Vary'] = 'Accept-Encoding'
+    body = response.get('body')
+    if response.get('statusCode') != 200 or not body or response.get('isBase64Encoded'):
+        return response
+    data = body.encode('utf-8')
+    if len(data) < (COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes):
+        return response
+    precompressed = precompressed or {}
+    # bodies that are already encoded cost nothing, so they win ties
+    supported = list(precompressed) + [coding for coding in SUPPORTED_ENCODINGS if coding not in precompressed]
+    encoding = choose_encoding(accept_encoding, supported)
+    if encoding is None:
+        return response
+
+    etag = headers.get('ETag')
+    encoded = precompressed.get(encoding)
+    if encoded is None:
+        encoded = compressed_cache.get((etag, encoding)) if etag else MISSING
+        if encoded is MISSING:
+            encoded = compress(data, encoding)
+            if etag:
+                compressed_cache.set((etag, encoding), encoded)
+
+    response['body'] = base64.b64encode(encoded).decode('ascii')
+    response['isBase64Encoded'] = True
+    headers['Content-Encoding'] = encoding
+    if etag:
+        headers['ETag'] = _weak(etag)
+    return response
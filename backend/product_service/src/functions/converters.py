@@ -0,0 +1,120 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# 'resource' reads through boto3.resource Tables, whose TypeDeserializer turns every number into
+# a Decimal; 'client' reads raw {'S': ...}/{'N': ...} attribute values with the low-level client
+# and converts them straight into the API's types
+READ_PATH_RESOURCE = 'resource'
+READ_PATH_CLIENT = 'client'
+
+WireItem = Dict[str, Dict[str, Any]]
+
+
+def count_from_wire(count: Dict[str, str]) -> int:
+    # through Decimal, as the resource path reads it: a stray '1.5' truncates instead of raising
+    return int(Decimal(count['N']))
+
+
+def product_from_wire(item: WireItem) -> Dict[str, Any]:
+    """A products table item in wire format as the handlers use it: price as float, no Decimal"""
+    description = item.get('description')
+    product = {
+        'id': item['id']['S'],
+        'title': item['title']['S'],
+        'description': description['S'] if description else '',
+        'price': float(item['price']['N']),
+    }
+    count = item.get('count')
+    if count:
+        # the stock count the write paths keep on the product for the denormalized read model
+        product['count'] = count_from_wire(count)
+    return product
+
+
+def stock_from_wire(item: WireItem) -> Dict[str, Any]:
+    count = item.get('count')
+    return {
+        'product_id': item['product_id']['S'],
+        'count': count_from_wire(count) if count else 0,
+    }
+
+
+def key_to_wire(key: Dict[str, Any]) -> WireItem:
+    """A plain primary key ({'id': '...'}) as the low-level client expects it"""
+    return {
+        name: {'N': str(value)} if isinstance(value, (int, float)) else {'S': value}
+        for name, value in key.items()
+    }
+
+
+def key_from_wire(key: WireItem) -> Dict[str, Any]:
+    """Inverse of key_to_wire for the string and number keys of our tables"""
+    plain = {}
+    for name, value in key.items():
+        if 'S' in value:
+            plain[name] = value['S']
+        else:
+            number = value['N']
+            plain[name] = float(number) if '.' in number or 'e' in number.lower() else int(number)
+    return plain
+
+
+class ClientTable:
+    """Scan a table through the low-level client behind the Table.scan interface.
+
+    Items come back already converted by converter, and keys go in and out in the plain form
+    the resource uses, so scan_all, get_products_page and the pagination cursor work unchanged.
+    """
+
+    def __init__(self, client, table_name: str, converter: Callable[[WireItem], Dict[str, Any]]):
+        self.client = client
+        self.table_name = table_name
+        self.converter = converter
+
+    def scan(self, **scan_kwargs) -> Dict[str, Any]:
+        start_key = scan_kwargs.get('ExclusiveStartKey')
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = key_to_wire(start_key)
+        response = self.client.scan(TableName=self.table_name, **scan_kwargs)
+        result = {'Items': [self.converter(item) for item in response.get('Items', [])]}
+        last_key: Optional[WireItem] = response.get('LastEvaluatedKey')
+        if last_key:
+            result['LastEvaluatedKey'] = key_from_wire(last_key)
+        return result
+
+
+class WireClient:
+    """query and scan in wire format through the client of a boto3 resource.
+
+    A resource's meta.client serializes plain values into attribute values and back, so a wire
+    format request would be encoded twice; this undoes that around each call, for the code that
+    builds wire requests (catalog_query) when the handler was given a resource.
+    """
+
+    _deserializer = TypeDeserializer()
+    _serializer = TypeSerializer()
+
+    def __init__(self, client):
+        self.client = client
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        return self._call(self.client.query, kwargs)
+
+    def scan(self, **kwargs) -> Dict[str, Any]:
+        return self._call(self.client.scan, kwargs)
+
+    def _call(self, operation, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        for name in ('ExpressionAttributeValues', 'ExclusiveStartKey'):
+            if kwargs.get(name):
+                kwargs[name] = {key: self._deserializer.deserialize(value) for key, value in kwargs[name].items()}
+        response = operation(**kwargs)
+        if 'Items' in response:
+            response['Items'] = [self._to_wire(item) for item in response['Items']]
+        if response.get('LastEvaluatedKey'):
+            response['LastEvaluatedKey'] = self._to_wire(response['LastEvaluatedKey'])
+        return response
+
+    def _to_wire(self, item: Dict[str, Any]) -> WireItem:
+        return {name: self._serializer.serialize(value) for name, value in item.items()}
@@ -1,15 +1,19 @@
+import base64
 import json
 from typing import Any, Dict
-import boto3
+from catalog_items import is_same_product, put_product_requests, validate_product
+from catalog_version import bump_catalog_version, catalog_meta_table_name
+from clients import get_client
+from converters import product_from_wire
+from idempotency import InvalidIdempotencyKey, get_idempotency_key, idempotent_id
+from logger import get_logger
+from metrics import instrumented, metrics
+from serialization import dumps
+from transactions import transact_write
 import os
 import uuid
-from decimal import Decimal
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super().default(obj)
+logger = get_logger('create_product')
 
 # Initialize DynamoDB resource
 def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
@@ -21,121 +25,83 @@ def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
             "Access-Control-Allow-Credentials": True,
             "Content-Type": "application/json"
         },
-        "body": json.dumps(body, cls=DecimalEncoder)
+        "body": dumps(body)
     }
 
-def to_dynamo_request(parsed, requests):
-    product_id = str(uuid.uuid4())
-    title = parsed['Title']
-    description = parsed['Description']
-    price = parsed['Price']
-    count = parsed['Count']
-    new_product = {
-        'id': {
-            'S': product_id,
-        },
-        'title': {
-            'S': title,
-        },
-        'description': {
-            'S': description,
-        },
-        'price': {
-            'N': price
-        },
-    }
-    requests.append({
-        'Put': {
-            'TableName': products_table,
-            'Item': new_product
-        }
-    })
-    new_stock = {
-        'product_id': {
-            'S': product_id,
-        },
-        'count': {
-            'N': count,
-        },
-    }
-    requests.append({
-        'Put': {
-            'TableName': stocks_table,
-            'Item': new_stock
+def write_to_dynamo(requests, dynamodb):
+    """Returns the items that were already written by an earlier attempt"""
+    return transact_write(dynamodb, requests)
+
+def idempotency_key_reused() -> Dict[str, Any]:
+    return create_response(409, {
+        "message": "Idempotency-Key was already used for a different product",
+        "statusCode": 409,
+        "error": {
+            "code": "IDEMPOTENCY_KEY_REUSED"
         }
     })
-    
-def write_to_dynamo(requests, dynamodb):
-    dynamodb.transact_write_items(
-        TransactItems=requests
-    )
 
+@instrumented('create_product')
 def handler(event, context : Any, dynamodb = None):
     
-    dynamodb = boto3.client('dynamodb') if not dynamodb else dynamodb
+    dynamodb = get_client('dynamodb') if not dynamodb else dynamodb
     products_table = os.environ['PRODUCTS_TABLE_NAME']
     stocks_table = os.environ['STOCKS_TABLE_NAME']
 
-    print(f"Incoming request: {json.dumps(event)}")
+    logger.debug('Incoming request', event=lambda: event)
 
     try:
-        body = json.loads(event['body'])
+        with metrics.span('parse'):
+            raw_body = event['body']
+            if event.get('isBase64Encoded'):
+                # the API treats */* as binary so compressed responses pass through, which
+                # makes API Gateway hand request bodies over base64 encoded as well
+                raw_body = base64.b64decode(raw_body)
+            body = json.loads(raw_body)
 
         # Validate required fields
-        required_fields = ['title', 'description', 'price', 'count']
-        missing_fields = [field for field in required_fields if field not in body]
-        if missing_fields:
+        error = validate_product(body)
+        if error:
             return {
                 'statusCode': 400,
-                'body': json.dumps({'message': f"Missing required fields: {', '.join(missing_fields)}"})
+                'body': json.dumps({'message': error})
             }
 
-        product_id = str(uuid.uuid4())
-        requests = []
-        title = body['title']
-        description = body['description']
-        price = body['price']
-        count = body['count']
-        new_product = {
-            'id': {
-                'S': product_id,
-            },
-            'title': {
-                'S': title,
-            },
-            'description': {
-                'S': description,
-            },
-            'price': {
-                'N': str(price)
-            },
-        }
-        requests.append({
-            'Put': {
-                'TableName': products_table,
-                'Item': new_product
-            }
-        })
-        new_stock = {
-            'product_id': {
-                'S': product_id,
-            },
-            'count': {
-                'N': str(count),
-            },
-        }
-        requests.append({
-            'Put': {
-                'TableName': stocks_table,
-                'Item': new_stock
+        # with an Idempotency-Key a retried request gets the same id, and is not written twice
+        try:
+            idempotency_key = get_idempotency_key(event)
+        except InvalidIdempotencyKey as error:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'message': str(error)})
             }
-        })
+        product_id = idempotent_id(idempotency_key, 'product') if idempotency_key else str(uuid.uuid4())
+        requests = put_product_requests(
+            products_table, stocks_table, product_id,
+            body['title'], body['description'], body['price'], body['count']
+        )
+        new_product, new_stock = [request['Put']['Item'] for request in requests]
         # Perform a transaction to ensure both product and stock are created together
         try:
-            write_to_dynamo(requests, dynamodb=dynamodb)
-            print(f"Transaction successful: Product {new_product} and Stock {new_stock} created")
+            with metrics.span('write'):
+                written_before = write_to_dynamo(requests, dynamodb=dynamodb)
+                replayed = len(written_before) == len(requests)
+                # a retry leaves what the first attempt wrote; answer with that, unless the
+                # key was reused for another body, which was then not written at all
+                # (the stack grants this function read on the products table for it)
+                stored = dynamodb.get_item(
+                    TableName=products_table, Key={'id': {'S': product_id}}, ConsistentRead=True
+                ).get('Item') if written_before else None
+                if stored and not is_same_product(stored, body):
+                    logger.warning('Idempotency-Key reused for a different product', productId=product_id)
+                    return idempotency_key_reused()
+                # invalidates the ETag of GET /products; also on a replay, whose first attempt
+                # may have failed to bump, and a failed bump fails the request so it is retried
+                bump_catalog_version(dynamodb, catalog_meta_table_name())
+            logger.info('Product created', productId=product_id, replayed=replayed)
+            logger.debug('Created items', product=lambda: new_product, stock=lambda: new_stock)
         except Exception as e:
-            print(f"Transaction failed: {e}")
+            logger.error('Transaction failed', productId=product_id, error=repr(e))
             return {
                 'statusCode': 500,
                 'body': json.dumps({'message': 'Transaction failed', 'error': str(e)})
@@ -143,17 +109,17 @@ def handler(event, context : Any, dynamodb = None):
 
         response_body = {
             'message': 'Product and stock created successfully',
-            'product': new_product,
-            'stock': new_stock
+            # from the item either way, so a replay answers exactly as the first attempt did
+            'product': product_from_wire(stored or new_product)
         }
 
         return {
             'statusCode': 201,
-            'body': json.dumps(response_body, default=str)
+            'body': dumps(response_body)
         }
 
     except Exception as error:
-        print(f"Error: {str(error)}")  # Basic error logging
+        logger.error('Failed to create product', error=repr(error))
         return create_response(500, {
             "message": "Internal server error",
             "statusCode": 500,
@@ -0,0 +1,162 @@
+import base64
+import json
+import os
+import uuid
+from typing import Any, Dict, List
+
+from batch_get import batch_get_items
+from catalog_items import is_same_product, put_product_requests, validate_product
+from catalog_version import bump_catalog_version, catalog_meta_table_name
+from clients import get_client
+from converters import product_from_wire
+from idempotency import InvalidIdempotencyKey, get_idempotency_key, idempotent_id
+from logger import get_logger
+from metrics import instrumented, metrics
+from serialization import dumps
+from transactions import write_transactions
+
+logger = get_logger('create_products_batch')
+
+BATCH_CREATE_MAX_ITEMS = int(os.environ.get('BATCH_CREATE_MAX_ITEMS', '500'))
+
+
+class InvalidBatch(ValueError):
+    """Raised when a batch request body is not a list of products that can be processed"""
+
+
+def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Helper function to create standardized response"""
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Credentials": True,
+            "Content-Type": "application/json"
+        },
+        "body": dumps(body)
+    }
+
+
+def bad_request(error: Exception) -> Dict[str, Any]:
+    return create_response(400, {
+        "message": f"Bad Request: {error}",
+        "statusCode": 400,
+        "error": {
+            "code": "INVALID_REQUEST"
+        }
+    })
+
+
+def parse_batch(event: Dict[str, Any]) -> List[Any]:
+    """The products of a {"products": [...]} body"""
+    raw_body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        # */* is a binary media type of the API, so request bodies arrive base64 encoded
+        raw_body = base64.b64decode(raw_body)
+    try:
+        body = json.loads(raw_body)
+    except ValueError:
+        raise InvalidBatch('body must be JSON')
+    products = body.get('products') if isinstance(body, dict) else None
+    if not isinstance(products, list) or not products:
+        raise InvalidBatch('products must be a non-empty list')
+    if len(products) > BATCH_CREATE_MAX_ITEMS:
+        raise InvalidBatch(f'at most {BATCH_CREATE_MAX_ITEMS} products can be created at once')
+    return products
+
+
+def product_id_for(idempotency_key: str, index: int) -> str:
+    """The id of the product at index; derived from the Idempotency-Key when there is one,
+    so a retried batch writes the same products again instead of creating copies"""
+    return idempotent_id(idempotency_key, 'product', index) if idempotency_key else str(uuid.uuid4())
+
+
+def create_products(dynamodb, products: List[Any], idempotency_key: str = None) -> List[Dict[str, Any]]:
+    """Validate and write products; one result per product, in request order"""
+    products_table = os.environ['PRODUCTS_TABLE_NAME']
+    stocks_table = os.environ['STOCKS_TABLE_NAME']
+
+    results, groups, created = [], [], {}
+    for index, product in enumerate(products):
+        error = validate_product(product)
+        if error:
+            results.append({"index": index, "status": 400, "error": {"code": "INVALID_PRODUCT", "message": error}})
+            continue
+        product_id = product_id_for(idempotency_key, index)
+        requests = put_product_requests(
+            products_table, stocks_table, product_id,
+            product['title'], product['description'], product['price'], product['count']
+        )
+        groups.append((index, requests))
+        # the request, to compare with a stored product, and the item it writes
+        created[index] = (product, requests[0]['Put']['Item'])
+        results.append(None)
+
+    failed, existing, stored = set(), set(), {}
+    if groups:
+        with metrics.span('write'):
+            # products and their stock rows go in chunked transactions, each product atomically
+            failed = write_transactions(dynamodb, groups, existing=existing)
+            if len(failed) < len(groups):
+                # invalidates the ETag of GET /products; a failed bump fails the request,
+                # and the retry with the same Idempotency-Key bumps again
+                bump_catalog_version(dynamodb, catalog_meta_table_name())
+            # products of a retried batch stay as the first attempt wrote them; read them back
+            # to answer with what is stored, and to catch a key reused for a different body
+            # (the stack grants this function read on the products table for it)
+            replayed = [created[index][1]['id']['S'] for index in sorted(existing - failed)]
+            if replayed:
+                stored = {
+                    item['id']['S']: item for item in batch_get_items(
+                        dynamodb, products_table, [{'id': {'S': product_id}} for product_id in replayed],
+                        ConsistentRead=True
+                    )
+                }
+
+    for index, (product, new_item) in created.items():
+        item = stored.get(new_item['id']['S'])
+        if index in failed:
+            results[index] = {"index": index, "status": 500, "error": {"code": "WRITE_FAILED"}}
+        elif item and not is_same_product(item, product):
+            results[index] = {"index": index, "status": 409, "error": {
+                "code": "IDEMPOTENCY_KEY_REUSED",
+                "message": "Idempotency-Key was already used for a different product at this index"
+            }}
+        else:
+            # from the item either way, so a replay answers exactly as the first attempt did
+            results[index] = {"index": index, "status": 201, "product": product_from_wire(item or new_item)}
+    return results
+
+
+@instrumented('create_products_batch')
+def handler(event: Dict[str, Any], context: Any, dynamodb = None) -> Dict[str, Any]:
+    try:
+        try:
+            with metrics.span('parse'):
+                products = parse_batch(event)
+                idempotency_key = get_idempotency_key(event)
+        except (InvalidBatch, InvalidIdempotencyKey) as error:
+            return bad_request(error)
+
+        dynamodb = get_client('dynamodb') if not dynamodb else dynamodb
+        results = create_products(dynamodb, products, idempotency_key)
+        created = sum(1 for result in results if result['status'] == 201)
+        logger.info('Created products', requested=len(products), created=created,
+                    idempotent=idempotency_key is not None)
+
+        # 201 when every product was created, otherwise 207 and the status of each in results
+        return create_response(201 if created == len(results) else 207, {
+            "created": created,
+            "failed": len(results) - created,
+            "results": results
+        })
+    except Exception as error:
+        logger.error('Failed to create products', error=repr(error))
+        return create_response(500, {
+            "message": "Internal server error",
+            "statusCode": 500,
+            "error": {
+                "code": "INTERNAL_SERVER_ERROR",
+                "details": str(error)
+            }
+        })
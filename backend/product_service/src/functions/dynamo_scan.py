@@ -0,0 +1,38 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# Number of parallel scan segments per table; 1 keeps the plain sequential scan
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+
+
+def scan_segment(table, segment: int = 0, total_segments: int = 1, **scan_kwargs) -> List[Dict[str, Any]]:
+    """Scan one segment of a table, following LastEvaluatedKey until the segment is exhausted"""
+    if total_segments > 1:
+        scan_kwargs['Segment'] = segment
+        scan_kwargs['TotalSegments'] = total_segments
+
+    items = []
+    while True:
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+
+def scan_all(table, total_segments: int = SCAN_SEGMENTS, **scan_kwargs) -> List[Dict[str, Any]]:
+    """Scan a whole table, splitting it into parallel segments when total_segments > 1"""
+    if total_segments <= 1:
+        return scan_segment(table, **scan_kwargs)
+
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        futures = [
+            pool.submit(scan_segment, table, segment, total_segments, **dict(scan_kwargs))
+            for segment in range(total_segments)
+        ]
+        items = []
+        for future in futures:
+            items.extend(future.result())
+        return items
@@ -0,0 +1,50 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """Request header value by case-insensitive name, or None"""
+    headers = event.get('headers') or {}
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def content_etag(body: str) -> str:
+    """Strong ETag from a hash of the serialized response body"""
+    return f'"{_digest(body)}"'
+
+
+def version_etag(version: int, *variant: Any) -> str:
+    """ETag from a data version, without reading the data; variant tells apart responses of the same version"""
+    if not variant:
+        return f'"v{version}"'
+    return f'"v{version}-{_digest("/".join(str(part) for part in variant))}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored, '*' matches anything"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(event: Dict[str, Any], etag: str) -> bool:
+    return etag_matches(get_header(event, 'If-None-Match'), etag)
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # exposed so browser code can read it and send it back on its own
+    return {"ETag": etag, "Access-Control-Expose-Headers": "ETag"}
@@ -1,38 +1,91 @@
-from decimal import Decimal
-import json
 import os
 from typing import Dict, Any
 
-import boto3
+from clients import get_client, get_resource
+from batch_get import batch_get_request
+from cache import MISSING, cache_stats, is_cache_bypassed, products_cache, stocks_cache
+from catalog_items import READ_MODEL_DENORMALIZED, READ_MODEL_JOINED
+from converters import READ_PATH_CLIENT, READ_PATH_RESOURCE, product_from_wire, stock_from_wire
+from etag import content_etag, etag_headers, is_not_modified
+from logger import get_logger
+from metrics import instrumented, metrics
+from serialization import convert_attributes, dumps
 
-def get_product_by_id(products_table, product_id):
-    response = products_table.get_item(Key={'id': product_id})
-    item = response.get('Item')
-    return item
+logger = get_logger('get_product_by_id')
 
-def get_stock_by_product_id(stocks_table, product_id):
-    response = stocks_table.get_item(Key={'product_id': product_id})
-    item = response.get('Item')
-    return item    
+READ_PATH = os.environ.get('READ_PATH', READ_PATH_RESOURCE)
+READ_MODEL = os.environ.get('READ_MODEL', READ_MODEL_JOINED)
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super().default(obj)
+def get_product_with_stock(dynamodb, products_table_name, stocks_table_name, product_id):
+    """Fetch the product and its stock row in a single BatchGetItem round trip"""
+    results = batch_get_request(dynamodb, {
+        products_table_name: {'Keys': [{'id': product_id}]},
+        stocks_table_name: {'Keys': [{'product_id': product_id}]},
+    })
+    product = next(iter(results.get(products_table_name, [])), None)
+    stock = next(iter(results.get(stocks_table_name, [])), None)
+    return product, stock
+
+def transact_get_product_with_stock(dynamodb, products_table_name, stocks_table_name, product_id):
+    """Fetch the product and its stock row as one consistent snapshot with TransactGetItems"""
+    # the resource's client (de)serializes attribute values like the Table API does
+    response = dynamodb.meta.client.transact_get_items(TransactItems=[
+        {'Get': {'TableName': products_table_name, 'Key': {'id': product_id}}},
+        {'Get': {'TableName': stocks_table_name, 'Key': {'product_id': product_id}}},
+    ])
+    product, stock = [item.get('Item') for item in response['Responses']]
+    return product, stock
+
+def get_product_with_stock_from_client(client, products_table_name, stocks_table_name, product_id, consistent=False):
+    """The product and its stock row read with the low-level client and converted straight from wire format"""
+    product_key = {'id': {'S': product_id}}
+    stock_key = {'product_id': {'S': product_id}}
+    if consistent:
+        response = client.transact_get_items(TransactItems=[
+            {'Get': {'TableName': products_table_name, 'Key': product_key}},
+            {'Get': {'TableName': stocks_table_name, 'Key': stock_key}},
+        ])
+        product, stock = [item.get('Item') for item in response['Responses']]
+    else:
+        results = batch_get_request(client, {
+            products_table_name: {'Keys': [product_key]},
+            stocks_table_name: {'Keys': [stock_key]},
+        })
+        product = next(iter(results.get(products_table_name, [])), None)
+        stock = next(iter(results.get(stocks_table_name, [])), None)
+    return (product_from_wire(product) if product else None), (stock_from_wire(stock) if stock else None)
+
+def get_denormalized_product(dynamodb, products_table_name, product_id, consistent=False, read_path=READ_PATH_RESOURCE):
+    """The product item, which carries its stock count, in a single GetItem"""
+    if read_path == READ_PATH_CLIENT:
+        item = dynamodb.get_item(
+            TableName=products_table_name, Key={'id': {'S': product_id}}, ConsistentRead=consistent
+        ).get('Item')
+        return product_from_wire(item) if item else None
+    return dynamodb.Table(products_table_name).get_item(Key={'id': product_id}, ConsistentRead=consistent).get('Item')
+
+def is_consistent_read(event: Dict[str, Any]) -> bool:
+    query_parameters = event.get('queryStringParameters') or {}
+    return str(query_parameters.get('consistent', '')).lower() in ('true', '1')
 
 def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
     """Helper function to create standardized response"""
+    return create_json_response(status_code, dumps(body))
+
+def create_json_response(status_code: int, body: str, headers: Dict[str, str] = None) -> Dict[str, Any]:
+    """Response with a body that is already serialized JSON"""
     return {
         "statusCode": status_code,
         "headers": {
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Credentials": True,
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            **(headers or {})
         },
-        "body": json.dumps(body, cls=DecimalEncoder)
+        "body": body
     }
 
+@instrumented('get_product_by_id')
 def handler(event: Dict[str, Any], context: Any, dynamodb = None) -> Dict[str, Any]:
     try:
         # Check if pathParameters exists and contains productId
@@ -49,12 +102,42 @@ def handler(event: Dict[str, Any], context: Any, dynamodb = None) -> Dict[str, A
                 "message": "Bad Request: ProductId cannot be empty"
             })
 
-        dynamodb = boto3.resource('dynamodb') if not dynamodb else dynamodb
-        products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE_NAME'])
-        stocks_table = dynamodb.Table(os.environ['STOCKS_TABLE_NAME'])
+        consistent = is_consistent_read(event)
+        bypass_cache = consistent or is_cache_bypassed(event)
+        product = MISSING if bypass_cache else products_cache.get(product_id)
+        stock_count = MISSING if bypass_cache else stocks_cache.get(product_id)
 
-        # Find the product
-        product = get_product_by_id(products_table, product_id)
+        if product is MISSING or stock_count is MISSING:
+            products_table_name = os.environ['PRODUCTS_TABLE_NAME']
+            stocks_table_name = os.environ['STOCKS_TABLE_NAME']
+
+            # Find the product and its stock in one round trip
+            with metrics.span('fetch'):
+                if READ_PATH == READ_PATH_CLIENT:
+                    dynamodb = get_client('dynamodb') if not dynamodb else dynamodb
+                else:
+                    dynamodb = get_resource('dynamodb') if not dynamodb else dynamodb
+                if READ_MODEL == READ_MODEL_DENORMALIZED:
+                    product = get_denormalized_product(
+                        dynamodb, products_table_name, product_id, consistent, READ_PATH
+                    )
+                    # the product item carries the count
+                    stock = product
+                elif READ_PATH == READ_PATH_CLIENT:
+                    product, stock = get_product_with_stock_from_client(
+                        dynamodb, products_table_name, stocks_table_name, product_id, consistent
+                    )
+                else:
+                    fetch = transact_get_product_with_stock if consistent else get_product_with_stock
+                    product, stock = fetch(dynamodb, products_table_name, stocks_table_name, product_id)
+            stock_count = int(stock.get('count', 0)) if stock else 0
+            if product:
+                convert_attributes([product])
+                products_cache.set(product_id, product)
+                stocks_cache.set(product_id, stock_count)
+            else:
+                products_cache.invalidate(product_id)
+        logger.debug('Cache stats', cache=cache_stats)
         
         # Return 404 if product not found
         if not product:
@@ -66,24 +149,26 @@ def handler(event: Dict[str, Any], context: Any, dynamodb = None) -> Dict[str, A
                     "productId": product_id
                 }
             })
-        print(f"Fetched products: {product}")
+        logger.debug('Fetched product', product=lambda: product)
 
-        stock = get_stock_by_product_id(stocks_table, product_id)
-        stock_count = stock.get('count', 0) if stock else 0
-        
         output_product = {
             'id': product_id,
             'title': product['title'],
             'description': product['description'],
-            'price': float(product['price']),
-            'count': int(stock_count)
+            'price': product['price'],
+            'count': stock_count
         }
 
-        # Return the product if found
-        return create_response(200, output_product)
+        # Return the product if found, or 304 when the client's copy has the same content hash
+        with metrics.span('serialize'):
+            body = dumps(output_product)
+            etag = content_etag(body)
+        if is_not_modified(event, etag):
+            return create_json_response(304, '', etag_headers(etag))
+        return create_json_response(200, body, etag_headers(etag))
         
     except Exception as error:
-        print(f"Error: {str(error)}")  # Basic error logging
+        logger.error('Failed to get product', error=repr(error))
         return create_response(500, {
             "message": "Internal server error",
             "statusCode": 500,
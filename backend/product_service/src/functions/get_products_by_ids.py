@@ -0,0 +1,200 @@
+import base64
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from batch_get import BATCH_GET_MAX_KEYS, BATCH_GET_WORKERS, batch_get_request, chunks
+from cache import cache_stats, is_cache_bypassed, products_cache, stocks_cache
+from catalog_items import READ_MODEL_DENORMALIZED, READ_MODEL_JOINED
+from clients import get_client, get_resource
+from compression import compress_response
+from converters import READ_PATH_CLIENT, READ_PATH_RESOURCE, product_from_wire, stock_from_wire
+from etag import content_etag, etag_headers, get_header, is_not_modified
+from logger import get_logger
+from metrics import instrumented, metrics
+from serialization import convert_attributes, dumps
+
+logger = get_logger('get_products_by_ids')
+
+READ_PATH = os.environ.get('READ_PATH', READ_PATH_RESOURCE)
+READ_MODEL = os.environ.get('READ_MODEL', READ_MODEL_JOINED)
+BATCH_LOOKUP_MAX_IDS = int(os.environ.get('BATCH_LOOKUP_MAX_IDS', '300'))
+
+
+class InvalidProductIds(ValueError):
+    """Raised when the ids of a batch lookup are missing, malformed or too many"""
+
+
+def validate_ids(ids: Any) -> List[str]:
+    if not isinstance(ids, list) or not ids:
+        raise InvalidProductIds('ids must be a non-empty list of product ids')
+    if len(ids) > BATCH_LOOKUP_MAX_IDS:
+        raise InvalidProductIds(f'at most {BATCH_LOOKUP_MAX_IDS} ids can be looked up at once')
+    if not all(isinstance(product_id, str) and product_id for product_id in ids):
+        raise InvalidProductIds('every id must be a non-empty string')
+    return ids
+
+
+def parse_ids_parameter(value: str) -> List[str]:
+    """ids of GET /products?ids=a,b,c"""
+    return validate_ids([product_id.strip() for product_id in value.split(',') if product_id.strip()])
+
+
+def parse_ids_body(event: Dict[str, Any]) -> List[str]:
+    """ids of POST /products/batch-get, a {"ids": [...]} body"""
+    raw_body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        # */* is a binary media type of the API, so request bodies arrive base64 encoded
+        raw_body = base64.b64decode(raw_body)
+    try:
+        body = json.loads(raw_body)
+    except ValueError:
+        raise InvalidProductIds('body must be JSON')
+    return validate_ids(body.get('ids') if isinstance(body, dict) else None)
+
+
+def fetch_products_with_stocks(dynamodb, products_table_name: str, stocks_table_name: str, product_ids: List[str],
+                               read_path: str = READ_PATH_RESOURCE, read_model: str = READ_MODEL_JOINED,
+                               max_workers: int = BATCH_GET_WORKERS):
+    """Products and stock counts of product_ids, keyed by id, with concurrent BatchGetItem calls.
+
+    Each call asks for a chunk of products together with their stock rows, so a product and its
+    count always arrive in the same round trip. The denormalized read model reads products only.
+    """
+    wire = read_path == READ_PATH_CLIENT
+    with_stocks = read_model != READ_MODEL_DENORMALIZED
+    chunk_size = BATCH_GET_MAX_KEYS // 2 if with_stocks else BATCH_GET_MAX_KEYS
+
+    def _fetch(id_chunk):
+        request = {products_table_name: {'Keys': [{'id': {'S': i} if wire else i} for i in id_chunk]}}
+        if with_stocks:
+            request[stocks_table_name] = {'Keys': [{'product_id': {'S': i} if wire else i} for i in id_chunk]}
+        return batch_get_request(dynamodb, request)
+
+    id_chunks = chunks(product_ids, chunk_size)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(id_chunks)))) as pool:
+        results = list(pool.map(_fetch, id_chunks))
+
+    products, counts = {}, {}
+    for result in results:
+        for item in result.get(products_table_name, []):
+            product = product_from_wire(item) if wire else convert_attributes([item])[0]
+            products[product['id']] = product
+        for item in result.get(stocks_table_name, []):
+            stock = stock_from_wire(item) if wire else item
+            counts[stock['product_id']] = int(stock.get('count', 0))
+    if not with_stocks:
+        counts = {product_id: int(product.get('count', 0)) for product_id, product in products.items()}
+    return products, counts
+
+
+def get_products_by_ids(dynamodb, product_ids: List[str], bypass_cache: bool = False) -> List[Dict[str, Any]]:
+    """One entry per requested id, in request order: the product, or a not-found marker"""
+    unique_ids = list(dict.fromkeys(product_ids))
+    if bypass_cache:
+        products, counts, missing = {}, {}, unique_ids
+    else:
+        products, _ = products_cache.get_many(unique_ids)
+        counts, _ = stocks_cache.get_many(unique_ids)
+        missing = [product_id for product_id in unique_ids
+                   if product_id not in products or product_id not in counts]
+
+    if missing:
+        if READ_PATH == READ_PATH_CLIENT:
+            dynamodb = get_client('dynamodb') if not dynamodb else dynamodb
+        else:
+            dynamodb = get_resource('dynamodb') if not dynamodb else dynamodb
+        with metrics.span('fetch'):
+            fetched_products, fetched_counts = fetch_products_with_stocks(
+                dynamodb, os.environ['PRODUCTS_TABLE_NAME'], os.environ['STOCKS_TABLE_NAME'], missing,
+                READ_PATH, READ_MODEL
+            )
+        for product_id in missing:
+            product = fetched_products.get(product_id)
+            if product is None:
+                products.pop(product_id, None)
+                products_cache.invalidate(product_id)
+                continue
+            count = fetched_counts.get(product_id, 0)
+            products[product_id], counts[product_id] = product, count
+            products_cache.set(product_id, product)
+            stocks_cache.set(product_id, count)
+    logger.debug('Cache stats', cache=cache_stats)
+
+    results = []
+    for product_id in product_ids:
+        product = products.get(product_id)
+        if product is None:
+            results.append({'id': product_id, 'error': {'code': 'PRODUCT_NOT_FOUND'}})
+            continue
+        results.append({
+            'id': product_id,
+            'title': product['title'],
+            'description': product['description'],
+            'price': product['price'],
+            'count': counts.get(product_id, 0)
+        })
+    return results
+
+
+def create_response(status_code: int, body: Any, headers: Dict[str, str] = None) -> Dict[str, Any]:
+    """Helper function to create standardized response"""
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Credentials": True,
+            "Content-Type": "application/json",
+            **(headers or {})
+        },
+        "body": body if isinstance(body, str) else dumps(body)
+    }
+
+
+def bad_request(error: Exception) -> Dict[str, Any]:
+    return create_response(400, {
+        "message": f"Bad Request: {error}",
+        "statusCode": 400,
+        "error": {
+            "code": "INVALID_REQUEST"
+        }
+    })
+
+
+def lookup_response(event: Dict[str, Any], product_ids: List[str], dynamodb=None) -> Dict[str, Any]:
+    """200 with {"items": [...]} for product_ids, or 304 when the client's copy has the same content hash"""
+    products = get_products_by_ids(dynamodb, product_ids, is_cache_bypassed(event))
+    found = sum(1 for product in products if 'error' not in product)
+    logger.debug('Looked up products', requested=len(product_ids), found=found)
+    with metrics.span('serialize'):
+        body = dumps({"items": products})
+        etag = content_etag(body)
+    if is_not_modified(event, etag):
+        response = create_response(304, '', etag_headers(etag))
+    else:
+        response = create_response(200, body, etag_headers(etag))
+    with metrics.span('compress'):
+        return compress_response(response, get_header(event, 'Accept-Encoding'))
+
+
+@instrumented('get_products_by_ids')
+def handler(event: Dict[str, Any], context: Any, dynamodb = None) -> Dict[str, Any]:
+    """POST /products/batch-get; GET /products?ids= is answered by get_products_list through lookup_response"""
+    try:
+        try:
+            with metrics.span('parse'):
+                product_ids = parse_ids_body(event)
+        except InvalidProductIds as error:
+            return bad_request(error)
+        return lookup_response(event, product_ids, dynamodb)
+    except Exception as error:
+        logger.error('Failed to look up products', error=repr(error))
+        return create_response(500, {
+            "message": "Internal server error",
+            "statusCode": 500,
+            "error": {
+                "code": "INTERNAL_SERVER_ERROR",
+                "details": str(error)
+            }
+        })
@@ -1,61 +1,279 @@
-from decimal import Decimal
 import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from mocks.products import products
-import boto3
+from clients import get_client, get_resource
 from botocore.exceptions import ClientError
+from batch_get import batch_get_items
+from cache import MISSING, cache_stats, is_cache_bypassed, products_cache, stocks_cache, sync_generation
+from catalog_items import READ_MODEL_DENORMALIZED, READ_MODEL_JOINED
+from catalog_query import InvalidCatalogQuery, parse_catalog_query, query_catalog
+from catalog_version import catalog_meta_table_name, read_catalog_version
+from compression import ENCODING_GZIP, compress_response
+from converters import (
+    READ_PATH_CLIENT, READ_PATH_RESOURCE, ClientTable, WireClient, product_from_wire, stock_from_wire
+)
+from dynamo_scan import SCAN_SEGMENTS, scan_all
+from etag import content_etag, etag_headers, get_header, is_not_modified, version_etag
+from get_products_by_ids import InvalidProductIds, lookup_response, parse_ids_parameter
+from logger import get_logger
+from metrics import instrumented, metrics
+from pagination import InvalidPaginationParameter, encode_cursor, parse_pagination
+from serialization import convert_attributes, dumps
+from snapshot import snapshot_store
 
+logger = get_logger('get_products_list')
 
-def get_products_list(products_table):
-    products_response = products_table.scan()
-    products_list = products_response.get('Items', [])    
-    return products_list
+READ_PATH = os.environ.get('READ_PATH', READ_PATH_RESOURCE)
+READ_MODEL = os.environ.get('READ_MODEL', READ_MODEL_JOINED)
 
-def get_stocks_dict(stocks_table):
-    stocks_response = stocks_table.scan()
-    stocks = {stock['product_id']: stock['count'] for stock in stocks_response.get('Items', [])}
-    return stocks
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super().default(obj)
+def get_products_list(products_table, total_segments=SCAN_SEGMENTS):
+    # numbers are converted once here, so cached products are ready to serialize
+    return convert_attributes(scan_all(products_table, total_segments))
+
+def to_stocks_dict(stock_items):
+    return {stock['product_id']: int(stock['count']) for stock in stock_items}
+
+def get_products_page(products_table, limit, start_key=None):
+    """Read up to limit products starting after start_key, returning (items, last_evaluated_key)"""
+    items = []
+    scan_kwargs = {}
+    if start_key:
+        scan_kwargs['ExclusiveStartKey'] = start_key
+    while True:
+        response = products_table.scan(Limit=limit - len(items), **scan_kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or len(items) >= limit:
+            return convert_attributes(items), last_key
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+def get_stocks_for_ids(dynamodb, stocks_table_name, product_ids, read_path=READ_PATH_RESOURCE):
+    """Fetch stock rows only for the given product ids with chunked, concurrent BatchGetItem calls"""
+    if read_path == READ_PATH_CLIENT:
+        keys = [{'product_id': {'S': product_id}} for product_id in dict.fromkeys(product_ids)]
+        return to_stocks_dict(stock_from_wire(item) for item in batch_get_items(dynamodb, stocks_table_name, keys))
+    keys = [{'product_id': product_id} for product_id in dict.fromkeys(product_ids)]
+    return to_stocks_dict(batch_get_items(dynamodb, stocks_table_name, keys))
+
+def get_stock_counts(dynamodb, stocks_table_name, product_ids, bypass_cache=False, read_path=READ_PATH_RESOURCE):
+    """Stock counts for the given product ids, fetching only those missing from the warm cache"""
+    product_ids = list(dict.fromkeys(product_ids))
+    if bypass_cache:
+        counts, missing = {}, product_ids
+    else:
+        counts, missing = stocks_cache.get_many(product_ids)
+    if missing:
+        fetched = get_stocks_for_ids(dynamodb, stocks_table_name, missing, read_path)
+        # products without a stock row are cached as zero so they are not looked up again
+        fetched = {product_id: fetched.get(product_id, 0) for product_id in missing}
+        stocks_cache.set_many(fetched)
+        counts.update(fetched)
+    return counts
+
+def counts_from_products(products):
+    """Denormalized read model: each product item carries its own stock count"""
+    return {p['id']: p.get('count', 0) for p in products}
+
+def join_stock_counts(dynamodb, stocks_table_name, products, bypass_cache=False):
+    """Stock counts for products, from the items themselves or from the stocks table"""
+    if READ_MODEL == READ_MODEL_DENORMALIZED:
+        return counts_from_products(products)
+    return get_stock_counts(dynamodb, stocks_table_name, [p['id'] for p in products], bypass_cache, READ_PATH)
+
+def read_through(key, read, bypass_cache=False):
+    """Return the cached product rows for key, reading and caching them on a miss"""
+    value = MISSING if bypass_cache else products_cache.get(key)
+    if value is MISSING:
+        value = read()
+        # denormalized rows carry stock counts, so they are only cached as long as counts are
+        ttl = stocks_cache.ttl_seconds if READ_MODEL == READ_MODEL_DENORMALIZED else None
+        products_cache.set(key, value, ttl)
+    return value
+
+def to_output_product(p, stocks):
+    """The response shape of a product; prices and counts are already numbers"""
+    product_id = p['id']
+    return {
+        'id': product_id,
+        'title': p['title'],
+        'description': p['description'],
+        'price': p['price'],
+        'count': stocks.get(product_id, 0)
+    }
+
+def create_response(status_code: int, body: Any) -> Dict[str, Any]:
+    """Helper function to create standardized response"""
+    return create_json_response(status_code, dumps(body))
+
+def bad_request(error: Exception) -> Dict[str, Any]:
+    return create_response(400, {
+        "message": f"Bad Request: {error}",
+        "statusCode": 400,
+        "error": {
+            "code": "INVALID_REQUEST"
+        }
+    })
+
+def create_json_response(status_code: int, body: str, headers: Dict[str, str] = None) -> Dict[str, Any]:
+    """Response with a body that is already serialized JSON"""
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Access-Control-Allow-Origin": "*",  # Enable CORS for frontend integration
+            "Access-Control-Allow-Credentials": True,
+            "Content-Type": "application/json",
+            **(headers or {})
+        },
+        "body": body
+    }
+
+def conditional_response(event: Dict[str, Any], body: str, etag: str = None,
+                         precompressed: Dict[str, bytes] = None) -> Dict[str, Any]:
+    """200 with the body and its ETag, or an empty 304 when If-None-Match shows the client has it.
+
+    Large bodies are compressed with the best encoding the client accepts.
+    """
+    etag = etag or content_etag(body)
+    if is_not_modified(event, etag):
+        response = create_json_response(304, '', etag_headers(etag))
+    else:
+        response = create_json_response(200, body, etag_headers(etag))
+    with metrics.span('compress'):
+        return compress_response(response, get_header(event, 'Accept-Encoding'), precompressed=precompressed)
+
+def snapshot_response(event: Dict[str, Any], s3_client) -> Dict[str, Any]:
+    """Serve the full catalog from the S3 snapshot; None when there is no snapshot to serve"""
+    with metrics.span('snapshot'):
+        snapshot = snapshot_store.get(s3_client)
+    if snapshot is None:
+        return None
+    precompressed = {ENCODING_GZIP: snapshot.gzip_body} if snapshot.gzip_body else None
+    return conditional_response(event, snapshot.body, snapshot.etag, precompressed)
+
+def get_catalog_version(dynamodb) -> Optional[int]:
+    """The catalog version counter, or None when it is not configured or cannot be read"""
+    table_name = catalog_meta_table_name()
+    if not table_name:
+        return None
+    try:
+        with metrics.span('version'):
+            # the counter is read with a low-level client on either read path
+            client = dynamodb if dynamodb and READ_PATH == READ_PATH_CLIENT else get_client('dynamodb')
+            return read_catalog_version(client, table_name)
+    except Exception as error:
+        logger.warning('Catalog version unavailable, hashing the response instead', error=repr(error))
+        return None
     
-def handler(event: Dict[str, Any], context: Any, dynamodb = None) -> Dict[str, Any]:
+@instrumented('get_products_list')
+def handler(event: Dict[str, Any], context: Any, dynamodb = None, s3_client = None) -> Dict[str, Any]:
     try:
-        dynamodb = boto3.resource('dynamodb') if not dynamodb else dynamodb
-        products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE_NAME'])
-        stocks_table = dynamodb.Table(os.environ['STOCKS_TABLE_NAME'])
+        try:
+            with metrics.span('parse'):
+                query_parameters = event.get('queryStringParameters')
+                ids = (query_parameters or {}).get('ids')
+                if ids is not None:
+                    product_ids = parse_ids_parameter(ids)
+                else:
+                    paginated, limit, start_key = parse_pagination(query_parameters)
+                    catalog_query = parse_catalog_query(query_parameters)
+        except (InvalidPaginationParameter, InvalidCatalogQuery, InvalidProductIds) as error:
+            return bad_request(error)
+
+        if ids is not None:
+            # a batch lookup shares the GET /products route, see get_products_by_ids
+            return lookup_response(event, product_ids, dynamodb)
+
+        bypass_cache = is_cache_bypassed(event)
+        if not paginated and catalog_query is None and not bypass_cache and snapshot_store.enabled:
+            try:
+                response = snapshot_response(event, s3_client if s3_client else get_client('s3'))
+                if response is not None:
+                    return response
+                logger.warning('No catalog snapshot yet, reading the tables')
+            except Exception as error:
+                logger.warning('Catalog snapshot unavailable, reading the tables', error=repr(error))
+
+        # one GetItem instead of a scan tells whether the client's copy is still current
+        etag = None
+        version = get_catalog_version(dynamodb)
+        if version is not None:
+            # warm caches must not serve rows older than the version they are tagged with
+            sync_generation(version)
+            variant = (limit, encode_cursor(start_key)) if paginated else ()
+            etag = version_etag(version, *variant, *(catalog_query or ()))
+            if is_not_modified(event, etag):
+                # answered before any read; the body is never looked at for a 304
+                return conditional_response(event, '', etag)
+
+        if READ_PATH == READ_PATH_CLIENT:
+            # skip the resource's Decimal round trip, items are converted straight from wire format
+            dynamodb = get_client('dynamodb') if not dynamodb else dynamodb
+            products_table = ClientTable(dynamodb, os.environ['PRODUCTS_TABLE_NAME'], product_from_wire)
+        else:
+            dynamodb = get_resource('dynamodb') if not dynamodb else dynamodb
+            products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE_NAME'])
+        stocks_table_name = os.environ['STOCKS_TABLE_NAME']
+
+        if catalog_query is not None:
+            # filters, search and sort read the ByPrice/ByTitle indexes with the low-level client
+            client = dynamodb if READ_PATH == READ_PATH_CLIENT else WireClient(dynamodb.meta.client)
+            page_limit = limit if paginated else None
+            try:
+                with metrics.span('query'):
+                    products, next_position = read_through(
+                        ('query', catalog_query, page_limit, encode_cursor(start_key)),
+                        lambda: query_catalog(
+                            client, os.environ['PRODUCTS_TABLE_NAME'], catalog_query, page_limit, start_key
+                        ),
+                        bypass_cache
+                    )
+            except InvalidCatalogQuery as error:
+                return bad_request(error)
+            with metrics.span('join'):
+                stocks = join_stock_counts(dynamodb, stocks_table_name, products, bypass_cache)
+            with metrics.span('serialize'):
+                output_products = [to_output_product(p, stocks) for p in products]
+                if paginated:
+                    return conditional_response(event, dumps({
+                        "items": output_products,
+                        "nextCursor": encode_cursor(next_position)
+                    }), etag)
+                return conditional_response(event, dumps(output_products), etag)
 
-        products = get_products_list(products_table)
-        print(f"Fetched products: {products}")
+        if paginated:
+            with metrics.span('scan'):
+                products, last_key = read_through(
+                    ('page', limit, encode_cursor(start_key)),
+                    lambda: get_products_page(products_table, limit, start_key),
+                    bypass_cache
+                )
+            # join stock only for the products on this page
+            with metrics.span('join'):
+                stocks = join_stock_counts(dynamodb, stocks_table_name, products, bypass_cache)
+            logger.debug('Cache stats', cache=cache_stats)
+            with metrics.span('serialize'):
+                return conditional_response(event, dumps({
+                    "items": [to_output_product(p, stocks) for p in products],
+                    "nextCursor": encode_cursor(last_key)
+                }), etag)
+
+        with metrics.span('scan'):
+            products = read_through(('all',), lambda: get_products_list(products_table), bypass_cache)
+        logger.debug('Fetched products', count=len(products), products=lambda: products)
     
-        stocks = get_stocks_dict(stocks_table)
-        print(f"Fetched stocks: {stocks}")
-        output_products = []
-        for p in products:
-            product_id = p['id']
-            product = {
-                'id': product_id,
-                'title': p['title'],
-                'description': p['description'],
-                'price': float(p['price']),
-                'count': int(stocks.get(product_id, 0))
-            }
-            output_products.append(product)
+        # join stock by key instead of scanning the whole stocks table
+        with metrics.span('join'):
+            stocks = join_stock_counts(dynamodb, stocks_table_name, products, bypass_cache)
+        logger.debug('Fetched stocks', count=len(stocks), stocks=lambda: stocks)
+        logger.debug('Cache stats', cache=cache_stats)
 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",  # Enable CORS for frontend integration
-                "Access-Control-Allow-Credentials": True
-            },
-            "body": json.dumps(output_products, cls=DecimalEncoder)
-        }
+        with metrics.span('serialize'):
+            output_products = [to_output_product(p, stocks) for p in products]
+            return conditional_response(event, dumps(output_products), etag)
     except Exception as error:
-
+        logger.error('Failed to list products', error=repr(error))
         return {
             "statusCode": 500,
             "headers": {
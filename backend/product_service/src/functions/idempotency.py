@@ -0,0 +1,34 @@
+import uuid
+from typing import Any, Dict, Optional
+
+from etag import get_header
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_IDEMPOTENCY_KEY_CHARS = 255
+
+# Ids derived from the same key and position are the same on every retry, so a retried write
+# puts the same items again instead of creating duplicates. Never change this namespace:
+# every id already derived from it would change with it
+IDEMPOTENCY_NAMESPACE = uuid.UUID('6f1c5a8e-3b2d-5e4f-9a7b-2c8d1e0f4a6b')
+
+
+class InvalidIdempotencyKey(ValueError):
+    """Raised when the Idempotency-Key header cannot be used"""
+
+
+def get_idempotency_key(event: Dict[str, Any]) -> Optional[str]:
+    """The request's Idempotency-Key, or None when it has none"""
+    key = get_header(event, IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_IDEMPOTENCY_KEY_CHARS or not key.isprintable():
+        raise InvalidIdempotencyKey(
+            f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_IDEMPOTENCY_KEY_CHARS} printable characters'
+        )
+    return key
+
+
+def idempotent_id(*parts: Any) -> str:
+    """A uuid that only depends on parts: a product id, or a 36-character ClientRequestToken"""
+    return str(uuid.uuid5(IDEMPOTENCY_NAMESPACE, '/'.join(str(part) for part in parts)))
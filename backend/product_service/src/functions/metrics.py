@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ProductService')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# ask DynamoDB for the capacity each call consumed; the response only grows by a few bytes
+METRICS_CONSUMED_CAPACITY = os.environ.get('METRICS_CONSUMED_CAPACITY', 'true').lower() in ('1', 'true', 'yes')
+
+_STARTED = 'metrics_started'
+# EMF accepts at most 100 values per metric in one document
+EMF_MAX_VALUES = 100
+
+
+class InvocationMetrics:
+    """AWS call and stage timings collected during one invocation and written as one EMF line.
+
+    Calls can come from the scan and batch-get worker threads, so recording takes a lock.
+    """
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE, enabled: bool = METRICS_ENABLED):
+        self.namespace = namespace
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = {}
+            self.spans = {}
+            self.counters = {}
+
+    def record_call(self, operation: str, elapsed_ms: float, retries: int = 0,
+                    capacity: float = None, error: bool = False) -> None:
+        with self._lock:
+            call = self.calls.setdefault(operation, {
+                'latencies': [], 'retries': 0, 'capacity': 0.0, 'errors': 0
+            })
+            call['latencies'].append(round(elapsed_ms, 3))
+            call['retries'] += retries
+            call['errors'] += int(error)
+            if capacity:
+                call['capacity'] += capacity
+
+    def record_span(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.spans[name] = round(self.spans.get(name, 0.0) + elapsed_ms, 3)
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Count an event, such as a query that could not use an index"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a handler stage: with metrics.span('scan'): ..."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, (time.perf_counter() - started) * 1000)
+
+    def to_emf(self, function_name: str) -> Dict[str, Any]:
+        """The collected metrics as a CloudWatch Embedded Metric Format document"""
+        return self.to_emf_documents(function_name)[0]
+
+    def to_emf_documents(self, function_name: str) -> List[Dict[str, Any]]:
+        """The collected metrics as CloudWatch Embedded Metric Format documents.
+
+        Latencies of an operation called more than EMF_MAX_VALUES times continue in further
+        documents that carry only latencies; CloudWatch drops a document with more values.
+        """
+        timestamp = int(time.time() * 1000)
+        documents = []
+
+        def put(index, name, value, unit):
+            while len(documents) <= index:
+                documents.append(({'Function': function_name}, []))
+            document, definitions = documents[index]
+            definitions.append({'Name': name, 'Unit': unit})
+            document[name] = value
+
+        with self._lock:
+            for operation, call in sorted(self.calls.items()):
+                latencies = call['latencies']
+                for start in range(0, max(len(latencies), 1), EMF_MAX_VALUES):
+                    put(start // EMF_MAX_VALUES, f'{operation}.Latency',
+                        latencies[start:start + EMF_MAX_VALUES], 'Milliseconds')
+                put(0, f'{operation}.Calls', len(call['latencies']), 'Count')
+                put(0, f'{operation}.Retries', call['retries'], 'Count')
+                if call['errors']:
+                    put(0, f'{operation}.Errors', call['errors'], 'Count')
+                if call['capacity']:
+                    put(0, f'{operation}.ConsumedCapacity', round(call['capacity'], 2), 'Count')
+            for name, elapsed_ms in self.spans.items():
+                put(0, f'Stage.{name}', elapsed_ms, 'Milliseconds')
+            for name, value in sorted(self.counters.items()):
+                put(0, name, value, 'Count')
+
+        return [
+            {**document, '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Function']],
+                    'Metrics': definitions,
+                }],
+            }}
+            for document, definitions in documents or [({'Function': function_name}, [])]
+        ]
+
+    def flush(self, function_name: str) -> None:
+        """Write the EMF line for this invocation and start collecting the next one"""
+        if self.enabled and (self.calls or self.spans or self.counters):
+            for document in self.to_emf_documents(function_name):
+                sys.stdout.write(json.dumps(document) + '\n')
+        self.reset()
+
+
+metrics = InvocationMetrics()
+
+
+def _operation_name(model) -> str:
+    return f"{model.service_model.service_name}.{model.name}"
+
+
+def _consumed_capacity(parsed: Dict[str, Any]) -> float:
+    consumed = parsed.get('ConsumedCapacity')
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return sum(entry.get('CapacityUnits', 0) for entry in consumed or [])
+
+
+def _request_capacity(params, model, **kwargs) -> None:
+    if 'ReturnConsumedCapacity' in model.input_shape.members:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _before_call(context, **kwargs) -> None:
+    context[_STARTED] = time.perf_counter()
+
+
+def _after_call(parsed, model, context, **kwargs) -> None:
+    started = context.pop(_STARTED, None)
+    if started is None or not metrics.enabled:
+        return
+    parsed = parsed or {}
+    metrics.record_call(
+        _operation_name(model),
+        (time.perf_counter() - started) * 1000,
+        retries=parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+        capacity=_consumed_capacity(parsed),
+        error='Error' in parsed,
+    )
+
+
+def instrument_client(client) -> None:
+    """Time every call made by client; the clients factory calls this for each client it builds"""
+    if not metrics.enabled:
+        return
+    events = client.meta.events
+    # first in line, so a handler that answers the call itself (botocore's Stubber) is timed too
+    events.register_first('before-call.*.*', _before_call)
+    events.register('after-call.*.*', _after_call)
+    if METRICS_CONSUMED_CAPACITY and client.meta.service_model.service_name == 'dynamodb':
+        events.register('provide-client-params.dynamodb', _request_capacity)
+
+
+def instrumented(function_name: str):
+    """Decorate a Lambda handler so each invocation writes its metrics, with the total as Stage.handler"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            metrics.reset()
+            try:
+                with metrics.span('handler'):
+                    return handler(*args, **kwargs)
+            finally:
+                metrics.flush(function_name)
+        return wrapper
+    return decorator
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+class InvalidPaginationParameter(ValueError):
+    """Raised when limit or cursor query parameters cannot be used"""
+
+
+def encode_cursor(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Turn a LastEvaluatedKey into an opaque, URL-safe cursor"""
+    if not last_evaluated_key:
+        return None
+    # the wire format keeps number types intact across the round trip
+    wire_key = {name: _serializer.serialize(value) for name, value in last_evaluated_key.items()}
+    raw = json.dumps(wire_key, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn a cursor produced by encode_cursor back into an ExclusiveStartKey"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        wire_key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(wire_key, dict) or not wire_key:
+            raise ValueError('cursor does not hold a key')
+        return {name: _deserializer.deserialize(value) for name, value in wire_key.items()}
+    except (binascii.Error, UnicodeError, ValueError, TypeError, AttributeError) as error:
+        raise InvalidPaginationParameter('Invalid cursor') from error
+
+
+def parse_pagination(query_parameters: Optional[Dict[str, str]]) -> Tuple[bool, int, Optional[Dict[str, Any]]]:
+    """Read limit/cursor query parameters, returning (paginated, limit, exclusive_start_key)"""
+    query_parameters = query_parameters or {}
+    if 'limit' not in query_parameters and 'cursor' not in query_parameters:
+        return False, 0, None
+
+    limit = DEFAULT_PAGE_SIZE
+    if query_parameters.get('limit') is not None:
+        try:
+            limit = int(query_parameters['limit'])
+        except ValueError:
+            raise InvalidPaginationParameter('limit must be an integer')
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise InvalidPaginationParameter(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    start_key = decode_cursor(query_parameters['cursor']) if query_parameters.get('cursor') else None
+    return True, limit, start_key
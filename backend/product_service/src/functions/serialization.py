@@ -0,0 +1,94 @@
+import json
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Union
+
+# orjson is optional: bundle it with the functions (e.g. as a layer) to serialize natively,
+# without it the stdlib C encoder is used
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment package
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+Number = Union[int, float]
+
+# whole numbers up to 2**53 survive the round trip through float
+MAX_SAFE_INTEGER = 2 ** 53
+
+# numeric attributes of product and stock items and the type the API returns them as
+PRODUCT_NUMBER_ATTRIBUTES = {'price': float, 'count': int}
+
+
+def to_number(value: Decimal) -> Number:
+    """DynamoDB returns every number as Decimal; whole numbers become int, the rest float"""
+    number = float(value)
+    if number.is_integer():
+        # beyond float precision only int() of the Decimal itself is exact
+        return int(number) if -MAX_SAFE_INTEGER <= number <= MAX_SAFE_INTEGER else int(value)
+    return number
+
+
+def _default(value: Any) -> Any:
+    # only reached for values numbers_from_decimals did not convert, e.g. a Decimal in an error body
+    if isinstance(value, Decimal):
+        return to_number(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def numbers_from_decimals(value: Any) -> Any:
+    """Replace every Decimal in value with an int or float, in place, in one pass; returns value.
+
+    Items read from DynamoDB are flat dicts, so the top-level loop only recurses for the rare
+    nested list or map attribute.
+    """
+    if isinstance(value, list):
+        for index, item in enumerate(value):
+            if type(item) is dict:
+                _convert_dict(item)
+            elif type(item) is Decimal:
+                value[index] = to_number(item)
+            elif isinstance(item, list):
+                numbers_from_decimals(item)
+        return value
+    if isinstance(value, dict):
+        _convert_dict(value)
+        return value
+    if isinstance(value, Decimal):
+        return to_number(value)
+    return value
+
+
+def convert_attributes(items: List[dict], converters: Dict[str, Callable[[Decimal], Number]] = None) -> List[dict]:
+    """Convert the known numeric attributes of flat items in place, one attribute at a time; returns items.
+
+    Cheaper than numbers_from_decimals when the schema is known, as other attributes are not visited.
+    """
+    for name, convert in (converters or PRODUCT_NUMBER_ATTRIBUTES).items():
+        for item in items:
+            value = item.get(name)
+            if type(value) is Decimal:
+                item[name] = convert(value)
+    return items
+
+
+def _convert_dict(item: dict) -> None:
+    for key, attribute in item.items():
+        if type(attribute) is Decimal:
+            item[key] = to_number(attribute)
+        elif isinstance(attribute, (dict, list)):
+            numbers_from_decimals(attribute)
+
+
+if orjson is not None:
+    def dumps(value: Any) -> str:
+        """Serialize a response body to compact JSON"""
+        return orjson.dumps(value, default=_default).decode('utf-8')
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), default=_default)
+
+    def dumps(value: Any) -> str:
+        """Serialize a response body to compact JSON"""
+        return _encoder.encode(value)
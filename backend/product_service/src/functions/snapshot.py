@@ -0,0 +1,203 @@
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from batch_get import batch_get_items
+from converters import ClientTable, product_from_wire, stock_from_wire
+from dynamo_scan import SCAN_SEGMENTS, scan_all
+from serialization import dumps
+
+# Pre-joined, pre-serialized GET /products body kept in S3 by catalog_snapshot_builder
+CATALOG_SNAPSHOT_BUCKET = os.environ.get('CATALOG_SNAPSHOT_BUCKET')
+CATALOG_SNAPSHOT_KEY = os.environ.get('CATALOG_SNAPSHOT_KEY', 'catalog/products.json')
+CATALOG_SNAPSHOT_GZIP = os.environ.get('CATALOG_SNAPSHOT_GZIP', 'false').lower() in ('1', 'true', 'yes')
+# how long a warm container serves its in-memory copy before revalidating it with S3
+CATALOG_SNAPSHOT_TTL_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_TTL_SECONDS', '5'))
+
+
+class CatalogSnapshot(NamedTuple):
+    body: str
+    etag: str
+    # the stored bytes when the snapshot is kept gzip, so they can be served without recompressing
+    gzip_body: Optional[bytes] = None
+
+
+def to_catalog_product(product: Dict[str, Any], count: int) -> Dict[str, Any]:
+    return {
+        'id': product['id'],
+        'title': product['title'],
+        'description': product['description'],
+        'price': product['price'],
+        'count': count,
+    }
+
+
+def serialize_catalog(catalog: Dict[str, Dict[str, Any]]) -> str:
+    # ordered by id, so an unchanged catalog serializes to the same bytes and keeps its ETag
+    return dumps([catalog[product_id] for product_id in sorted(catalog)])
+
+
+def write_snapshot(s3, body: str, bucket: str = CATALOG_SNAPSHOT_BUCKET, key: str = CATALOG_SNAPSHOT_KEY,
+                   compress: bool = CATALOG_SNAPSHOT_GZIP) -> str:
+    """Upload the serialized catalog and return its ETag"""
+    extra = {}
+    data = body.encode('utf-8')
+    if compress:
+        data = gzip.compress(data)
+        extra['ContentEncoding'] = 'gzip'
+    response = s3.put_object(Bucket=bucket, Key=key, Body=data, ContentType='application/json', **extra)
+    return response['ETag']
+
+
+def read_catalog(s3, bucket: str = CATALOG_SNAPSHOT_BUCKET, key: str = CATALOG_SNAPSHOT_KEY) -> Optional[str]:
+    """The serialized catalog currently in S3, or None when there is no snapshot yet"""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as error:
+        if error.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    return _decode(response)[0]
+
+
+def _decode(response: Dict[str, Any]) -> Tuple[str, Optional[bytes]]:
+    """The snapshot text and, when it is stored gzip, the compressed bytes"""
+    data = response['Body'].read()
+    # uploads with a checksum come back as e.g. 'gzip,aws-chunked'
+    encodings = [encoding.strip() for encoding in response.get('ContentEncoding', '').split(',')]
+    if 'gzip' in encodings:
+        return gzip.decompress(data).decode('utf-8'), data
+    return data.decode('utf-8'), None
+
+
+def build_catalog(dynamodb, products_table_name: str, stocks_table_name: str,
+                  total_segments: int = SCAN_SEGMENTS) -> Dict[str, Dict[str, Any]]:
+    """Full rebuild: scan both tables with the low-level client and join them by product id"""
+    products = scan_all(ClientTable(dynamodb, products_table_name, product_from_wire), total_segments)
+    stocks = scan_all(ClientTable(dynamodb, stocks_table_name, stock_from_wire), total_segments)
+    counts = {stock['product_id']: stock['count'] for stock in stocks}
+    return {product['id']: to_catalog_product(product, counts.get(product['id'], 0)) for product in products}
+
+
+def _table_name(event_source_arn: str) -> str:
+    # arn:aws:dynamodb:<region>:<account>:table/<name>/stream/<label>
+    return event_source_arn.split(':table/', 1)[1].split('/', 1)[0]
+
+
+def apply_stream_records(dynamodb, catalog: Dict[str, Dict[str, Any]], records: Iterable[Dict[str, Any]],
+                         products_table_name: str, stocks_table_name: str) -> int:
+    """Apply DynamoDB Streams records of the products and stocks tables to catalog in place.
+
+    Stock rows can arrive before their product, on the other table's stream, so new products
+    look their stock up instead of relying on having seen it. Returns how many records applied.
+    """
+    applied = 0
+    new_products = []
+    for record in records:
+        table_name = _table_name(record['eventSourceARN'])
+        change = record['dynamodb']
+        if table_name == products_table_name:
+            product_id = change['Keys']['id']['S']
+            if record['eventName'] == 'REMOVE':
+                catalog.pop(product_id, None)
+            else:
+                known = catalog.get(product_id)
+                product = product_from_wire(change['NewImage'])
+                if known is None and 'count' not in product:
+                    new_products.append(product_id)
+                # denormalized items carry their count, older ones keep the one already known
+                count = product.get('count', known['count'] if known else 0)
+                catalog[product_id] = to_catalog_product(product, count)
+        elif table_name == stocks_table_name:
+            product_id = change['Keys']['product_id']['S']
+            if product_id in catalog:
+                removed = record['eventName'] == 'REMOVE'
+                catalog[product_id]['count'] = 0 if removed else stock_from_wire(change['NewImage'])['count']
+        else:
+            continue
+        applied += 1
+
+    new_products = [product_id for product_id in dict.fromkeys(new_products) if product_id in catalog]
+    if new_products:
+        keys = [{'product_id': {'S': product_id}} for product_id in new_products]
+        for item in batch_get_items(dynamodb, stocks_table_name, keys):
+            stock = stock_from_wire(item)
+            catalog[stock['product_id']]['count'] = stock['count']
+    return applied
+
+
+def catalog_from_body(body: str) -> Dict[str, Dict[str, Any]]:
+    return {product['id']: product for product in json.loads(body)}
+
+
+class SnapshotStore:
+    """Warm in-memory copy of the snapshot, revalidated with a conditional GET once it is stale"""
+
+    def __init__(self, bucket: str = CATALOG_SNAPSHOT_BUCKET, key: str = CATALOG_SNAPSHOT_KEY,
+                 ttl_seconds: float = CATALOG_SNAPSHOT_TTL_SECONDS, clock=time.monotonic):
+        self.bucket = bucket
+        self.key = key
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bucket)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot: Optional[CatalogSnapshot] = None
+            self._checked_at = 0.0
+
+    def get(self, s3) -> Optional[CatalogSnapshot]:
+        """The current snapshot: from memory while fresh, otherwise from S3 (a 304 when unchanged)"""
+        now = self.clock()
+        with self._lock:
+            current, checked_at = self._snapshot, self._checked_at
+        if current is not None and now - checked_at < self.ttl_seconds:
+            return current
+
+        request = {'Bucket': self.bucket, 'Key': self.key}
+        if current is not None:
+            request['IfNoneMatch'] = current.etag
+        try:
+            response = s3.get_object(**request)
+            body, gzip_body = _decode(response)
+            snapshot = CatalogSnapshot(body, response['ETag'], gzip_body)
+        except ClientError as error:
+            code = error.response['Error']['Code']
+            if current is not None and code in ('304', 'NotModified'):
+                snapshot = current
+            elif code in ('NoSuchKey', '404'):
+                snapshot = None
+            else:
+                raise
+        with self._lock:
+            self._snapshot, self._checked_at = snapshot, now
+        return snapshot
+
+
+snapshot_store = SnapshotStore()
+
+
+def rebuild_snapshot(dynamodb, s3, products_table_name: str, stocks_table_name: str,
+                     records: List[Dict[str, Any]] = None, bucket: str = CATALOG_SNAPSHOT_BUCKET,
+                     key: str = CATALOG_SNAPSHOT_KEY, compress: bool = CATALOG_SNAPSHOT_GZIP) -> Dict[str, Any]:
+    """Update the snapshot from stream records, or rebuild it from the tables when there is none yet"""
+    body = read_catalog(s3, bucket, key) if records else None
+    if body is None:
+        catalog = build_catalog(dynamodb, products_table_name, stocks_table_name)
+        mode = 'full'
+    else:
+        catalog = catalog_from_body(body)
+        apply_stream_records(dynamodb, catalog, records, products_table_name, stocks_table_name)
+        mode = 'incremental'
+    etag = write_snapshot(s3, serialize_catalog(catalog), bucket, key, compress)
+    return {'mode': mode, 'products': len(catalog), 'etag': etag}
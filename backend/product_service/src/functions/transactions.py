@@ -0,0 +1,127 @@
+import hashlib
+import json
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+
+from idempotency import idempotent_id
+from logger import get_logger
+from metrics import metrics
+
+# TransactWriteItems accepts at most 100 items per call
+TRANSACT_MAX_ITEMS = 100
+
+TransactItems = List[Dict[str, Any]]
+
+logger = get_logger('transactions')
+
+
+def plan_transactions(groups: List[Tuple[Hashable, TransactItems]],
+                      max_items: int = TRANSACT_MAX_ITEMS) -> List[Tuple[List[Hashable], TransactItems]]:
+    """Pack (key, items) groups into transactions of at most max_items items.
+
+    Small groups are combined so a batch needs few round trips. A group larger than max_items
+    gets transactions of its own; items are expected in (product, stock) pairs and max_items
+    is even, so a product is never split from its stock row.
+    """
+    transactions = []
+    keys, items = [], []
+    for key, group_items in groups:
+        if len(group_items) > max_items:
+            for start in range(0, len(group_items), max_items):
+                transactions.append(([key], group_items[start:start + max_items]))
+            continue
+        if items and len(items) + len(group_items) > max_items:
+            transactions.append((keys, items))
+            keys, items = [], []
+        keys.append(key)
+        items.extend(group_items)
+    if items:
+        transactions.append((keys, items))
+    return transactions
+
+
+def client_request_token(items: TransactItems) -> str:
+    """A ClientRequestToken that only depends on what the transaction writes.
+
+    DynamoDB answers a repeated token within ten minutes without writing again, and a
+    token reused for different items would be rejected; a hash of the items gives the
+    same token exactly when the same items are written again.
+    """
+    return idempotent_id('transaction', hashlib.sha256(
+        json.dumps(items, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest())
+
+
+def _already_exists(item: Dict[str, Any], reason: Dict[str, Any]) -> bool:
+    # only a create (a Put conditioned on its key not existing yet) fails because it was done before
+    condition = item.get('Put', {}).get('ConditionExpression', '')
+    return reason.get('Code') == 'ConditionalCheckFailed' and condition.startswith('attribute_not_exists(')
+
+
+def transact_write(dynamodb, items: TransactItems) -> TransactItems:
+    """Write items in one transaction and return the items skipped as already written.
+
+    Creates of items that already exist, from an earlier attempt, cancel the transaction;
+    they are dropped and the rest written again, so a retry is a no-op for what it did before.
+    The stored items are not read: callers that must know they match compare them themselves.
+    """
+    skipped = []
+    while items:
+        try:
+            dynamodb.transact_write_items(TransactItems=items, ClientRequestToken=client_request_token(items))
+            return skipped
+        except ClientError as error:
+            reasons = error.response.get('CancellationReasons') or []
+            existing = {
+                index for index, (item, reason) in enumerate(zip(items, reasons)) if _already_exists(item, reason)
+            }
+            if error.response['Error']['Code'] != 'TransactionCanceledException' or not existing:
+                raise
+            skipped.extend(items[index] for index in sorted(existing))
+            items = [item for index, item in enumerate(items) if index not in existing]
+    return skipped
+
+
+def write_transactions(dynamodb, groups: List[Tuple[Hashable, TransactItems]],
+                       max_items: int = TRANSACT_MAX_ITEMS,
+                       existing: Optional[Set[Hashable]] = None) -> Set[Hashable]:
+    """Write groups in chunked transactions and return the keys of the groups that failed.
+
+    When a transaction that combines several groups fails, each of its groups is retried on
+    its own, so one bad group does not fail the groups it happened to share a chunk with.
+    The keys of groups with items skipped as already written are added to existing.
+    """
+    failed = set()
+    skipped = 0
+    group_items = dict(groups)
+    owners = {id(item): key for key, items in groups for item in items}
+
+    def _write(items):
+        nonlocal skipped
+        written_before = transact_write(dynamodb, items)
+        skipped += len(written_before)
+        if existing is not None:
+            existing.update(owners[id(item)] for item in written_before)
+
+    for keys, items in plan_transactions(groups, max_items):
+        if failed.issuperset(keys):
+            continue
+        try:
+            _write(items)
+        except Exception as error:
+            if len(keys) == 1:
+                logger.error('Transaction failed', key=str(keys[0]), error=repr(error))
+                failed.add(keys[0])
+                continue
+            for key in keys:
+                try:
+                    _write(group_items[key])
+                except Exception as group_error:
+                    logger.error('Transaction failed', key=str(key), error=repr(group_error))
+                    failed.add(key)
+    if skipped:
+        # retried writes, e.g. of a redelivered message
+        logger.info('Skipped items written before', count=skipped)
+        metrics.increment('ExistingItemsSkipped', skipped)
+    return failed
@@ -4,6 +4,8 @@ import boto3
 import pytest
 from src.functions.mocks.products import products
 from moto import mock_dynamodb
+from cache import clear_caches
+from clients import reset_clients
 
 @pytest.fixture
 def aws_credentials():
@@ -16,6 +18,22 @@ def aws_credentials():
 # Set environment variables for table names
 os.environ['PRODUCTS_TABLE_NAME'] = 'products'
 os.environ['STOCKS_TABLE_NAME'] = 'stocks'
+# moto ignores Segment/TotalSegments, so parallel segments would return duplicates
+os.environ['SCAN_SEGMENTS'] = '1'
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    # clients are cached per container, so a client patched in one test must not leak into the next
+    reset_clients()
+    yield
+    reset_clients()
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    # handler caches live at module level and would leak between tests
+    clear_caches()
+    yield
+    clear_caches()
 
 @pytest.fixture
 def mock_products():
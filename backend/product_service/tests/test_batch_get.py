@@ -0,0 +1,55 @@
+# tests/test_batch_get.py
+import pytest
+from src.functions.batch_get import BatchGetError, batch_get_items, batch_get_request
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(mocker):
+    return mocker.patch('src.functions.batch_get.time.sleep')
+
+
+def test_batch_get_items_chunks_keys(mocker):
+    dynamodb = mocker.Mock()
+    dynamodb.batch_get_item.side_effect = lambda RequestItems: {
+        'Responses': {'stocks': [{'product_id': k['product_id'], 'count': 1} for k in RequestItems['stocks']['Keys']]}
+    }
+    keys = [{'product_id': f'id-{i}'} for i in range(250)]
+
+    items = batch_get_items(dynamodb, 'stocks', keys)
+
+    assert len(items) == 250
+    chunk_sizes = sorted(len(call.kwargs['RequestItems']['stocks']['Keys'])
+                         for call in dynamodb.batch_get_item.call_args_list)
+    assert chunk_sizes == [50, 100, 100]
+
+
+def test_batch_get_request_retries_unprocessed_keys(mocker, no_sleep):
+    dynamodb = mocker.Mock()
+    dynamodb.batch_get_item.side_effect = [
+        {
+            'Responses': {'stocks': [{'product_id': 'a', 'count': 1}]},
+            'UnprocessedKeys': {'stocks': {'Keys': [{'product_id': 'b'}]}}
+        },
+        {'Responses': {'stocks': [{'product_id': 'b', 'count': 2}]}, 'UnprocessedKeys': {}},
+    ]
+
+    result = batch_get_request(dynamodb, {'stocks': {'Keys': [{'product_id': 'a'}, {'product_id': 'b'}]}})
+
+    assert [item['product_id'] for item in result['stocks']] == ['a', 'b']
+    assert dynamodb.batch_get_item.call_args_list[1].kwargs['RequestItems'] == {
+        'stocks': {'Keys': [{'product_id': 'b'}]}
+    }
+    no_sleep.assert_called_once()
+
+
+def test_batch_get_request_gives_up_after_max_retries(mocker):
+    dynamodb = mocker.Mock()
+    dynamodb.batch_get_item.return_value = {
+        'Responses': {},
+        'UnprocessedKeys': {'stocks': {'Keys': [{'product_id': 'a'}]}}
+    }
+
+    with pytest.raises(BatchGetError):
+        batch_get_request(dynamodb, {'stocks': {'Keys': [{'product_id': 'a'}]}}, max_retries=2)
+
+    assert dynamodb.batch_get_item.call_count == 3
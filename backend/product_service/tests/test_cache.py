@@ -0,0 +1,59 @@
+# tests/test_cache.py
+import json
+from cache import MISSING, TTLCache, is_cache_bypassed, products_cache
+from src.functions.get_product_by_id import handler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set('a', 1)
+
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is MISSING
+    assert cache.stats() == {'size': 0, 'hits': 1, 'misses': 1, 'hitRatio': 0.5}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    found, missing = cache.get_many(['a', 'b', 'c'])
+    assert found == {'a': 1, 'c': 3}
+    assert missing == ['b']
+
+
+def test_bypass_header():
+    assert is_cache_bypassed({'headers': {'cache-control': 'no-cache'}})
+    assert is_cache_bypassed({'headers': {'Cache-Control': 'max-age=0, no-store'}})
+    assert not is_cache_bypassed({'headers': {'Accept': '*/*'}})
+    assert not is_cache_bypassed({'headers': None})
+
+
+def test_product_served_from_warm_cache(api_gateway_event, lambda_context, mock_products, dynamodb_mock):
+    product_id = mock_products[0]['id']
+    event = api_gateway_event(path_parameters={"productId": product_id})
+    assert handler(event, lambda_context, dynamodb_mock)['statusCode'] == 200
+
+    # a warm container keeps answering from the cache until the entry expires
+    dynamodb_mock.Table('products').delete_item(Key={'id': product_id})
+    response = handler(event, lambda_context, dynamodb_mock)
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['count'] == 5
+    assert products_cache.stats()['hits'] == 1
+
+    event['headers']['Cache-Control'] = 'no-cache'
+    assert handler(event, lambda_context, dynamodb_mock)['statusCode'] == 404
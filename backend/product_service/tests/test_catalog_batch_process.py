@@ -3,8 +3,9 @@ from unittest.mock import patch
 import pytest
 import json
 import os
-import uuid
-from src.functions.catalog_batch_process import handler
+from src.functions.catalog_batch_process import handler, row_product_id
+from catalog_items import catalog_shard
+from transactions import client_request_token
 
 @pytest.fixture
 def sqs_event():
@@ -48,14 +49,11 @@ def mock_aws_clients(mocker):
     
     # Set up boto3 mock
     mock_boto3 = mocker.patch('boto3.client')
-    mock_boto3.side_effect = lambda service: {
+    mock_boto3.side_effect = lambda service, **kwargs: {
         'dynamodb': mock_dynamodb,
         'sns': mock_sns
     }[service]
     
-    # Mock UUID
-    mocker.patch('uuid.uuid4', return_value='mocked-uuid')
-    
     return {
         'dynamodb': mock_dynamodb,
         'sns': mock_sns
@@ -68,32 +66,40 @@ def test_successful_processing(sqs_event, mock_env, mock_aws_clients):
                        sns_client_mock=mock_aws_clients['sns'], 
                        dynamodb_mock=mock_aws_clients['dynamodb'])
 
+    # derived from the message id, so a redelivery writes the same product
+    product_id = row_product_id(sqs_event['Records'][0]['messageId'], None, 0)
     expected_transact_items = [
         {
             'Put': {
                 'TableName': 'products',
                 'Item': {
-                    'id': {'S': 'mocked-uuid'},
+                    'id': {'S': product_id},
                     'title': {'S': 'Test Product'},
                     'description': {'S': 'Test Description'},
-                    'price': {'N': '100'}
-                }
+                    'price': {'N': '100'},
+                    'count': {'N': '5'},
+                    'catalog_shard': {'N': str(catalog_shard(product_id))},
+                    'title_lower': {'S': 'test product'}
+                },
+                'ConditionExpression': 'attribute_not_exists(id)'
             }
         },
         {
             'Put': {
                 'TableName': 'stocks',
                 'Item': {
-                    'product_id': {'S': 'mocked-uuid'},
+                    'product_id': {'S': product_id},
                     'count': {'N': '5'}
-                }
+                },
+                'ConditionExpression': 'attribute_not_exists(product_id)'
             }
         }
     ]
 
     # Verify DynamoDB call
     mock_aws_clients['dynamodb'].transact_write_items.assert_called_once_with(
-        TransactItems=expected_transact_items
+        TransactItems=expected_transact_items,
+        ClientRequestToken=client_request_token(expected_transact_items)
     )
     
     # Verify SNS call
@@ -111,8 +117,157 @@ def test_processing_error(sqs_event, mock_aws_clients):
     # Configure DynamoDB mock to raise an exception
     mock_aws_clients['dynamodb'].transact_write_items.side_effect = Exception('Database error')
 
-    # Test that the handler raises an exception
-    with pytest.raises(Exception) as exc_info:
-        handler(sqs_event, None)
-    
-    assert str(exc_info.value) == 'Database error'
+    # Test that the failed message is reported back to SQS instead of failing the whole batch
+    response = handler(sqs_event, None)
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': '19dd0b57-b21e-4ac1-bd88-01bbb068cb78'}]
+    mock_aws_clients['sns'].publish.assert_not_called()
+
+def test_packed_and_single_row_messages(sqs_event, mock_aws_clients):
+    # One legacy single-row message plus one packed message carrying two rows
+    packed_record = dict(sqs_event['Records'][0])
+    packed_record['messageId'] = 'packed-message'
+    packed_record['body'] = json.dumps({
+        'version': 2,
+        'rows': [
+            {'Title': 'Packed 1', 'Description': 'First', 'Price': '1', 'Count': '1'},
+            {'Title': 'Packed 2', 'Description': 'Second', 'Price': '2', 'Count': '2'},
+        ]
+    })
+    sqs_event['Records'].append(packed_record)
+
+    response = handler(sqs_event,
+                       context=None,
+                       sns_client_mock=mock_aws_clients['sns'],
+                       dynamodb_mock=mock_aws_clients['dynamodb'])
+
+    assert response['statusCode'] == 200
+    transact_items = mock_aws_clients['dynamodb'].transact_write_items.call_args.kwargs['TransactItems']
+    titles = [item['Put']['Item']['title']['S'] for item in transact_items if item['Put']['TableName'] == 'products']
+    assert titles == ['Test Product', 'Packed 1', 'Packed 2']
+    assert mock_aws_clients['sns'].publish.call_args.kwargs['Message'] == 'Successfully processed and created 3 products'
+
+def make_record(message_id, rows):
+    return {
+        'messageId': message_id,
+        'body': json.dumps({'version': 2, 'rows': rows}),
+    }
+
+def make_rows(count, prefix='Product'):
+    return [{'Title': f'{prefix} {i}', 'Description': 'Bulk', 'Price': '1', 'Count': '1'} for i in range(count)]
+
+def test_large_batches_are_split_into_transactions(mock_aws_clients):
+    event = {'Records': [make_record('big', make_rows(120)), make_record('small', make_rows(10))]}
+
+    response = handler(event, None, mock_aws_clients['sns'], mock_aws_clients['dynamodb'])
+
+    sizes = [len(call.kwargs['TransactItems']) for call in mock_aws_clients['dynamodb'].transact_write_items.call_args_list]
+    assert sizes == [100, 100, 40, 20]
+    assert response['batchItemFailures'] == []
+    assert mock_aws_clients['sns'].publish.call_args.kwargs['Message'] == 'Successfully processed and created 130 products'
+
+def test_only_failing_messages_are_reported(mock_aws_clients):
+    def transact_write_items(TransactItems, ClientRequestToken):
+        titles = [item['Put']['Item']['title']['S'] for item in TransactItems if 'title' in item['Put']['Item']]
+        if 'Bad 0' in titles:
+            raise Exception('ValidationException')
+
+    mock_aws_clients['dynamodb'].transact_write_items.side_effect = transact_write_items
+    event = {'Records': [
+        make_record('good-1', make_rows(3)),
+        make_record('bad', make_rows(1, prefix='Bad')),
+        {'messageId': 'unparseable', 'body': 'not json'},
+        make_record('good-2', make_rows(2)),
+    ]}
+
+    response = handler(event, None, mock_aws_clients['sns'], mock_aws_clients['dynamodb'])
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': 'unparseable'}, {'itemIdentifier': 'bad'}]
+    assert mock_aws_clients['sns'].publish.call_args.kwargs['Message'] == 'Successfully processed and created 5 products'
+
+def test_failed_version_bump_redelivers_the_written_messages(mock_aws_clients, monkeypatch):
+    from botocore.exceptions import ClientError
+    monkeypatch.setenv('CATALOG_META_TABLE_NAME', 'catalog_meta')
+    monkeypatch.setattr('catalog_version.time.sleep', lambda seconds: None)
+    mock_aws_clients['dynamodb'].update_item.side_effect = ClientError(
+        {'Error': {'Code': 'InternalServerError', 'Message': 'try again'}}, 'UpdateItem'
+    )
+    event = {'Records': [make_record('first', make_rows(2)), make_record('second', make_rows(1))]}
+
+    response = handler(event, None, mock_aws_clients['sns'], mock_aws_clients['dynamodb'])
+
+    # the writes are idempotent, so the redelivery only adds the missing bump
+    assert response['batchItemFailures'] == [{'itemIdentifier': 'first'}, {'itemIdentifier': 'second'}]
+    mock_aws_clients['sns'].publish.assert_not_called()
+
+@pytest.fixture
+def batch_mode(monkeypatch):
+    monkeypatch.setattr('src.functions.catalog_batch_process.CATALOG_WRITE_MODE', 'batch')
+    monkeypatch.setattr('src.functions.batch_write.time.sleep', lambda seconds: None)
+
+def test_batch_write_mode(batch_mode, dynamodb_mock, mocker):
+    import boto3
+    dynamodb = boto3.client('dynamodb', region_name='us-east-1')
+    sns = mocker.Mock()
+    event = {'Records': [make_record('first', make_rows(30)), make_record('second', make_rows(30))]}
+
+    response = handler(event, None, sns, dynamodb)
+
+    assert response['batchItemFailures'] == []
+    last_id, first_id = row_product_id('second', None, 29), row_product_id('first', None, 0)
+    assert dynamodb.get_item(TableName='products', Key={'id': {'S': last_id}})['Item']['title']['S'] == 'Product 29'
+    assert dynamodb.get_item(TableName='stocks', Key={'product_id': {'S': first_id}})['Item']['count']['N'] == '1'
+    assert sns.publish.call_args.kwargs['Message'] == 'Successfully processed and created 60 products'
+
+def test_batch_write_mode_reconciles_missing_stock(batch_mode, mocker):
+    id_a, id_b = row_product_id('first', None, 0), row_product_id('first', None, 1)
+    dynamodb = mocker.Mock()
+    dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+    dynamodb.batch_get_item.return_value = {
+        'Responses': {'stocks': [{'product_id': {'S': id_a}}]}, 'UnprocessedKeys': {}
+    }
+    event = {'Records': [make_record('first', make_rows(2))]}
+
+    response = handler(event, None, mocker.Mock(), dynamodb)
+
+    assert response['batchItemFailures'] == []
+    rewrite = dynamodb.batch_write_item.call_args_list[-1].kwargs['RequestItems']
+    assert rewrite == {'stocks': [{'PutRequest': {'Item': {'product_id': {'S': id_b}, 'count': {'N': '1'}}}}]}
+
+def test_batch_write_mode_reports_unprocessed_items(batch_mode, mocker):
+    id_a, id_b = row_product_id('ok', None, 0), row_product_id('throttled', None, 0)
+    dynamodb = mocker.Mock()
+    dynamodb.batch_write_item.side_effect = lambda RequestItems: {
+        'UnprocessedItems': {
+            'products': [r for r in RequestItems.get('products', []) if r['PutRequest']['Item']['id']['S'] == id_b]
+        } if any(r['PutRequest']['Item']['id']['S'] == id_b for r in RequestItems.get('products', [])) else {}
+    }
+    dynamodb.batch_get_item.return_value = {'Responses': {'stocks': [{'product_id': {'S': id_a}}]}}
+    event = {'Records': [make_record('ok', make_rows(1)), make_record('throttled', make_rows(1))]}
+
+    response = handler(event, None, mocker.Mock(), dynamodb)
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': 'throttled'}]
+
+def test_batch_write_mode_reports_messages_when_reconciliation_fails(batch_mode, dynamodb_mock, mocker):
+    import boto3
+    from botocore.exceptions import ClientError
+    dynamodb = boto3.client('dynamodb', region_name='us-east-1')
+    mocker.patch.object(dynamodb, 'batch_get_item', side_effect=ClientError(
+        {'Error': {'Code': 'AccessDeniedException', 'Message': 'not authorized'}}, 'BatchGetItem'
+    ))
+    event = {'Records': [make_record('first', make_rows(2)), make_record('second', make_rows(1))]}
+
+    response = handler(event, None, mocker.Mock(), dynamodb)
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': 'first'}, {'itemIdentifier': 'second'}]
+
+def test_rows_with_fractional_counts_fail_their_message(mock_aws_clients):
+    bad_rows = make_rows(2)
+    bad_rows[1]['Count'] = '1.5'
+    event = {'Records': [make_record('good', make_rows(1)), make_record('bad', bad_rows)]}
+
+    response = handler(event, None, mock_aws_clients['sns'], mock_aws_clients['dynamodb'])
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': 'bad'}]
+    assert mock_aws_clients['sns'].publish.call_args.kwargs['Message'] == 'Successfully processed and created 1 products'
@@ -0,0 +1,183 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_dynamodb
+
+from catalog_items import INDEX_BY_PRICE, INDEX_BY_TITLE, put_product_requests
+from catalog_query import CatalogQuery, parse_catalog_query, plan_query
+
+TITLES = ['Apple Pie', 'apple tart', 'Banana Bread', 'Blueberry Muffin', 'Cherry Pie', 'Apricot Jam',
+          'Brownie', 'Cinnamon Roll', 'Apple Crumble', 'Carrot Cake', 'Bagel', 'Cheesecake']
+
+
+@pytest.fixture
+def catalog(aws_credentials, monkeypatch):
+    """Products written the way the write paths write them, into tables with the catalog indexes"""
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with mock_dynamodb():
+        client = boto3.client('dynamodb', region_name='us-east-1')
+        client.create_table(
+            TableName='products',
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'id', 'AttributeType': 'S'},
+                {'AttributeName': 'catalog_shard', 'AttributeType': 'N'},
+                {'AttributeName': 'price', 'AttributeType': 'N'},
+                {'AttributeName': 'title_lower', 'AttributeType': 'S'},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': name,
+                    'KeySchema': [
+                        {'AttributeName': 'catalog_shard', 'KeyType': 'HASH'},
+                        {'AttributeName': sort_key, 'KeyType': 'RANGE'},
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'},
+                }
+                for name, sort_key in ((INDEX_BY_PRICE, 'price'), (INDEX_BY_TITLE, 'title_lower'))
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.create_table(
+            TableName='stocks',
+            KeySchema=[{'AttributeName': 'product_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'product_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        products = []
+        for i, title in enumerate(TITLES):
+            product = {'id': f'product-{i:02d}', 'title': title, 'description': '', 'price': 5 + (i * 7) % 20,
+                       'count': i % 3}
+            client.transact_write_items(TransactItems=put_product_requests(
+                'products', 'stocks', product['id'], title, '', product['price'], product['count']
+            ))
+            products.append(product)
+        yield client, products
+
+
+def list_products(client, parameters, lambda_context, mocker=None):
+    from src.functions import get_products_list
+
+    event = {'headers': {}, 'queryStringParameters': parameters}
+    response = get_products_list.handler(event, lambda_context, client)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def all_pages(client, parameters, lambda_context):
+    items, cursor = [], None
+    for _ in range(len(TITLES) + 1):
+        status, body = list_products(client, {**parameters, **({'cursor': cursor} if cursor else {})}, lambda_context)
+        assert status == 200
+        items.extend(body['items'])
+        cursor = body['nextCursor']
+        if not cursor:
+            return items
+    raise AssertionError('pagination did not finish')
+
+
+@pytest.fixture(autouse=True)
+def client_read_path(mocker):
+    from src.functions import get_products_list
+    mocker.patch.object(get_products_list, 'READ_PATH', 'client')
+
+
+def test_parse_catalog_query_validates_parameters():
+    assert parse_catalog_query({'limit': '5'}) is None
+    assert parse_catalog_query({'q': ' App ', 'order': 'DESC'}) == CatalogQuery(search='app', descending=True)
+    for parameters in ({'minPrice': 'x'}, {'minPrice': '5', 'maxPrice': '1'}, {'sort': 'count'},
+                       {'order': 'up'}, {'inStock': 'maybe'}, {'maxPrice': '-1'}):
+        with pytest.raises(ValueError):
+            parse_catalog_query(parameters)
+
+
+def test_plan_query_picks_an_index_or_falls_back():
+    assert plan_query(CatalogQuery(sort='price')).index == INDEX_BY_PRICE
+    assert plan_query(CatalogQuery(sort='price')).key_condition is None
+
+    by_title = plan_query(CatalogQuery(search='app', min_price=5, in_stock=True))
+    assert by_title.index == INDEX_BY_TITLE
+    assert by_title.key_condition == 'begins_with(#title_lower, :search)'
+    assert by_title.filter_expression == '#price >= :minPrice AND #count > :zero'
+
+    assert plan_query(CatalogQuery(min_price=5, max_price=9)).index == INDEX_BY_PRICE
+    # the requested order is on the other index, or nothing is indexed at all
+    assert plan_query(CatalogQuery(search='app', sort='price')).index is None
+    assert plan_query(CatalogQuery(min_price=5, sort='title')).index is None
+    assert plan_query(CatalogQuery(in_stock=True)).index is None
+
+
+def test_price_range_sorted_without_scanning(catalog, lambda_context, mocker):
+    client, products = catalog
+    scan = mocker.spy(client, 'scan')
+
+    status, body = list_products(client, {'minPrice': '10', 'maxPrice': '20', 'order': 'desc'}, lambda_context)
+
+    expected = sorted((p for p in products if 10 <= p['price'] <= 20), key=lambda p: p['price'], reverse=True)
+    assert status == 200
+    assert [p['price'] for p in body] == [p['price'] for p in expected]
+    assert {p['id'] for p in body} == {p['id'] for p in expected}
+    scan.assert_not_called()
+
+
+def test_pages_merge_shards_in_order(catalog, lambda_context):
+    client, products = catalog
+
+    items = all_pages(client, {'sort': 'title', 'limit': '5'}, lambda_context)
+
+    assert [p['title'] for p in items] == sorted(TITLES, key=str.lower)
+
+
+def test_title_prefix_search_is_case_insensitive(catalog, lambda_context):
+    client, products = catalog
+
+    status, body = list_products(client, {'q': 'APPLE', 'inStock': 'true'}, lambda_context)
+
+    expected = [p for p in products if p['title'].lower().startswith('apple') and p['count'] > 0]
+    assert status == 200
+    assert [p['title'] for p in body] == sorted((p['title'] for p in expected), key=str.lower)
+    assert all(p['count'] > 0 for p in body)
+
+
+def test_unindexed_combination_scans_with_a_warning_metric(catalog, lambda_context, mocker):
+    from metrics import metrics
+    client, products = catalog
+    increment = mocker.spy(metrics, 'increment')
+
+    items = all_pages(client, {'q': 'b', 'sort': 'price', 'limit': '2'}, lambda_context)
+
+    expected = sorted((p for p in products if p['title'].lower().startswith('b')), key=lambda p: (p['price'], p['id']))
+    assert [p['id'] for p in items] == [p['id'] for p in expected]
+    increment.assert_any_call('UnindexedQuery')
+
+
+def test_invalid_query_is_a_bad_request(catalog, lambda_context):
+    client, _ = catalog
+
+    status, body = list_products(client, {'sort': 'popularity'}, lambda_context)
+    assert status == 400
+    assert body['error']['code'] == 'INVALID_REQUEST'
+
+    # a cursor of the unfiltered list does not fit a filtered query
+    _, page = list_products(client, {'limit': '2'}, lambda_context)
+    status, _ = list_products(client, {'sort': 'price', 'limit': '2', 'cursor': page['nextCursor']}, lambda_context)
+    assert status == 400
+
+
+def test_resource_path_queries_through_the_injected_resource(catalog, lambda_context, mocker):
+    from src.functions import get_products_list
+    _, products = catalog
+    mocker.patch.object(get_products_list, 'READ_PATH', 'resource')
+    get_client = mocker.patch.object(get_products_list, 'get_client')
+    resource = boto3.resource('dynamodb', region_name='us-east-1')
+    query = mocker.spy(resource.meta.client, 'query')
+
+    status, body = list_products(resource, {'q': 'apple'}, lambda_context)
+
+    assert status == 200
+    assert {p['title'] for p in body} == {p['title'] for p in products if p['title'].lower().startswith('apple')}
+    assert query.called
+    # the unindexed fallback pages through a scan, with wire cursors, on the same resource
+    items = all_pages(resource, {'q': 'b', 'sort': 'price', 'limit': '2'}, lambda_context)
+    assert len(items) == len([p for p in products if p['title'].lower().startswith('b')])
+    get_client.assert_not_called()
@@ -0,0 +1,78 @@
+# tests/test_compression.py
+import base64
+import gzip
+import json
+
+import boto3
+
+from compression import choose_encoding, compress_response, parse_accept_encoding
+
+
+def decoded(response):
+    return gzip.decompress(base64.b64decode(response['body'])).decode('utf-8')
+
+
+def test_accept_encoding_negotiation():
+    assert parse_accept_encoding('gzip;q=0.5, deflate') == {'gzip': 0.5, 'deflate': 1.0}
+    assert choose_encoding('gzip, deflate', ['gzip']) == 'gzip'
+    assert choose_encoding('br;q=0.4, gzip;q=0.8', ['br', 'gzip']) == 'gzip'
+    assert choose_encoding('br, gzip', ['br', 'gzip']) == 'br'
+    assert choose_encoding('gzip;q=0', ['gzip']) is None
+    assert choose_encoding('*', ['gzip']) == 'gzip'
+    assert choose_encoding('identity', ['gzip']) is None
+    assert choose_encoding(None, ['gzip']) is None
+
+
+def test_compress_response_above_threshold_only():
+    body = json.dumps([{'id': str(i), 'title': f'Product {i}'} for i in range(100)])
+
+    small = compress_response({'statusCode': 200, 'headers': {}, 'body': '[]'}, 'gzip', min_bytes=64)
+    large = compress_response({'statusCode': 200, 'headers': {'ETag': '"v1"'}, 'body': body}, 'gzip', min_bytes=64)
+
+    assert small['body'] == '[]'
+    assert 'isBase64Encoded' not in small
+    assert small['headers']['Vary'] == 'Accept-Encoding'
+    assert large['isBase64Encoded'] is True
+    assert large['headers']['Content-Encoding'] == 'gzip'
+    assert large['headers']['ETag'] == 'W/"v1"'
+    assert decoded(large) == body
+
+
+def test_compress_response_prefers_precompressed_body():
+    stored = gzip.compress(b'["stored"]')
+    response = compress_response(
+        {'statusCode': 200, 'headers': {}, 'body': '["stored"]'}, 'gzip', min_bytes=0,
+        precompressed={'gzip': stored}
+    )
+
+    assert base64.b64decode(response['body']) == stored
+
+
+def test_get_products_list_compressed(api_gateway_event, lambda_context, mock_products, dynamodb_mock, mocker):
+    from src.functions.get_products_list import handler
+
+    mocker.patch('compression.COMPRESSION_MIN_BYTES', 16)
+    event = api_gateway_event()
+    event['headers']['Accept-Encoding'] = 'gzip, deflate, br;q=0'
+    response = handler(event, lambda_context, dynamodb_mock)
+
+    assert response['statusCode'] == 200
+    assert response['isBase64Encoded'] is True
+    assert len(json.loads(decoded(response))) == len(mock_products)
+
+    # the weak tag of the compressed body still revalidates
+    event['headers']['If-None-Match'] = response['headers']['ETag']
+    revalidated = handler(event, lambda_context, dynamodb_mock)
+
+    assert revalidated['statusCode'] == 304
+    assert revalidated['headers']['Vary'] == 'Accept-Encoding'
+
+
+def test_create_product_accepts_base64_body(lambda_context, dynamodb_mock):
+    from src.functions.create_product import handler
+
+    product = {'title': 'Lamp', 'description': 'Desk lamp', 'price': 12.5, 'count': 3}
+    event = {'body': base64.b64encode(json.dumps(product).encode()).decode(), 'isBase64Encoded': True}
+    response = handler(event, lambda_context, boto3.client('dynamodb', region_name='us-east-1'))
+
+    assert response['statusCode'] == 201
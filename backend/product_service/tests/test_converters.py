@@ -0,0 +1,86 @@
+import json
+
+import boto3
+import pytest
+
+from src.functions.converters import (
+    ClientTable, key_from_wire, key_to_wire, product_from_wire, stock_from_wire
+)
+
+
+def test_wire_items_are_converted_to_the_output_types():
+    product = product_from_wire({
+        'id': {'S': '1'}, 'title': {'S': 'Book'}, 'description': {'S': 'Paper'}, 'price': {'N': '24'}
+    })
+    stock = stock_from_wire({'product_id': {'S': '1'}, 'count': {'N': '5'}})
+
+    assert product == {'id': '1', 'title': 'Book', 'description': 'Paper', 'price': 24.0}
+    assert isinstance(product['price'], float)
+    assert stock == {'product_id': '1', 'count': 5}
+
+
+def test_non_integral_stored_counts_are_read_like_the_resource_path():
+    # written before counts were validated; int(Decimal(...)) as boto3 resource readers do
+    product = product_from_wire({
+        'id': {'S': '1'}, 'title': {'S': 'Book'}, 'price': {'N': '24'}, 'count': {'N': '1.5'}
+    })
+
+    assert product['count'] == 1
+    assert stock_from_wire({'product_id': {'S': '1'}, 'count': {'N': '3.0'}})['count'] == 3
+
+
+def test_keys_round_trip_between_plain_and_wire_format():
+    key = {'id': 'abc', 'version': 3}
+
+    assert key_to_wire(key) == {'id': {'S': 'abc'}, 'version': {'N': '3'}}
+    assert key_from_wire(key_to_wire(key)) == key
+
+
+def test_client_table_converts_items_and_keys(mocker):
+    client = mocker.Mock()
+    client.scan.return_value = {
+        'Items': [{'product_id': {'S': '1'}, 'count': {'N': '2'}}],
+        'LastEvaluatedKey': {'product_id': {'S': '1'}},
+    }
+
+    response = ClientTable(client, 'stocks', stock_from_wire).scan(Limit=1, ExclusiveStartKey={'product_id': '0'})
+
+    client.scan.assert_called_once_with(TableName='stocks', Limit=1, ExclusiveStartKey={'product_id': {'S': '0'}})
+    assert response == {'Items': [{'product_id': '1', 'count': 2}], 'LastEvaluatedKey': {'product_id': '1'}}
+
+
+@pytest.mark.parametrize('query_parameters', [None, {'limit': '4'}])
+def test_products_list_client_path_matches_resource_path(mocker, api_gateway_event, lambda_context,
+                                                         dynamodb_mock, query_parameters):
+    from src.functions import get_products_list
+    from cache import clear_caches
+
+    event = api_gateway_event()
+    event['queryStringParameters'] = query_parameters
+    resource_body = json.loads(get_products_list.handler(event, lambda_context, dynamodb_mock)['body'])
+
+    clear_caches()
+    mocker.patch.object(get_products_list, 'READ_PATH', 'client')
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    client_body = json.loads(get_products_list.handler(event, lambda_context, client)['body'])
+
+    assert client_body == resource_body
+
+
+@pytest.mark.parametrize('consistent', ['false', 'true'])
+def test_product_by_id_client_path(mocker, lambda_context, dynamodb_mock, consistent):
+    from src.functions import get_product_by_id
+
+    mocker.patch.object(get_product_by_id, 'READ_PATH', 'client')
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    event = {
+        'pathParameters': {'productId': '7567ec4b-b10c-48c5-9345-fc73c48a80aa'},
+        'queryStringParameters': {'consistent': consistent},
+    }
+
+    response = get_product_by_id.handler(event, lambda_context, client)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['count'] == 5
+    assert body['price'] == 24
@@ -0,0 +1,96 @@
+import json
+
+import boto3
+import pytest
+
+from src.functions.create_products_batch import handler
+
+
+def batch_event(products, idempotency_key=None):
+    headers = {'Idempotency-Key': idempotency_key} if idempotency_key else {}
+    return {'httpMethod': 'POST', 'path': '/products/batch', 'headers': headers,
+            'body': json.dumps({'products': products})}
+
+
+def product(i):
+    return {'title': f'Lamp {i}', 'description': 'Desk lamp', 'price': 10 + i, 'count': i}
+
+
+@pytest.fixture
+def client(dynamodb_mock):
+    return boto3.client('dynamodb', region_name='us-east-1')
+
+
+def test_batch_is_written_in_chunked_transactions(mocker, lambda_context, dynamodb_mock, client):
+    transact = mocker.spy(client, 'transact_write_items')
+
+    response = handler(batch_event([product(i) for i in range(120)]), lambda_context, client)
+
+    assert response['statusCode'] == 201
+    body = json.loads(response['body'])
+    assert body['created'] == 120
+    assert [result['index'] for result in body['results']] == list(range(120))
+    # a product and its stock row per product, 100 items per transaction
+    assert transact.call_count == 3
+    created = body['results'][7]['product']
+    stored = dynamodb_mock.Table('products').get_item(Key={'id': created['id']})['Item']
+    assert stored['title'] == 'Lamp 7'
+    assert dynamodb_mock.Table('stocks').get_item(Key={'product_id': created['id']})['Item']['count'] == 7
+
+
+def test_invalid_items_fail_alone_with_207(lambda_context, dynamodb_mock, client):
+    products = [product(0), {'title': 'No price', 'description': '', 'count': 1},
+                {**product(2), 'count': 'many'}, 'not a product', {**product(4), 'count': '1.5'},
+                {**product(5), 'count': 3.0}]
+
+    response = handler(batch_event(products), lambda_context, client)
+
+    assert response['statusCode'] == 207
+    results = json.loads(response['body'])['results']
+    assert [result['status'] for result in results] == [201, 400, 400, 400, 400, 201]
+    assert results[1]['error'] == {'code': 'INVALID_PRODUCT', 'message': 'Missing required fields: price'}
+    assert results[2]['error']['message'] == 'count must be a non-negative integer'
+
+
+def test_retried_batch_with_idempotency_key_creates_no_copies(mocker, lambda_context, dynamodb_mock, client):
+    transact = mocker.spy(client, 'transact_write_items')
+    event = batch_event([product(i) for i in range(3)], idempotency_key='import-2024-06-01')
+    before = len(dynamodb_mock.Table('products').scan()['Items'])
+
+    first = json.loads(handler(event, lambda_context, client)['body'])
+    second = json.loads(handler(event, lambda_context, client)['body'])
+
+    assert first['results'] == second['results']
+    assert len(dynamodb_mock.Table('products').scan()['Items']) == before + 3
+    tokens = [call.kwargs['ClientRequestToken'] for call in transact.call_args_list]
+    assert len(tokens) == 2 and tokens[0] == tokens[1] and len(tokens[0]) == 36
+
+
+def test_retried_batch_with_a_changed_product_is_a_conflict_for_that_product(lambda_context, dynamodb_mock, client):
+    products = [product(i) for i in range(3)]
+    handler(batch_event(products, idempotency_key='import-2024-06-02'), lambda_context, client)
+
+    products[1] = {**products[1], 'title': 'Second'}
+    response = handler(batch_event(products, idempotency_key='import-2024-06-02'), lambda_context, client)
+
+    assert response['statusCode'] == 207
+    results = json.loads(response['body'])['results']
+    assert [result['status'] for result in results] == [201, 409, 201]
+    assert results[1]['error']['code'] == 'IDEMPOTENCY_KEY_REUSED'
+    assert results[0]['product']['title'] == 'Lamp 0'
+    stored = dynamodb_mock.Table('products').scan()['Items']
+    assert 'Lamp 1' in {item['title'] for item in stored} and 'Second' not in {item['title'] for item in stored}
+
+
+@pytest.mark.parametrize('event', [
+    {'body': 'not json'},
+    {'body': json.dumps({'products': []})},
+    {'body': json.dumps([product(0)])},
+    {'body': json.dumps({'products': [product(0)] * 501})},
+    {'body': json.dumps({'products': [product(0)]}), 'headers': {'Idempotency-Key': ' '}},
+])
+def test_unusable_batch_is_a_bad_request(lambda_context, dynamodb_mock, client, event):
+    response = handler(event, lambda_context, client)
+
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error']['code'] == 'INVALID_REQUEST'
@@ -0,0 +1,55 @@
+# tests/test_dynamo_scan.py
+import zlib
+import pytest
+from src.functions.dynamo_scan import scan_all, scan_segment
+
+
+class FakeTable:
+    """Table stub that honours Segment/TotalSegments and pages results like DynamoDB"""
+    def __init__(self, items, key='id', page_size=2):
+        self.items = items
+        self.key = key
+        self.page_size = page_size
+        self.calls = []
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        items = self.items
+        if 'TotalSegments' in kwargs:
+            items = [
+                item for item in items
+                if zlib.crc32(item[self.key].encode()) % kwargs['TotalSegments'] == kwargs['Segment']
+            ]
+        start = 0
+        if 'ExclusiveStartKey' in kwargs:
+            start = items.index(kwargs['ExclusiveStartKey']) + 1
+        page = items[start:start + self.page_size]
+        response = {'Items': page}
+        if start + self.page_size < len(items):
+            response['LastEvaluatedKey'] = page[-1]
+        return response
+
+
+@pytest.fixture
+def items():
+    return [{'id': f'product-{i}'} for i in range(11)]
+
+
+def test_scan_segment_follows_pagination(items):
+    table = FakeTable(items)
+
+    result = scan_segment(table)
+
+    assert result == items
+    assert len(table.calls) == 6
+    assert 'Segment' not in table.calls[0]
+
+
+def test_scan_all_parallel_segments(items):
+    table = FakeTable(items)
+
+    result = scan_all(table, total_segments=4)
+
+    assert sorted(item['id'] for item in result) == sorted(item['id'] for item in items)
+    assert {call['Segment'] for call in table.calls} == {0, 1, 2, 3}
+    assert all(call['TotalSegments'] == 4 for call in table.calls)
@@ -0,0 +1,149 @@
+# tests/test_etag.py
+import json
+
+import boto3
+import pytest
+
+from cache import products_cache, sync_generation
+from catalog_version import bump_catalog_version, read_catalog_version
+from etag import content_etag, etag_matches, version_etag
+
+
+@pytest.fixture
+def catalog_meta(dynamodb_mock, monkeypatch):
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    client.create_table(
+        TableName='catalog_meta',
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    monkeypatch.setenv('CATALOG_META_TABLE_NAME', 'catalog_meta')
+    # the handlers build their own client for the counter, as they do in Lambda
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    return client
+
+
+def with_header(event, name, value):
+    event['headers'] = {**event['headers'], name: value}
+    return event
+
+
+def test_etag_matches_uses_weak_comparison():
+    etag = content_etag('[]')
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'W/{etag}', etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert version_etag(3) == '"v3"'
+    assert version_etag(3, 10, 'cursor') != version_etag(3, 10, None)
+
+
+def test_get_product_by_id_not_modified(api_gateway_event, lambda_context, mock_products, dynamodb_mock):
+    from src.functions.get_product_by_id import handler
+
+    event = api_gateway_event(path_parameters={"productId": mock_products[0]['id']})
+    response = handler(event, lambda_context, dynamodb_mock)
+    etag = response['headers']['ETag']
+
+    assert response['statusCode'] == 200
+    assert etag == content_etag(response['body'])
+
+    revalidated = handler(with_header(event, 'If-None-Match', etag), lambda_context, dynamodb_mock)
+
+    assert revalidated['statusCode'] == 304
+    assert revalidated['body'] == ''
+    assert revalidated['headers']['ETag'] == etag
+
+
+def test_get_products_list_hashes_body_without_version(api_gateway_event, lambda_context, dynamodb_mock):
+    from src.functions.get_products_list import handler
+
+    response = handler(api_gateway_event(), lambda_context, dynamodb_mock)
+    etag = response['headers']['ETag']
+
+    assert etag == content_etag(response['body'])
+    revalidated = handler(with_header(api_gateway_event(), 'if-none-match', etag), lambda_context, dynamodb_mock)
+    assert revalidated['statusCode'] == 304
+
+
+def test_get_products_list_not_modified_skips_scan(api_gateway_event, lambda_context, mock_products,
+                                                   dynamodb_mock, catalog_meta, mocker):
+    from src.functions.get_products_list import handler
+
+    bump_catalog_version(catalog_meta, 'catalog_meta')
+    response = handler(api_gateway_event(), lambda_context, dynamodb_mock)
+
+    assert response['statusCode'] == 200
+    assert response['headers']['ETag'] == '"v1"'
+    assert len(json.loads(response['body'])) == len(mock_products)
+
+    scan = mocker.patch('src.functions.get_products_list.get_products_list')
+    revalidated = handler(with_header(api_gateway_event(), 'If-None-Match', '"v1"'), lambda_context, dynamodb_mock)
+
+    assert revalidated['statusCode'] == 304
+    assert revalidated['body'] == ''
+    scan.assert_not_called()
+
+    # a write bumps the version, so the client's copy is stale again
+    bump_catalog_version(catalog_meta, 'catalog_meta')
+    mocker.stopall()
+    changed = handler(with_header(api_gateway_event(), 'If-None-Match', '"v1"'), lambda_context, dynamodb_mock)
+
+    assert changed['statusCode'] == 200
+    assert changed['headers']['ETag'] == '"v2"'
+    assert read_catalog_version(catalog_meta, 'catalog_meta') == 2
+
+
+def test_create_product_bumps_catalog_version(lambda_context, dynamodb_mock, catalog_meta):
+    from src.functions.create_product import handler
+
+    event = {'body': json.dumps({'title': 'Lamp', 'description': 'Desk lamp', 'price': 12.5, 'count': 3})}
+    response = handler(event, lambda_context, catalog_meta)
+
+    assert response['statusCode'] == 201
+    assert read_catalog_version(catalog_meta, 'catalog_meta') == 1
+
+
+def test_sync_generation_clears_caches_on_change():
+    products_cache.set('key', 'value')
+
+    assert not sync_generation(1)
+    assert not sync_generation(1)
+    assert products_cache.get('key') == 'value'
+    assert sync_generation(2)
+    assert products_cache.stats()['size'] == 0
+
+
+def test_failed_version_bump_is_retried_then_fails_the_request(lambda_context, dynamodb_mock, catalog_meta, mocker):
+    from botocore.exceptions import ClientError
+    from src.functions.create_product import handler
+
+    mocker.patch('catalog_version.time.sleep')
+    update_item = mocker.patch.object(catalog_meta, 'update_item', side_effect=ClientError(
+        {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'slow down'}}, 'UpdateItem'
+    ))
+    event = {'headers': {'Idempotency-Key': 'checkout-7'},
+             'body': json.dumps({'title': 'Lamp', 'description': 'Desk lamp', 'price': 12.5, 'count': 3})}
+
+    assert handler(event, lambda_context, catalog_meta)['statusCode'] == 500
+    assert update_item.call_count == 4
+
+    # the client's retry finds the product written and bumps the version it missed
+    mocker.stopall()
+    assert handler(event, lambda_context, catalog_meta)['statusCode'] == 201
+    assert read_catalog_version(catalog_meta, 'catalog_meta') == 1
+
+
+def test_streamed_changes_bump_catalog_version(lambda_context, catalog_meta, mocker, monkeypatch):
+    from src.functions.catalog_snapshot_builder import handler
+
+    monkeypatch.setenv('CATALOG_SNAPSHOT_BUCKET', 'catalog-snapshots')
+    mocker.patch('src.functions.catalog_snapshot_builder.rebuild_snapshot', return_value={'products': 1})
+
+    handler({'Records': [{'eventName': 'INSERT'}]}, lambda_context, catalog_meta, mocker.Mock())
+
+    assert read_catalog_version(catalog_meta, 'catalog_meta') == 1
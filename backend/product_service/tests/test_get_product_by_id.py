@@ -55,3 +55,47 @@ def test_get_product_by_id_empty_parameter(api_gateway_event, lambda_context):
     assert response['statusCode'] == 400
     body = json.loads(response['body'])
     assert body['message'] == 'Bad Request: ProductId cannot be empty'
+
+@pytest.mark.parametrize('consistent', ['false', 'true'])
+def test_get_product_by_id_joins_stock(api_gateway_event, lambda_context, mock_products, dynamodb_mock, consistent):
+    """Test product and stock are returned together, with and without consistent reads"""
+    # Prepare
+    product_id = mock_products[0]['id']
+    event = api_gateway_event(path_parameters={"productId": product_id})
+    event['queryStringParameters'] = {'consistent': consistent}
+
+    # Execute
+    response = handler(event, lambda_context, dynamodb_mock)
+
+    # Assert
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['id'] == product_id
+    assert body['count'] == 5
+    assert body['price'] == 24
+
+def test_get_product_by_id_without_stock(api_gateway_event, lambda_context, mock_products, dynamodb_mock):
+    """Test products without a stock row report a zero count"""
+    # Prepare
+    product_id = mock_products[2]['id']
+    event = api_gateway_event(path_parameters={"productId": product_id})
+    event['queryStringParameters'] = {'consistent': 'true'}
+
+    # Execute
+    response = handler(event, lambda_context, dynamodb_mock)
+
+    # Assert
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['count'] == 0
+
+def test_get_product_by_id_not_found_consistent(api_gateway_event, lambda_context, dynamodb_mock):
+    """Test consistent reads still return 404 for unknown products"""
+    # Prepare
+    event = api_gateway_event(path_parameters={"productId": "nonexistent-id"})
+    event['queryStringParameters'] = {'consistent': 'true'}
+
+    # Execute
+    response = handler(event, lambda_context, dynamodb_mock)
+
+    # Assert
+    assert response['statusCode'] == 404
@@ -0,0 +1,72 @@
+import json
+
+import boto3
+import pytest
+
+from src.functions.get_products_by_ids import handler
+
+PRODUCT_ID = '7567ec4b-b10c-48c5-9345-fc73c48a80aa'
+OTHER_PRODUCT_ID = '7567ec4b-b10c-48c5-9345-fc73c48a80a1'
+
+
+def batch_get_event(body, **event):
+    return {'httpMethod': 'POST', 'path': '/products/batch-get', 'headers': {}, 'body': json.dumps(body), **event}
+
+
+@pytest.mark.parametrize('read_path', ['resource', 'client'])
+def test_results_in_request_order_with_not_found_markers(mocker, lambda_context, dynamodb_mock, read_path):
+    from src.functions import get_products_by_ids
+    mocker.patch.object(get_products_by_ids, 'READ_PATH', read_path)
+    dynamodb = boto3.client('dynamodb', region_name='us-east-1') if read_path == 'client' else dynamodb_mock
+    ids = [OTHER_PRODUCT_ID, 'missing-id', PRODUCT_ID, OTHER_PRODUCT_ID]
+
+    response = handler(batch_get_event({'ids': ids}), lambda_context, dynamodb)
+
+    assert response['statusCode'] == 200
+    items = json.loads(response['body'])['items']
+    assert [item['id'] for item in items] == ids
+    assert items[1] == {'id': 'missing-id', 'error': {'code': 'PRODUCT_NOT_FOUND'}}
+    assert items[2] == {'id': PRODUCT_ID, 'title': 'MyShinyProduct', 'description': 'Short Product Description1',
+                        'price': 24, 'count': 5}
+    assert items[0] == items[3]
+    assert items[0]['count'] == 3
+
+
+def test_large_batches_are_chunked_and_fetched_once(mocker, lambda_context, dynamodb_mock):
+    from src.functions import get_products_by_ids
+    batch_get = mocker.spy(get_products_by_ids, 'batch_get_request')
+    ids = [PRODUCT_ID] + [f'missing-{i}' for i in range(120)]
+
+    first = handler(batch_get_event({'ids': ids}), lambda_context, dynamodb_mock)
+    # products and their stocks share each call, 50 ids per call
+    assert batch_get.call_count == 3
+    assert all(sum(len(request['Keys']) for request in call.args[1].values()) <= 100
+               for call in batch_get.call_args_list)
+
+    batch_get.reset_mock()
+    second = handler(batch_get_event({'ids': [PRODUCT_ID]}), lambda_context, dynamodb_mock)
+    batch_get.assert_not_called()
+    assert json.loads(second['body'])['items'] == json.loads(first['body'])['items'][:1]
+
+
+@pytest.mark.parametrize('body', [{}, {'ids': []}, {'ids': 'abc'}, {'ids': [1]}, {'ids': ['a'] * 301}, ['a']])
+def test_invalid_ids_are_a_bad_request(lambda_context, dynamodb_mock, body):
+    response = handler(batch_get_event(body), lambda_context, dynamodb_mock)
+
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error']['code'] == 'INVALID_REQUEST'
+
+
+def test_products_list_with_ids_is_a_batch_lookup(api_gateway_event, lambda_context, dynamodb_mock):
+    from src.functions import get_products_list
+
+    event = api_gateway_event()
+    event['queryStringParameters'] = {'ids': f'{PRODUCT_ID}, missing-id'}
+    response = get_products_list.handler(event, lambda_context, dynamodb_mock)
+
+    assert response['statusCode'] == 200
+    items = json.loads(response['body'])['items']
+    assert [item['id'] for item in items] == [PRODUCT_ID, 'missing-id']
+
+    event['headers']['If-None-Match'] = response['headers']['ETag']
+    assert get_products_list.handler(event, lambda_context, dynamodb_mock)['statusCode'] == 304
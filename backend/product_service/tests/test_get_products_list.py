@@ -50,3 +50,44 @@ def test_get_products_list_error_handling(api_gateway_event, lambda_context, moc
     assert response['statusCode'] == 500
     body = json.loads(response['body'])
     assert body['message'] == 'Internal server error'
+
+def test_get_products_list_paginated(api_gateway_event, lambda_context, mock_products, dynamodb_mock):
+    """Test walking the catalog page by page with limit and cursor"""
+    from src.functions.get_products_list import handler
+
+    seen = []
+    cursor = None
+    for _ in range(len(mock_products) + 1):
+        event = api_gateway_event()
+        event['queryStringParameters'] = {'limit': '4', **({'cursor': cursor} if cursor else {})}
+        response = handler(event, lambda_context, dynamodb_mock)
+
+        assert response['statusCode'] == 200
+        body = json.loads(response['body'])
+        assert len(body['items']) <= 4
+        seen.extend(body['items'])
+        cursor = body['nextCursor']
+        if not cursor:
+            break
+
+    assert sorted(p['id'] for p in seen) == sorted(p['id'] for p in mock_products)
+    counts = {p['id']: p['count'] for p in seen}
+    assert counts['7567ec4b-b10c-48c5-9345-fc73c48a80aa'] == 5
+    assert counts['7567ec4b-b10c-48c5-9345-fc73c48a80a3'] == 0
+
+@pytest.mark.parametrize('query_parameters', [
+    {'limit': 'abc'},
+    {'limit': '0'},
+    {'limit': '1000'},
+    {'cursor': 'not-a-cursor'},
+])
+def test_get_products_list_invalid_pagination(api_gateway_event, lambda_context, dynamodb_mock, query_parameters):
+    """Test bad limit and cursor values are rejected"""
+    from src.functions.get_products_list import handler
+
+    event = api_gateway_event()
+    event['queryStringParameters'] = query_parameters
+    response = handler(event, lambda_context, dynamodb_mock)
+
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error']['code'] == 'INVALID_REQUEST'
@@ -0,0 +1,119 @@
+import json
+
+import boto3
+import pytest
+
+from idempotency import get_idempotency_key, idempotent_id
+
+
+@pytest.fixture
+def client(dynamodb_mock, monkeypatch):
+    monkeypatch.setenv('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:123456789012:createProductTopic')
+    return boto3.client('dynamodb', region_name='us-east-1')
+
+
+def count_products(dynamodb_mock):
+    return len(dynamodb_mock.Table('products').scan()['Items'])
+
+
+def test_ids_only_depend_on_their_parts():
+    assert idempotent_id('key', 'product', 1) == idempotent_id('key', 'product', 1)
+    assert idempotent_id('key', 'product', 1) != idempotent_id('key', 'product', 2)
+    assert get_idempotency_key({'headers': {'idempotency-key': ' abc '}}) == 'abc'
+    assert get_idempotency_key({'headers': {}}) is None
+
+
+def test_create_product_retry_with_idempotency_key_is_a_no_op(lambda_context, dynamodb_mock, client, mocker):
+    from src.functions.create_product import handler
+    transact = mocker.spy(client, 'transact_write_items')
+    event = {
+        'headers': {'Idempotency-Key': 'checkout-42'},
+        'body': json.dumps({'title': 'Lamp', 'description': 'Desk lamp', 'price': 12.5, 'count': 3}),
+    }
+    before = count_products(dynamodb_mock)
+
+    first = handler(event, lambda_context, client)
+    second = handler(event, lambda_context, client)
+
+    assert first['statusCode'] == second['statusCode'] == 201
+    assert json.loads(first['body'])['product']['id'] == json.loads(second['body'])['product']['id']
+    assert json.loads(first['body'])['product'] == {
+        'id': json.loads(first['body'])['product']['id'],
+        'title': 'Lamp', 'description': 'Desk lamp', 'price': 12.5, 'count': 3
+    }
+    assert count_products(dynamodb_mock) == before + 1
+    tokens = {call.kwargs['ClientRequestToken'] for call in transact.call_args_list}
+    assert len(tokens) == 1
+
+
+def test_create_product_key_reused_for_another_body_is_a_conflict(lambda_context, dynamodb_mock, client):
+    from src.functions.create_product import handler
+
+    def event(title):
+        return {'headers': {'Idempotency-Key': 'checkout-43'},
+                'body': json.dumps({'title': title, 'description': 'Desk lamp', 'price': 12.5, 'count': 3})}
+
+    first = json.loads(handler(event('First'), lambda_context, client)['body'])['product']
+    second = handler(event('Second'), lambda_context, client)
+
+    assert second['statusCode'] == 409
+    assert json.loads(second['body'])['error']['code'] == 'IDEMPOTENCY_KEY_REUSED'
+    assert dynamodb_mock.Table('products').get_item(Key={'id': first['id']})['Item']['title'] == 'First'
+
+
+def test_create_product_replay_returns_the_same_body(lambda_context, dynamodb_mock, client):
+    from src.functions.create_product import handler
+    event = {
+        'headers': {'Idempotency-Key': 'checkout-44'},
+        'body': json.dumps({'title': 'Lamp', 'description': 'Desk lamp', 'price': '12.50', 'count': '3'}),
+    }
+
+    first = handler(event, lambda_context, client)
+    second = handler(event, lambda_context, client)
+
+    assert first['body'] == second['body']
+    assert json.loads(first['body'])['product']['price'] == 12.5
+    assert json.loads(first['body'])['product']['count'] == 3
+
+
+def test_redelivered_message_creates_no_duplicates(lambda_context, dynamodb_mock, client, mocker):
+    from src.functions.catalog_batch_process import handler
+    rows = [{'Title': f'Row {i}', 'Description': '', 'Price': '1', 'Count': '1'} for i in range(3)]
+    message = {'messageId': 'message-1', 'body': json.dumps({'version': 2, 'rows': rows})}
+    before = count_products(dynamodb_mock)
+
+    handler({'Records': [message]}, lambda_context, mocker.Mock(), client)
+    # redelivered together with a new message, so the transaction differs from the first one
+    new_message = {'messageId': 'message-2', 'body': json.dumps({'version': 2, 'rows': rows[:1]})}
+    sns = mocker.Mock()
+    response = handler({'Records': [message, new_message]}, lambda_context, sns, client)
+
+    assert response['batchItemFailures'] == []
+    assert count_products(dynamodb_mock) == before + 4
+    # only the new message's product is announced
+    assert sns.publish.call_args.kwargs['Message'] == 'Successfully processed and created 1 products'
+
+    sns.reset_mock()
+    handler({'Records': [message]}, lambda_context, sns, client)
+    sns.publish.assert_not_called()
+
+
+def test_file_rows_keep_their_ids_across_messages(lambda_context, dynamodb_mock, client, mocker):
+    from src.functions.catalog_batch_process import handler
+    rows = [{'Title': f'Row {i}', 'Description': '', 'Price': '1', 'Count': '1'} for i in range(4)]
+    source = 's3://import-bucket/uploaded/products.csv#etag'
+    before = count_products(dynamodb_mock)
+
+    # the file parsed twice, packed differently, into messages with new ids
+    handler({'Records': [
+        {'messageId': 'first-parse', 'body': json.dumps({
+            'version': 2, 'source': {'file': source, 'firstRow': 1}, 'rows': rows})},
+    ]}, lambda_context, mocker.Mock(), client)
+    handler({'Records': [
+        {'messageId': 'second-parse-1', 'body': json.dumps({
+            'version': 2, 'source': {'file': source, 'firstRow': 1}, 'rows': rows[:2]})},
+        {'messageId': 'second-parse-2', 'body': json.dumps({
+            'version': 2, 'source': {'file': source, 'firstRow': 3}, 'rows': rows[2:]})},
+    ]}, lambda_context, mocker.Mock(), client)
+
+    assert count_products(dynamodb_mock) == before + 4
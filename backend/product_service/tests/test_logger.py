@@ -0,0 +1,69 @@
+import json
+
+from src.functions.logger import StructuredLogger, truncate
+
+
+def lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_writes_one_json_object_per_line(capsys):
+    logger = StructuredLogger('test').bind(requestId='abc')
+    logger.info('Product created', productId='1')
+
+    [record] = lines(capsys)
+    assert record['level'] == 'INFO'
+    assert record['logger'] == 'test'
+    assert record['message'] == 'Product created'
+    assert record['productId'] == '1'
+    assert record['requestId'] == 'abc'
+
+
+def test_lines_below_the_level_are_never_formatted(capsys):
+    logger = StructuredLogger('test', level='INFO')
+    calls = []
+
+    logger.debug('Fetched products', products=lambda: calls.append('formatted'))
+
+    assert calls == []
+    assert capsys.readouterr().out == ''
+
+
+def test_lazy_fields_are_formatted_when_written(capsys):
+    logger = StructuredLogger('test', level='DEBUG')
+    logger.debug('Fetched products', products=lambda: [{'id': '1'}])
+
+    [record] = lines(capsys)
+    assert record['products'] == [{'id': '1'}]
+
+
+def test_sampling_drops_info_but_keeps_errors(capsys, mocker):
+    mocker.patch('src.functions.logger.random.random', return_value=0.5)
+    logger = StructuredLogger('test', sample_rate=0.1)
+
+    logger.info('sampled out')
+    logger.info('sampled in', sample_rate=0.9)
+    logger.error('always written')
+
+    records = lines(capsys)
+    assert [record['message'] for record in records] == ['sampled in', 'always written']
+    assert records[0]['sampleRate'] == 0.9
+
+
+def test_truncate_cuts_long_collections_before_serializing():
+    value = truncate([{'id': str(i)} for i in range(10000)], max_chars=1024, max_items=3)
+
+    assert value == {'items': [{'id': '0'}, {'id': '1'}, {'id': '2'}], 'total': 10000, 'truncated': True}
+
+
+def test_truncate_cuts_long_strings():
+    value = truncate('x' * 50, max_chars=10)
+
+    assert value == 'xxxxxxxxxx...(truncated 40 chars)'
+
+
+def test_failing_lazy_field_does_not_break_the_handler(capsys):
+    StructuredLogger('test').info('Broken', payload=lambda: 1 / 0)
+
+    [record] = lines(capsys)
+    assert record['payload'].startswith('<failed to format')
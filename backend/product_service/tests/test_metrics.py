@@ -0,0 +1,103 @@
+import json
+
+import boto3
+from botocore.stub import Stubber
+
+from metrics import InvocationMetrics, instrument_client, instrumented, metrics
+
+
+def stubbed_dynamodb():
+    client = boto3.client('dynamodb', region_name='us-east-1', aws_access_key_id='testing',
+                          aws_secret_access_key='testing')
+    instrument_client(client)
+    return client, Stubber(client)
+
+
+def test_calls_are_timed_with_retries_and_consumed_capacity():
+    metrics.reset()
+    client, stubber = stubbed_dynamodb()
+    stubber.add_response(
+        'get_item',
+        {
+            'Item': {'id': {'S': '1'}},
+            'ConsumedCapacity': {'TableName': 'products', 'CapacityUnits': 0.5},
+            'ResponseMetadata': {'RetryAttempts': 2},
+        },
+        # the instrumentation asks DynamoDB to report consumed capacity
+        {'TableName': 'products', 'Key': {'id': {'S': '1'}}, 'ReturnConsumedCapacity': 'TOTAL'}
+    )
+
+    with stubber:
+        client.get_item(TableName='products', Key={'id': {'S': '1'}})
+
+    call = metrics.calls['dynamodb.GetItem']
+    assert len(call['latencies']) == 1
+    assert call['retries'] == 2
+    assert call['capacity'] == 0.5
+    metrics.reset()
+
+
+def test_emf_document_declares_every_metric():
+    collected = InvocationMetrics(namespace='Test')
+    collected.record_call('dynamodb.Scan', 12.5, retries=1, capacity=3)
+    collected.record_call('dynamodb.Scan', 7.5)
+    with collected.span('scan'):
+        pass
+
+    document = collected.to_emf('get_products_list')
+
+    directive = document['_aws']['CloudWatchMetrics'][0]
+    assert directive['Namespace'] == 'Test'
+    assert directive['Dimensions'] == [['Function']]
+    assert {metric['Name'] for metric in directive['Metrics']} == {
+        'dynamodb.Scan.Latency', 'dynamodb.Scan.Calls', 'dynamodb.Scan.Retries',
+        'dynamodb.Scan.ConsumedCapacity', 'Stage.scan'
+    }
+    assert document['Function'] == 'get_products_list'
+    assert document['dynamodb.Scan.Latency'] == [12.5, 7.5]
+    assert document['dynamodb.Scan.Calls'] == 2
+    assert document['dynamodb.Scan.ConsumedCapacity'] == 3
+
+
+def test_latencies_of_many_calls_continue_in_further_documents():
+    collected = InvocationMetrics(namespace='Test')
+    for call in range(250):
+        collected.record_call('dynamodb.BatchGetItem', float(call))
+    collected.record_call('dynamodb.Query', 1.0)
+
+    documents = collected.to_emf_documents('get_products_list')
+
+    # CloudWatch rejects a document with more than 100 values in a metric
+    assert [len(document['dynamodb.BatchGetItem.Latency']) for document in documents] == [100, 100, 50]
+    assert sum((document['dynamodb.BatchGetItem.Latency'] for document in documents), []) == \
+        [float(call) for call in range(250)]
+    assert documents[0]['dynamodb.BatchGetItem.Calls'] == 250
+    assert documents[0]['dynamodb.Query.Latency'] == [1.0]
+    assert [metric['Name'] for metric in documents[2]['_aws']['CloudWatchMetrics'][0]['Metrics']] == [
+        'dynamodb.BatchGetItem.Latency'
+    ]
+
+
+def test_instrumented_handler_writes_one_emf_line_per_invocation(capsys):
+    @instrumented('test_handler')
+    def handler(event, context):
+        with metrics.span('parse'):
+            return {'statusCode': 200}
+
+    assert handler({}, None) == {'statusCode': 200}
+    handler({}, None)
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(lines) == 2
+    assert {'Stage.parse', 'Stage.handler'} <= set(lines[0])
+    assert metrics.spans == {}
+
+
+def test_disabled_metrics_record_nothing(capsys):
+    collected = InvocationMetrics(enabled=False)
+    with collected.span('scan'):
+        pass
+    collected.flush('test')
+
+    assert collected.spans == {}
+    assert capsys.readouterr().out == ''
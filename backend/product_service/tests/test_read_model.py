@@ -0,0 +1,88 @@
+import json
+
+import boto3
+import pytest
+
+from catalog_items import put_product_requests
+from snapshot import apply_stream_records
+
+
+@pytest.fixture
+def denormalized(dynamodb_mock):
+    """The products table after the backfill: every product item carries its stock count"""
+    products_table = dynamodb_mock.Table('products')
+    stocks = {stock['product_id']: stock['count'] for stock in dynamodb_mock.Table('stocks').scan()['Items']}
+    for product in products_table.scan()['Items']:
+        products_table.put_item(Item={**product, 'count': stocks.get(product['id'], 0)})
+    return dynamodb_mock
+
+
+def test_put_product_requests_write_count_on_both_items():
+    product, stock = put_product_requests('products', 'stocks', 'id-1', 'Lamp', 'Desk lamp', 12.5, 3)
+
+    assert product['Put']['TableName'] == 'products'
+    assert product['Put']['Item']['count'] == {'N': '3'}
+    assert product['Put']['Item']['price'] == {'N': '12.5'}
+    assert stock['Put']['Item'] == {'product_id': {'S': 'id-1'}, 'count': {'N': '3'}}
+
+
+@pytest.mark.parametrize('read_path', ['resource', 'client'])
+@pytest.mark.parametrize('query_parameters', [None, {'limit': '4'}])
+def test_products_list_denormalized_matches_joined(mocker, api_gateway_event, lambda_context, denormalized,
+                                                   read_path, query_parameters):
+    from src.functions import get_products_list
+    from cache import clear_caches
+
+    event = api_gateway_event()
+    event['queryStringParameters'] = query_parameters
+    joined_body = json.loads(get_products_list.handler(event, lambda_context, denormalized)['body'])
+
+    clear_caches()
+    mocker.patch.object(get_products_list, 'READ_MODEL', 'denormalized')
+    mocker.patch.object(get_products_list, 'READ_PATH', read_path)
+    stock_reads = mocker.spy(get_products_list, 'get_stock_counts')
+    dynamodb = boto3.client('dynamodb', region_name='us-east-1') if read_path == 'client' else denormalized
+    denormalized_body = json.loads(get_products_list.handler(event, lambda_context, dynamodb)['body'])
+
+    assert denormalized_body == joined_body
+    stock_reads.assert_not_called()
+
+
+@pytest.mark.parametrize('read_path', ['resource', 'client'])
+@pytest.mark.parametrize('consistent', ['false', 'true'])
+def test_product_by_id_denormalized_single_get(mocker, lambda_context, denormalized, read_path, consistent):
+    from src.functions import get_product_by_id
+
+    mocker.patch.object(get_product_by_id, 'READ_MODEL', 'denormalized')
+    mocker.patch.object(get_product_by_id, 'READ_PATH', read_path)
+    batch_get = mocker.spy(get_product_by_id, 'batch_get_request')
+    dynamodb = boto3.client('dynamodb', region_name='us-east-1') if read_path == 'client' else denormalized
+    event = {
+        'pathParameters': {'productId': '7567ec4b-b10c-48c5-9345-fc73c48a80aa'},
+        'queryStringParameters': {'consistent': consistent},
+    }
+
+    response = get_product_by_id.handler(event, lambda_context, dynamodb)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['count'] == 5
+    assert body['price'] == 24
+    batch_get.assert_not_called()
+
+
+def test_snapshot_takes_count_from_denormalized_product_record():
+    catalog = {}
+    records = [{
+        'eventName': 'INSERT',
+        'eventSourceARN': 'arn:aws:dynamodb:us-east-1:123456789012:table/products/stream/label',
+        'dynamodb': {
+            'Keys': {'id': {'S': 'id-1'}},
+            'NewImage': put_product_requests('products', 'stocks', 'id-1', 'Lamp', '', 12.5, 3)[0]['Put']['Item'],
+        },
+    }]
+
+    # no stock lookup is needed, so no client is
+    apply_stream_records(None, catalog, records, 'products', 'stocks')
+
+    assert catalog['id-1']['count'] == 3
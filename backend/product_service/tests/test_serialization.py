@@ -0,0 +1,44 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from serialization import convert_attributes, dumps, numbers_from_decimals, to_number
+
+
+def test_whole_decimals_become_ints_and_the_rest_floats():
+    assert to_number(Decimal('24')) == 24 and isinstance(to_number(Decimal('24')), int)
+    assert to_number(Decimal('10.50')) == 10.5
+
+
+def test_numbers_are_converted_in_place_including_nested_attributes():
+    items = [
+        {'id': '1', 'price': Decimal('10.5'), 'tags': [Decimal('1')], 'dimensions': {'width': Decimal('2.5')}},
+        Decimal('3'),
+    ]
+
+    result = numbers_from_decimals(items)
+
+    assert result is items
+    assert items == [{'id': '1', 'price': 10.5, 'tags': [1], 'dimensions': {'width': 2.5}}, 3]
+
+
+def test_convert_attributes_only_touches_the_known_numeric_attributes():
+    items = [{'id': '1', 'price': Decimal('24'), 'count': Decimal('5'), 'weight': Decimal('1.5')}]
+
+    convert_attributes(items)
+
+    assert items == [{'id': '1', 'price': 24.0, 'count': 5, 'weight': Decimal('1.5')}]
+    assert isinstance(items[0]['price'], float)
+
+
+def test_dumps_writes_compact_json_and_converts_leftover_decimals():
+    body = dumps({'price': Decimal('9.99'), 'count': Decimal('3'), 'title': 'Ünïcode'})
+
+    assert json.loads(body) == {'price': 9.99, 'count': 3, 'title': 'Ünïcode'}
+    assert ' ' not in body.replace('Ünïcode', '')
+
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
@@ -0,0 +1,141 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_s3
+
+from snapshot import SnapshotStore, rebuild_snapshot, snapshot_store
+
+BUCKET = 'catalog-snapshots'
+STREAM = 'arn:aws:dynamodb:us-east-1:123456789012:table/{}/stream/2024-01-01T00:00:00.000'
+
+
+@pytest.fixture
+def s3():
+    with mock_s3():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def snapshots(mocker, s3):
+    mocker.patch.object(snapshot_store, 'bucket', BUCKET)
+    snapshot_store.clear()
+    yield snapshot_store
+    snapshot_store.clear()
+
+
+def read_snapshot(s3):
+    return json.loads(s3.get_object(Bucket=BUCKET, Key='catalog/products.json')['Body'].read())
+
+
+def product_record(event_name, product_id, title='New product', price='9.5'):
+    record = {
+        'eventName': event_name,
+        'eventSourceARN': STREAM.format('products'),
+        'dynamodb': {'Keys': {'id': {'S': product_id}}},
+    }
+    if event_name != 'REMOVE':
+        record['dynamodb']['NewImage'] = {
+            'id': {'S': product_id}, 'title': {'S': title}, 'description': {'S': ''}, 'price': {'N': price}
+        }
+    return record
+
+
+def stock_record(product_id, count):
+    return {
+        'eventName': 'MODIFY',
+        'eventSourceARN': STREAM.format('stocks'),
+        'dynamodb': {
+            'Keys': {'product_id': {'S': product_id}},
+            'NewImage': {'product_id': {'S': product_id}, 'count': {'N': str(count)}},
+        },
+    }
+
+
+def test_full_rebuild_joins_stock_and_orders_by_id(dynamodb_mock, s3, mock_products):
+    client = boto3.client('dynamodb', region_name='us-east-1')
+
+    result = rebuild_snapshot(client, s3, 'products', 'stocks', bucket=BUCKET)
+
+    catalog = read_snapshot(s3)
+    assert result['mode'] == 'full'
+    assert [p['id'] for p in catalog] == sorted(p['id'] for p in mock_products)
+    counts = {p['id']: p['count'] for p in catalog}
+    assert counts['7567ec4b-b10c-48c5-9345-fc73c48a80aa'] == 5
+    assert counts['7567ec4b-b10c-48c5-9345-fc73c48a80a3'] == 0
+
+
+def test_stream_records_update_the_snapshot_incrementally(dynamodb_mock, s3):
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    rebuild_snapshot(client, s3, 'products', 'stocks', bucket=BUCKET)
+    # the stock row of the new product was written before its stream record is processed
+    dynamodb_mock.Table('stocks').put_item(Item={'product_id': 'new', 'count': 7})
+
+    result = rebuild_snapshot(client, s3, 'products', 'stocks', [
+        product_record('INSERT', 'new'),
+        stock_record('7567ec4b-b10c-48c5-9345-fc73c48a80aa', 1),
+        product_record('REMOVE', '7567ec4b-b10c-48c5-9345-fc73c48a80a1'),
+    ], bucket=BUCKET)
+
+    catalog = {p['id']: p for p in read_snapshot(s3)}
+    assert result['mode'] == 'incremental'
+    assert catalog['new'] == {'id': 'new', 'title': 'New product', 'description': '', 'price': 9.5, 'count': 7}
+    assert catalog['7567ec4b-b10c-48c5-9345-fc73c48a80aa']['count'] == 1
+    assert '7567ec4b-b10c-48c5-9345-fc73c48a80a1' not in catalog
+
+
+def test_warm_copy_is_served_without_s3_calls_until_stale(s3, mocker):
+    s3.put_object(Bucket=BUCKET, Key='catalog/products.json', Body=b'[]')
+    clock = mocker.Mock(return_value=0.0)
+    store = SnapshotStore(bucket=BUCKET, ttl_seconds=5, clock=clock)
+    get_object = mocker.spy(s3, 'get_object')
+
+    first = store.get(s3)
+    assert store.get(s3) is first
+    assert get_object.call_count == 1
+
+    # stale: revalidated with If-None-Match, S3 answers 304 and the copy is kept
+    clock.return_value = 10.0
+    assert store.get(s3) is first
+    assert get_object.call_count == 2
+    assert get_object.call_args.kwargs['IfNoneMatch'] == first.etag
+
+
+def test_products_list_is_served_from_the_snapshot(snapshots, s3, dynamodb_mock, api_gateway_event, lambda_context):
+    from src.functions.get_products_list import handler
+    rebuild_snapshot(boto3.client('dynamodb', region_name='us-east-1'), s3, 'products', 'stocks', bucket=BUCKET)
+
+    response = handler(api_gateway_event(), lambda_context, dynamodb_mock, s3)
+
+    assert response['statusCode'] == 200
+    assert response['headers']['ETag']
+    assert response['body'] == s3.get_object(Bucket=BUCKET, Key='catalog/products.json')['Body'].read().decode()
+
+    event = api_gateway_event()
+    event['headers']['If-None-Match'] = response['headers']['ETag']
+    not_modified = handler(event, lambda_context, dynamodb_mock, s3)
+    assert not_modified['statusCode'] == 304
+    assert not_modified['body'] == ''
+
+
+def test_products_list_falls_back_to_the_tables_without_a_snapshot(snapshots, s3, dynamodb_mock,
+                                                                   api_gateway_event, lambda_context, mock_products):
+    from src.functions.get_products_list import handler
+
+    response = handler(api_gateway_event(), lambda_context, dynamodb_mock, s3)
+
+    assert response['statusCode'] == 200
+    assert len(json.loads(response['body'])) == len(mock_products)
+
+
+def test_gzip_snapshot_is_decompressed_when_served(dynamodb_mock, s3):
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    rebuild_snapshot(client, s3, 'products', 'stocks', bucket=BUCKET, compress=True)
+
+    stored = s3.get_object(Bucket=BUCKET, Key='catalog/products.json')
+    snapshot = SnapshotStore(bucket=BUCKET).get(s3)
+
+    assert 'gzip' in stored['ContentEncoding']
+    assert isinstance(json.loads(snapshot.body), list)
@@ -0,0 +1,56 @@
+# tests/test_transactions.py
+from src.functions.transactions import plan_transactions
+
+
+def items(count, tag):
+    return [{'Put': {'TableName': 'products', 'Item': {'tag': tag, 'n': i}}} for i in range(count)]
+
+
+def test_small_groups_share_transactions():
+    plan = plan_transactions([('a', items(40, 'a')), ('b', items(40, 'b')), ('c', items(40, 'c'))])
+
+    assert [(keys, len(chunk)) for keys, chunk in plan] == [(['a', 'b'], 80), (['c'], 40)]
+
+
+def test_large_group_is_split_and_keeps_order():
+    plan = plan_transactions([('a', items(10, 'a')), ('big', items(230, 'big'))])
+
+    assert [(keys, len(chunk)) for keys, chunk in plan] == [(['big'], 100), (['big'], 100), (['big'], 30), (['a'], 10)]
+
+
+def test_transact_write_skips_creates_written_before(dynamodb_mock):
+    import boto3
+    from catalog_items import put_product_requests
+    from transactions import transact_write
+
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    first = put_product_requests('products', 'stocks', 'id-1', 'Lamp', '', 12.5, 3)
+    transact_write(client, first)
+    # an order took stock meanwhile; a retry must not reset it
+    client.update_item(TableName='stocks', Key={'product_id': {'S': 'id-1'}},
+                       UpdateExpression='SET #count = :count', ExpressionAttributeNames={'#count': 'count'},
+                       ExpressionAttributeValues={':count': {'N': '2'}})
+
+    retry = first + put_product_requests('products', 'stocks', 'id-2', 'Desk', '', 40, 1)
+    assert transact_write(client, retry) == first
+
+    assert client.get_item(TableName='stocks', Key={'product_id': {'S': 'id-1'}})['Item']['count'] == {'N': '2'}
+    assert 'Item' in client.get_item(TableName='products', Key={'id': {'S': 'id-2'}})
+
+
+def test_transact_write_raises_other_failed_conditions(dynamodb_mock):
+    import boto3
+    import pytest
+    from botocore.exceptions import ClientError
+    from transactions import transact_write
+
+    client = boto3.client('dynamodb', region_name='us-east-1')
+    update = {'Update': {
+        'TableName': 'stocks', 'Key': {'product_id': {'S': '7567ec4b-b10c-48c5-9345-fc73c48a80aa'}},
+        'UpdateExpression': 'SET #count = #count - :one', 'ConditionExpression': '#count > :hundred',
+        'ExpressionAttributeNames': {'#count': 'count'},
+        'ExpressionAttributeValues': {':one': {'N': '1'}, ':hundred': {'N': '100'}},
+    }}
+
+    with pytest.raises(ClientError):
+        transact_write(client, [update])